@@ -42,7 +42,9 @@ from plastid.genomics.roitools import (GenomicSegment,
                                        Transcript)
 
 from plastid.genomics.genome_array import (BAMGenomeArray,
+                                           MultiSampleBAMGenomeArray,
                                            BigWigGenomeArray,
+                                           NativeGenomeArray,
                                            GenomeArray,
                                            SparseGenomeArray,
                                            variable_five_prime_map,
@@ -58,7 +60,8 @@ from plastid.genomics.map_factories import (VariableFivePrimeMapFactory,
                                             FivePrimeMapFactory,
                                             CenterMapFactory,
                                             ThreePrimeMapFactory,
-                                            SizeFilterFactory)
+                                            SizeFilterFactory,
+                                            AlignmentFilterFactory)
 
 from plastid.readers.bed import BED_Reader
 from plastid.readers.bigbed import BigBedReader
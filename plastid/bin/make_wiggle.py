@@ -33,6 +33,7 @@ import inspect
 import sys
 import argparse
 
+from plastid.genomics.genome_array import BAMGenomeArray
 from plastid.util.scriptlib.argparsers import AlignmentParser, BaseParser
 from plastid.util.io.filters import NameDateWriter
 from plastid.util.io.openers import get_short_name, argsopener
@@ -67,6 +68,9 @@ def main(argv=sys.argv[1:]):
                         help="Size of nucleotides to fetch at once for export. "+\
                              "Large values are faster but require more memory "+\
                              "(Default: 100000)")
+    parser.add_argument("-p","--processes",type=int,default=1,metavar="N",
+                        help="Number of processes to use when reading from BAM files "+\
+                             "(Default: 1)")
 
     track_opts = parser.add_argument_group(title="Browser track options")
     track_opts.add_argument("--color",type=str,default=None,
@@ -93,6 +97,11 @@ def main(argv=sys.argv[1:]):
     else:
         fw_color = rc_color = "0,0,0"
     
+    # only BAMGenomeArrays map counts on the fly, and so benefit from parallel export
+    export_kw = {}
+    if isinstance(gnd,BAMGenomeArray):
+        export_kw["processes"] = args.processes
+
     if args.output_format == "bedgraph":
         outfn = gnd.to_bedgraph
     elif args.output_format == "variable_step":
@@ -104,13 +113,13 @@ def main(argv=sys.argv[1:]):
     with argsopener(track_fw,args,"w") as fw_out:
         printer.write("Writing forward strand track to %s ..." % track_fw)
         outfn(fw_out,"%s_fw" % name,"+",window_size=args.window_size,color=fw_color,
-                printer=printer)
+                printer=printer,**export_kw)
         fw_out.close()
 
     with argsopener(track_rc,args,"w") as rc_out:
         printer.write("Writing reverse strand track to %s ..." % track_rc)
         outfn(rc_out,"%s_rc" % name,"-",window_size=args.window_size,color=rc_color,
-                printer=printer)
+                printer=printer,**export_kw)
         rc_out.close()
     
     printer.write("Done!")
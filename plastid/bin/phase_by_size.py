@@ -163,31 +163,13 @@ def main(argv=sys.argv[1:]):
         # only calculate for coding genes
         if len(cds_part) > 0:
 
-            read_dict     = {}
-            count_vectors = {}
-            for k in read_lengths:
-                read_dict[k]     = []
-                count_vectors[k] = []
-            
-            # for each seg, fetch reads, sort them, and create individual count vectors
-            for seg in cds_part:
-                reads = gnd.get_reads(seg)
-                for read in filter(lambda x: len(x.positions) in read_dict,reads):
-                    read_dict[len(read.positions)].append(read)
-    
-                # map and sort by length
-                for read_length in read_dict:
-                    count_vector = list(gnd.map_fn(read_dict[read_length],seg)[1])
-                    count_vectors[read_length].extend(count_vector)
+            # count vectors for each read length (row), 5' to 3' along CDS
+            count_array = gnd.get_stratified(cds_part,args.min_length,args.max_length)
             
             # add each count vector for each length to total
-            for k, vec in count_vectors.items():
-                counts = numpy.array(vec)
-                if cds_part.strand == "-":
-                    counts = counts[::-1]
-               
+            for k, counts in zip(read_lengths,count_array):
                 if len(counts) % 3 == 0:
-                    counts = counts.reshape((len(counts)/3,3))
+                    counts = counts.reshape((len(counts)//3,3))
                 else:
                     if using_roi == False:
                         message = "Length of '%s' coding region (%s nt) is not divisible by 3. Ignoring last partial codon." % (roi.get_name(),len(counts))
@@ -162,28 +162,10 @@ def do_count(roi_table,ga,norm_start,norm_end,min_counts,min_len,max_len,aggrega
         offset = int(round((row["alignment_offset"])))
         assert offset + roi.length <= window_size
         
-        count_vectors = {}
-        for k in raw_count_dict:
-            count_vectors[k] = []
-
-        for seg in roi:
-            reads = ga.get_reads(seg)
-            read_dict = {}
-            for k in raw_count_dict:
-                read_dict[k] = []
-
-            for read in filter(lambda x: len(x.positions) in read_dict,reads):
-                read_dict[len(read.positions)].append(read)
-            
-            for k in read_dict:
-                count_vector = ga.map_fn(read_dict[k],seg)[1]
-                count_vectors[k].extend(count_vector)
-                
-        for k in raw_count_dict:
-            if roi.strand == "-":
-                count_vectors[k] = count_vectors[k][::-1]
-
-            raw_count_dict[k].data[i,offset:offset+roi.length] = numpy.array(count_vectors[k])
+        # rows of `count_array` correspond to read lengths, in order
+        count_array = ga.get_stratified(roi,min_len,max_len)
+        for row, k in enumerate(raw_count_dict):
+            raw_count_dict[k].data[i,offset:offset+roi.length] = count_array[row]
             raw_count_dict[k].mask[i,offset:offset+roi.length] = valid_mask
     
     profile_table = { "x" : numpy.arange(-upstream_flank,window_size-upstream_flank) }
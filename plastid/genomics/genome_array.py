@@ -195,18 +195,26 @@ GenomeArrays also offer utilities for summing and normalization::
 __date__ =  "May 3, 2011"
 __author__ = "joshua"
 from abc import abstractmethod
+import functools
 import itertools
 import operator
 import copy
+import hashlib
+import heapq
+import json
+import multiprocessing
+import multiprocessing.pool
+import os
+import struct
+import zlib
 import numpy
-import scipy.sparse
 import pysam
 
-from collections import OrderedDict
+from collections import OrderedDict, deque
 
-from plastid.readers.wiggle import WiggleReader
-from plastid.readers.bowtie import BowtieReader
-from plastid.readers.bigwig import BigWigReader
+from plastid.readers.wiggle import read_wiggle_chunks
+from plastid.readers.bowtie import BowtieReader, read_bowtie_chunks
+from plastid.readers.bigwig import BigWigReader, many_offsets
 from plastid.genomics.roitools import GenomicSegment, SegmentChain
 from plastid.util.services.mini2to3 import xrange, ifilter
 from plastid.util.services.exceptions import DataWarning, warn
@@ -215,6 +223,36 @@ from plastid.util.io.openers import NullWriter, multiopen
 from plastid.genomics.map_factories import *
 
 MIN_CHR_SIZE = int(10*1e6) # 10 Mb minimum size for unspecified chromosomes 
+MAX_FETCH_WINDOW = int(1e6) # 1 Mb maximum size of merged windows in batched BAM fetches
+SPARSE_BUFFER_SIZE = 65536  # positions of small writes buffered by SparseGenomeArray before merging
+FETCH_CACHE_TILE = 10000    # size of tiles of reads held by BAMGenomeArray's read cache
+CHROM_GROWTH_FACTOR = 2     # factor by which GenomeArray grows chromosome capacity when full
+INTERVAL_BATCH_SIZE = 1000000 # positions expanded at once when adding intervals to a GenomeArray
+NATIVE_CHUNK_SIZE = 65536   # positions per compressed chunk in files written by GenomeArray.save()
+OPERATION_TILE_SIZE = 1000000 # positions per tile in GenomeArray.apply_operation()
+EXPORT_CHUNK_SIZE = 1000000   # positions scanned at once when exporting to wiggle or bedGraph
+
+# mapping rules whose parameters are fully described by their repr(),
+# and whose output can therefore be cached on disk by BAMGenomeArray
+_CACHEABLE_MAPPINGS = (CenterMapFactory,
+                       FivePrimeMapFactory,
+                       ThreePrimeMapFactory,
+                       VariableFivePrimeMapFactory)
+_CACHE_STRAND_NAMES = { "+" : "fw", "-" : "rc", "." : "un" }
+
+_STORAGE_MANIFEST = "manifest.json"
+_STORAGE_FORMAT   = "plastid.GenomeArray.memmap"
+
+# ufuncs equivalent to operators, which can write into existing arrays
+_OPERATOR_UFUNCS = { operator.add     : numpy.add,
+                     operator.sub     : numpy.subtract,
+                     operator.mul     : numpy.multiply,
+                     operator.truediv : numpy.true_divide,
+                   }
+
+_NATIVE_FORMAT = "plastid.GenomeArray.native"
+_NATIVE_MAGIC  = b"PLSTDGA1"
+_NATIVE_FOOTER = struct.Struct("<Q8s") # offset of header, magic number
 
 
 #===============================================================================
@@ -394,7 +432,311 @@ def variable_five_prime_map(feature,**kwargs):
                          strand)
     return [(seg,value)]    
 
-    
+def _map_bowtie_arrays(mapfunc,starts,lengths,strand,**kwargs):
+    """Vectorized equivalent of :func:`five_prime_map`, :func:`three_prime_map`,
+    :func:`variable_five_prime_map`, or :func:`center_map`, applied to many
+    ungapped alignments on a single chromosome strand at once
+
+    Parameters
+    ----------
+    mapfunc : func
+        One of the mapping functions above
+
+    starts : :class:`numpy.ndarray`
+        0-indexed leftmost coordinates of alignments
+
+    lengths : :class:`numpy.ndarray`
+        Lengths of alignments
+
+    strand : str
+        Strand of alignments
+
+    kwargs
+        Keyword arguments that would be passed to `mapfunc`
+
+    Returns
+    -------
+    :class:`numpy.ndarray`
+        Positions to which alignments map. May contain repeats
+
+    :class:`numpy.ndarray`
+        Values to add at each position
+    """
+    ends  = starts + lengths
+    value = kwargs.get("value",1.0)
+    if mapfunc is center_map:
+        nibble = kwargs["nibble"]
+        offset = kwargs.get("offset",0)
+        sign   = -1 if strand == "-" else 1
+        keep   = lengths > 2*nibble
+        if not keep.all():
+            warn("File contains read alignments shorter (%s nt) than `2*'nibble'` value of %s nt. Ignoring these." % (lengths[~keep].min(),2*nibble),
+                 DataWarning)
+
+        seg_starts  = starts[keep] + nibble + sign*offset
+        seg_lengths = lengths[keep] - 2*nibble
+
+        # expand each alignment into a run of consecutive positions
+        total = seg_lengths.sum()
+        run_starts = numpy.cumsum(seg_lengths) - seg_lengths
+        positions = numpy.arange(total) + numpy.repeat(seg_starts - run_starts,seg_lengths)
+        values    = numpy.repeat(float(value) / seg_lengths,seg_lengths)
+        return positions, values
+
+    if mapfunc is variable_five_prime_map:
+        offset_dict = kwargs["offset"]
+        default = offset_dict.get("default",None)
+        offsets = numpy.zeros(len(lengths),dtype=numpy.int64)
+        keep    = numpy.zeros(len(lengths),dtype=bool)
+        for length in numpy.unique(lengths):
+            length = int(length)
+            offset = offset_dict.get(length,default)
+            if offset is None:
+                warn("No offset for reads of length %s. Ignoring." % length,DataWarning)
+                continue
+            if offset >= length:
+                warn("Offset (%s nt) longer than read length %s. Ignoring" % (offset,length))
+            has_length = lengths == length
+            offsets[has_length] = offset
+            keep[has_length] = True
+        from_end = strand not in ("+",".")
+    else:
+        offset  = kwargs.get("offset",0)
+        offsets = numpy.full(len(lengths),offset,dtype=numpy.int64)
+        keep = lengths >= offset
+        if not keep.all():
+            warn("File contains read alignments shorter (%s nt) than offset (%s nt). Ignoring." % (lengths[~keep].min(),offset),
+                 DataWarning)
+        from_end = (strand in ("+",".")) != (mapfunc is five_prime_map)
+
+    # count offsets leftward from ends of alignments, or rightward from starts
+    if from_end:
+        positions = ends[keep] - 1 - offsets[keep]
+    else:
+        positions = starts[keep] + offsets[keep]
+
+    return positions, numpy.full(len(positions),value)
+
+_VECTORIZED_BOWTIE_MAPS = (five_prime_map,three_prime_map,variable_five_prime_map,center_map)
+
+
+#===============================================================================
+# INDEX: helper functions
+#===============================================================================
+
+def infer_chr_lengths(source):
+    """Infer chromosome lengths from a data file before loading it, so that a
+    |GenomeArray| can be allocated once, e.g. via its `chr_lengths` argument
+    or :meth:`GenomeArray.reserve`, rather than grown as data arrive
+
+    Parameters
+    ----------
+    source : str, :class:`pysam.AlignmentFile`, |BigWigReader|, or file-like
+        A `BAM`_ or `bigWig`_ file, whose header lists chromosome lengths, or
+        a `Wiggle`_ or `bedGraph`_ file, which is scanned for the last position
+        covered on each chromosome. Open `Wiggle`_ or `bedGraph`_ streams must
+        be seekable, and are rewound after the scan.
+
+    Returns
+    -------
+    dict
+        Dictionary mapping chromosome names to lengths
+    """
+    if isinstance(source,pysam.AlignmentFile):
+        return dict(zip(source.references,source.lengths))
+    elif isinstance(source,BigWigReader):
+        return dict(source.chroms)
+    elif isinstance(source,str):
+        lower = source.lower()
+        if lower.endswith(".bam"):
+            with pysam.AlignmentFile(source,"rb") as fh:
+                return infer_chr_lengths(fh)
+        elif lower.endswith(".bw") or lower.endswith(".bigwig"):
+            return infer_chr_lengths(BigWigReader(source))
+        else:
+            with open(source) as fh:
+                return infer_chr_lengths(fh)
+
+    pos = source.tell()
+    chr_lengths = {}
+    for chrom, _, ends, _ in read_wiggle_chunks(source):
+        stop = int(ends.max())
+        if stop > chr_lengths.get(chrom,0):
+            chr_lengths[chrom] = stop
+    source.seek(pos)
+    return chr_lengths
+
+def _expand_intervals(starts,ends,values):
+    """Expand half-open intervals, each with a value, into the positions they
+    cover. Values of overlapping intervals are summed
+
+    Parameters
+    ----------
+    starts, ends : :class:`numpy.ndarray`
+        Start and end coordinates of intervals
+
+    values : :class:`numpy.ndarray`
+        Value of each interval
+
+    Returns
+    -------
+    :class:`numpy.ndarray`
+        Sorted, unique positions covered by intervals
+
+    :class:`numpy.ndarray`
+        Values at those positions
+    """
+    lengths = ends - starts
+    run_starts = numpy.cumsum(lengths) - lengths
+    positions  = numpy.arange(lengths.sum()) + numpy.repeat(starts - run_starts,lengths)
+    vals       = numpy.repeat(values,lengths)
+    if not (positions[1:] > positions[:-1]).all():
+        positions, inverse = numpy.unique(positions,return_inverse=True)
+        vals = numpy.bincount(inverse,weights=vals,minlength=len(positions))
+
+    return positions, vals
+
+def _merge_windows(rois,idx,max_window_size=MAX_FETCH_WINDOW):
+    """Merge overlapping or adjacent regions on a single chromosome into fetch windows
+
+    Parameters
+    ----------
+    rois : list of |GenomicSegment|
+        Regions of interest
+
+    idx : list of int
+        Indices of regions in `rois` to merge. These must all be on the same
+        chromosome, and sorted by start position
+
+    max_window_size : int, optional
+        Maximum size of a merged window, unless a single region is larger
+        (Default: `1000000`)
+
+    Yields
+    ------
+    int
+        Start of window
+
+    int
+        End of window
+
+    list
+        Indices in `rois` of regions falling within window
+    """
+    window_start = window_end = None
+    members = []
+    for n in idx:
+        roi = rois[n]
+        if members and roi.start <= window_end and max(window_end,roi.end) - window_start <= max_window_size:
+            window_end = max(window_end,roi.end)
+            members.append(n)
+        else:
+            if members:
+                yield window_start, window_end, members
+
+            window_start = roi.start
+            window_end   = roi.end
+            members      = [n]
+
+    if members:
+        yield window_start, window_end, members
+
+
+_TILE_WORKER_ARRAY = None # BAMGenomeArray private to each worker process
+
+def _init_tile_worker(bamfiles,map_fn,filters,normalize,total,cache_dir):
+    """Open a private |BAMGenomeArray| in a worker process of a pool used by
+    :meth:`BAMGenomeArray._iter_tiles`. Parameters match the state of the
+    parent |BAMGenomeArray|"""
+    global _TILE_WORKER_ARRAY
+    _TILE_WORKER_ARRAY = BAMGenomeArray(bamfiles,mapping=map_fn,cache_dir=cache_dir)
+    for name, func in filters:
+        _TILE_WORKER_ARRAY.add_filter(name,func)
+
+    _TILE_WORKER_ARRAY.set_sum(total)
+    _TILE_WORKER_ARRAY.set_normalize(normalize)
+
+def _map_tile(tile):
+    """Return counts, in genome order, for a `(chrom, start, end, strand)` tile
+    using the |BAMGenomeArray| opened by :func:`_init_tile_worker`"""
+    return _TILE_WORKER_ARRAY.get(GenomicSegment(*tile),roi_order=False)
+
+
+def _sum_dtype(dtype):
+    """Return the widest type of the same kind as `dtype`, used to accumulate
+    sums over arrays of `dtype` without overflow or loss of precision
+
+    Parameters
+    ----------
+    dtype : :class:`numpy.dtype`
+
+    Returns
+    -------
+    :class:`numpy.dtype`
+    """
+    kind = numpy.dtype(dtype).kind
+    if kind == "u":
+        return numpy.dtype(numpy.uint64)
+    elif kind in ("i","b"):
+        return numpy.dtype(numpy.int64)
+    elif kind == "c":
+        return numpy.dtype(numpy.complex128)
+
+    return numpy.dtype(numpy.float64)
+
+def _result_dtype(func,dtype,other):
+    """Determine the type of the output of `func` applied elementwise to
+    an array of `dtype` and to `other`, following :mod:`numpy` type promotion
+
+    Parameters
+    ----------
+    func : func
+        Binary function, as passed to :meth:`GenomeArray.apply_operation`
+
+    dtype : :class:`numpy.dtype`
+        Type of first argument
+
+    other : scalar or |GenomeArray|
+        Second argument, or array whose `dtype` it shares
+
+    Returns
+    -------
+    :class:`numpy.dtype`
+    """
+    other = numpy.zeros(0,dtype=other.dtype) if hasattr(other,"dtype") else other
+    try:
+        return numpy.asarray(func(numpy.zeros(0,dtype=dtype),other)).dtype
+    except Exception:
+        return numpy.result_type(dtype,other)
+
+def _check_inplace_dtype(func,dtype,other,inplace):
+    """Check that results of `func` can be written into an array of `dtype`
+    without changing their kind, e.g. from float to integer
+
+    Parameters
+    ----------
+    func : func
+        Binary function, as passed to :meth:`GenomeArray.apply_operation`
+
+    dtype : :class:`numpy.dtype`
+        Type of array written in place
+
+    other : scalar or |GenomeArray|
+        Second argument
+
+    inplace : bool
+        Whether the operation is in place. If not, nothing is checked
+
+    Raises
+    ------
+    TypeError
+        If `inplace` is `True` and results cannot be cast to `dtype`
+    """
+    if inplace == True:
+        out_dtype = _result_dtype(func,dtype,other)
+        if not numpy.can_cast(out_dtype,dtype,casting="same_kind"):
+            raise TypeError("Cannot write results of type '%s' in place into array of type '%s'." % (out_dtype,dtype))
+
 
 #===============================================================================
 # GenomeArray classes
@@ -607,6 +949,15 @@ class BAMGenomeArray(AbstractGenomeArray):
         somewhere in the middle. Factories to produce such functions are provided.
         See references below. (Default: :func:`CenterMapFactory`)
 
+    cache_dir : str or None, optional
+        Folder in which to cache mapped counts on disk. See
+        :meth:`~BAMGenomeArray.set_cache`. (Default: `None`, no caching)
+
+    fetch_cache_size : int, optional
+        Maximum number of :term:`read alignments` to hold in memory for
+        repeated or overlapping queries. See :meth:`~BAMGenomeArray.set_fetch_cache`.
+        (Default: `0`, no caching)
+
     
     Attributes
     ----------
@@ -641,6 +992,15 @@ class BAMGenomeArray(AbstractGenomeArray):
             somewhere in the middle. Factories to produce such functions are provided.
             See references below. (Default: :func:`CenterMapFactory`)
 
+        cache_dir : str or None, optional
+            Folder in which to cache mapped counts on disk. See
+            :meth:`~BAMGenomeArray.set_cache`. (Default: `None`, no caching)
+
+        fetch_cache_size : int, optional
+            Maximum number of :term:`read alignments` to hold in memory for
+            repeated or overlapping queries. See :meth:`~BAMGenomeArray.set_fetch_cache`.
+            (Default: `0`, no caching)
+
         See also
         --------
         plastid.genomics.map_factories.FivePrimeMapFactory
@@ -674,6 +1034,8 @@ class BAMGenomeArray(AbstractGenomeArray):
 
         self._filters     = OrderedDict()
         self._update()
+        self.set_cache(kwargs.get("cache_dir",None))
+        self.set_fetch_cache(kwargs.get("fetch_cache_size",0))
 
     def __del__(self):
         for bamfile in self.bamfiles:
@@ -714,13 +1076,23 @@ class BAMGenomeArray(AbstractGenomeArray):
         In Python, `lambda` functions do NOT have their own scope! We strongly
         recomend defining filter functions using the ``def`` syntax to avoid
         namespace collisions.
+
+        Filters created by |AlignmentFilterFactory| (including |SizeFilterFactory|)
+        are applied in compiled code together with strand-matching, and are
+        much faster than equivalent Python functions. Prefer them when
+        filtering on read length, mapping quality, or SAM flags.
         
         See also
         --------
+        plastid.genomics.map_factories.AlignmentFilterFactory
+            generate filters that gate read alignments on length, mapping
+            quality, and SAM flags
+
         plastid.genomics.map_factories.SizeFilterFactory
             generate filter functions that gate read alignments on size
         """
         self._filters[name] = func
+        self._reset_cache()
     
     def remove_filter(self,name):
         """Remove a generic filter
@@ -736,6 +1108,7 @@ class BAMGenomeArray(AbstractGenomeArray):
             the removed filter function
         """
         retval = self._filters.pop(name)
+        self._reset_cache()
         return retval
     
     def chroms(self):
@@ -757,7 +1130,352 @@ class BAMGenomeArray(AbstractGenomeArray):
             mapping chromosome names to lengths
         """
         return self._chr_lengths
-        
+
+    def _fetch_reads(self,chrom,start,end):
+        """Fetch all :term:`read alignments` overlapping a genomic window
+        from all `BAM`_ files in the array, without strand matching or filtering
+
+        Parameters
+        ----------
+        chrom : str
+            Chromosome name
+
+        start : int
+            Zero-indexed start of window
+
+        end : int
+            Half-open end of window
+
+        Returns
+        -------
+        iterator
+            :class:`pysam.AlignedSegment` covering the window
+        """
+        if self._fetch_cache_size > 0:
+            return itertools.chain.from_iterable((self._fetch_cached(n,chrom,start,end) for n in range(len(self.bamfiles))))
+
+        return itertools.chain.from_iterable((X.fetch(reference=chrom,
+                                               start=start,
+                                               end=end,
+                                               # until_eof=True, # this could speed things up. need to test/investigate
+                                               ) for X in self.bamfiles))
+
+    def set_fetch_cache(self,max_reads,tile_size=FETCH_CACHE_TILE):
+        """Hold recently fetched :term:`read alignments` in memory, so that
+        repeated or overlapping queries (e.g. from metagene windows, or from
+        adjacent regions of the same transcript) do not decompress the same
+        parts of the `BAM`_ file(s) again.
+
+        Reads are fetched and held in fixed tiles of each chromosome. When the
+        number of held reads exceeds `max_reads`, tiles are discarded in
+        least-recently-used order. Any previously cached reads are discarded.
+
+        Parameters
+        ----------
+        max_reads : int
+            Maximum number of reads to hold in memory. If `0`, caching is disabled.
+
+        tile_size : int, optional
+            Size of each tile, in nucleotides (Default: `10000`)
+
+        See also
+        --------
+        BAMGenomeArray.fetch_cache_info
+            Report hits and misses of the cache
+        """
+        if max_reads < 0:
+            raise ValueError("Fetch cache size must be >= 0. Got %s." % max_reads)
+        if tile_size < 1:
+            raise ValueError("Fetch cache tile size must be >= 1. Got %s." % tile_size)
+
+        self._fetch_cache_size  = max_reads
+        self._fetch_cache_tile  = tile_size
+        self._fetch_cache       = OrderedDict()
+        self._fetch_cache_reads = 0
+        self._fetch_cache_hits  = 0
+        self._fetch_cache_misses = 0
+
+    def fetch_cache_info(self):
+        """Report usage of the read cache set by :meth:`~BAMGenomeArray.set_fetch_cache`
+
+        Returns
+        -------
+        dict
+            Dictionary with the following keys:
+
+              - `hits`: number of tile lookups served from the cache
+              - `misses`: number of tiles fetched from the `BAM`_ file(s)
+              - `tiles`: number of tiles currently held
+              - `reads`: number of reads currently held
+              - `max_reads`: maximum number of reads to hold
+        """
+        return { "hits"      : self._fetch_cache_hits,
+                 "misses"    : self._fetch_cache_misses,
+                 "tiles"     : len(self._fetch_cache),
+                 "reads"     : self._fetch_cache_reads,
+                 "max_reads" : self._fetch_cache_size,
+               }
+
+    def _fetch_cached(self,bam_idx,chrom,start,end):
+        """Fetch reads overlapping a window from a single `BAM`_ file via the
+        read cache, in the same order they would be fetched directly
+
+        Parameters
+        ----------
+        bam_idx : int
+            Index of `BAM`_ file in :attr:`bamfiles`
+
+        chrom : str
+            Chromosome name
+
+        start : int
+            Zero-indexed start of window
+
+        end : int
+            Half-open end of window
+
+        Returns
+        -------
+        list
+            :class:`pysam.AlignedSegment` covering the window
+        """
+        cache     = self._fetch_cache
+        tile_size = self._fetch_cache_tile
+        first     = start // tile_size
+        last      = max(first,(end - 1) // tile_size)
+        reads_out = []
+        for tile in xrange(first,last + 1):
+            key = (bam_idx,chrom,tile)
+            if key in cache:
+                # move to most-recently-used position
+                tile_reads = cache.pop(key)
+                self._fetch_cache_hits += 1
+            else:
+                tile_reads = list(self.bamfiles[bam_idx].fetch(reference=chrom,
+                                                               start=tile*tile_size,
+                                                               end=(tile + 1)*tile_size))
+                self._fetch_cache_misses += 1
+                self._fetch_cache_reads  += len(tile_reads)
+
+            cache[key] = tile_reads
+
+            # Reads overlapping several tiles are returned from the first
+            # tile they overlap within the window, so that each read is
+            # returned once, and in order of position
+            tile_start = tile*tile_size
+            for read in tile_reads:
+                read_start = read.reference_start
+                read_end   = read.reference_end or read_start + 1
+                if read_end > start and read_start < end and \
+                   (tile == first or read_start >= tile_start):
+                    reads_out.append(read)
+
+        # evict least-recently-used tiles, but never the ones just used
+        while self._fetch_cache_reads > self._fetch_cache_size and len(cache) > last - first + 1:
+            _, tile_reads = cache.popitem(last=False)
+            self._fetch_cache_reads -= len(tile_reads)
+
+        return reads_out
+
+    def _filter_reads(self,reads,strand):
+        """Strand-match `reads` to `strand`, and pass them through any filters
+        added via :meth:`~BAMGenomeArray.add_filter`
+
+        Parameters
+        ----------
+        reads : iterable
+            :class:`pysam.AlignedSegment` to filter
+
+        strand : str
+            `'+'`, `'-'`, or `'.'`. If `'.'`, reads are not strand-matched
+
+        Returns
+        -------
+        iterator
+            :class:`pysam.AlignedSegment` passing all filters
+
+        Notes
+        -----
+        Strand-matching and all |AlignmentFilterFactory| filters are applied
+        together in a single compiled pass. Other filter functions are
+        applied afterwards.
+        """
+        fast_filters  = []
+        other_filters = []
+        for my_filter in self._filters.values():
+            if isinstance(my_filter,AlignmentFilterFactory):
+                fast_filters.append(my_filter)
+            else:
+                other_filters.append(my_filter)
+
+        reads = filter_alignments(reads,strand,fast_filters)
+
+        # Pass through additional filters (e.g. user-defined functions,
+        # if they have been added)
+        for my_filter in other_filters:
+            reads = ifilter(my_filter,reads)
+
+        return iter(reads)
+
+    def set_cache(self,cache_dir):
+        """Cache mapped counts on disk, so that later calls to :meth:`~BAMGenomeArray.get`
+        (and methods that use it) read counts from the cache instead of
+        fetching and mapping reads from the `BAM`_ file(s).
+
+        The first time counts are requested from a given chromosome and strand,
+        the whole chromosome is mapped under the current mapping rule and filters,
+        and saved as a :class:`numpy.ndarray` in a subfolder of `cache_dir`. Later requests,
+        including those from other |BAMGenomeArray| objects using the same
+        cache folder, memory-map that array.
+
+        Subfolders are named by a hash of the paths, sizes, and modification
+        times of the `BAM`_ files, and the parameters of the mapping rule and
+        filters, so that a cache is never used for data or parameters that differ
+        from those that created it.
+
+        Parameters
+        ----------
+        cache_dir : str or None
+            Folder in which to cache counts. Created if it does not exist.
+            If `None`, caching is disabled.
+
+        Notes
+        -----
+        Only mapping rules created by |FivePrimeMapFactory|, |ThreePrimeMapFactory|,
+        |CenterMapFactory|, or |VariableFivePrimeMapFactory|, and filters created
+        by |AlignmentFilterFactory|, can be cached. If other mapping functions or
+        filters are in use, a warning is raised and counts are fetched from the
+        `BAM`_ file(s) as usual.
+
+        :meth:`~BAMGenomeArray.get_reads_and_counts` and
+        :meth:`~BAMGenomeArray.get_stratified` always read from the `BAM`_ file(s).
+        """
+        if cache_dir is not None and not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+        self._cache_dir = cache_dir
+        self._reset_cache()
+
+    def _reset_cache(self):
+        """Forget the cache key and any open cached arrays. Called whenever
+        the mapping rule or filters change"""
+        self._cache_key    = None
+        self._cache_arrays = {}
+
+    def _get_cache_key(self):
+        """Return the name of the cache subfolder for the current `BAM`_ files,
+        mapping rule, and filters, or `None` if caching is disabled or
+        these cannot be described reproducibly
+
+        Returns
+        -------
+        str or None
+        """
+        if self._cache_dir is None:
+            return None
+
+        if self._cache_key is None:
+            if not isinstance(self.map_fn,_CACHEABLE_MAPPINGS) or \
+               not all([isinstance(X,AlignmentFilterFactory) for X in self._filters.values()]):
+                warn("Mapping rule or filters of BAMGenomeArray cannot be cached on disk. Reading counts from BAM file(s) instead.",
+                     DataWarning)
+                self._cache_key = False
+            else:
+                ltmp = []
+                for bamfile in self.bamfiles:
+                    filename = bamfile.filename
+                    if isinstance(filename,bytes):
+                        filename = filename.decode()
+
+                    filename = os.path.abspath(filename)
+                    stat     = os.stat(filename)
+                    ltmp.append("%s\t%s\t%s" % (filename,stat.st_size,stat.st_mtime))
+
+                ltmp.append(repr(self.map_fn))
+                ltmp.extend(sorted([repr(X) for X in self._filters.values()]))
+                self._cache_key = hashlib.sha1("\n".join(ltmp).encode("utf-8")).hexdigest()
+
+        return self._cache_key or None
+
+    def _get_cached_counts(self,chrom,strand):
+        """Return counts for an entire chromosome and strand from the on-disk cache,
+        mapping and saving them first if they are not yet cached
+
+        Parameters
+        ----------
+        chrom : str
+            Chromosome name
+
+        strand : str
+            `'+'`, `'-'`, or `'.'`
+
+        Returns
+        -------
+        numpy.memmap
+            Counts at each position in `chrom`, in genome order, not normalized
+        """
+        key = (chrom,strand)
+        if key not in self._cache_arrays:
+            folder = os.path.join(self._cache_dir,self._get_cache_key())
+            fn = os.path.join(folder,"%s_%s.npy" % (chrom.replace(os.sep,"_"),_CACHE_STRAND_NAMES[strand]))
+            if not os.path.exists(fn):
+                if not os.path.isdir(folder):
+                    os.makedirs(folder)
+
+                chrom_length = self._chr_lengths[chrom]
+                ltmp = []
+                for start in xrange(0,chrom_length,MAX_FETCH_WINDOW):
+                    seg = GenomicSegment(chrom,start,min(start + MAX_FETCH_WINDOW,chrom_length),strand)
+                    reads = self._filter_reads(self._fetch_reads(chrom,seg.start,seg.end),strand)
+                    ltmp.append(self.map_fn(list(reads),seg)[1])
+
+                # write to temporary file first, so that interrupted writes
+                # never leave an incomplete cache behind
+                tmp_fn = "%s.%s.tmp" % (fn,os.getpid())
+                with open(tmp_fn,"wb") as fout:
+                    numpy.save(fout,numpy.concatenate(ltmp,axis=-1))
+
+                os.rename(tmp_fn,fn)
+
+            self._cache_arrays[key] = numpy.load(fn,mmap_mode="r")
+
+        return self._cache_arrays[key]
+
+    def _get_from_cache(self,roi,roi_order=True):
+        """Retrieve counts for a |GenomicSegment| from the on-disk cache.
+        See :meth:`~BAMGenomeArray.set_cache`
+
+        Parameters
+        ----------
+        roi : |GenomicSegment|
+            Region of interest
+
+        roi_order : bool, optional
+            If `True` (default) return vector of values 5' to 3'
+            relative to vector rather than genome.
+
+        Returns
+        -------
+        numpy.ndarray
+            Counts at each position of `roi`
+        """
+        if roi.chrom not in self.chroms():
+            return numpy.zeros(list(getattr(self.map_fn,"shape",[])) + [len(roi)])
+
+        counts = self._get_cached_counts(roi.chrom,roi.strand)
+        count_array = numpy.zeros(counts.shape[:-1] + (len(roi),),dtype=counts.dtype)
+        end = min(roi.end,counts.shape[-1])
+        if end > roi.start:
+            count_array[...,:end - roi.start] = counts[...,roi.start:end]
+
+        if self._normalize is True:
+            count_array = count_array / float(self.sum()) * 1e6
+
+        if roi_order == True and roi.strand == "-":
+            count_array = count_array[...,::-1]
+
+        return count_array
+
     def get_reads_and_counts(self,roi,roi_order=True):
         """Return :term:`read alignments` covering a |GenomicSegment|, and a
         count vector mapping reads to each positions in the |GenomicSegment|,
@@ -792,29 +1510,15 @@ class BAMGenomeArray(AbstractGenomeArray):
         strand = roi.strand
         start  = roi.start
         end    = roi.end
-        
+
         if chrom not in self.chroms():
             # FIXME: generalize to N-D
             shape = [1] + getattr(self.map_fn,"shape",[])
             return [], numpy.zeros(shape)
 
-        reads = itertools.chain.from_iterable((X.fetch(reference=chrom,
-                                               start=start,
-                                               end=end,
-                                               # until_eof=True, # this could speed things up. need to test/investigate
-                                               ) for X in self.bamfiles))
-            
-        # filter by strand
-        if strand == "+":
-            reads = ifilter(lambda x: x.is_reverse is False,reads)
-        elif strand == "-":
-            reads = ifilter(lambda x: x.is_reverse is True,reads)
-        
-        # Pass through additional filters (e.g. size filters, if they have
-        # been added)
-        for my_filter in self._filters.values():
-            reads = ifilter(my_filter,reads)
-        
+        reads = self._fetch_reads(chrom,start,end)
+        reads = self._filter_reads(reads,strand)
+
         # retrieve selected parts of regions
         reads,count_array = self.map_fn(list(reads),roi)
         
@@ -919,34 +1623,382 @@ class BAMGenomeArray(AbstractGenomeArray):
         if isinstance(roi,SegmentChain):
             return roi.get_counts(self)
 
+        if self._get_cache_key() is not None:
+            return self._get_from_cache(roi,roi_order=roi_order)
+
         _, count_array = self.get_reads_and_counts(roi,roi_order=roi_order)
 
         return count_array
 
-    def get_mapping(self):
-        """Return the docstring of the current mapping function
-        """
-        return self.map_fn.__doc__
-    
-    def set_mapping(self,mapping_function):
-        """Change the mapping rule
-        
+    def get_stratified(self,roi,min_length,max_length,roi_order=True):
+        """Retrieve a 2D array of counts from a region of interest, in which
+        counts at each position (column) are stratified by read length (row),
+        following the mapping rule set by :meth:`~BAMGenomeArray.set_mapping`.
+
+        If the mapping rule implements a ``map_stratified()`` method (as all
+        mapping factories in :mod:`~plastid.genomics.map_factories` do), reads
+        are mapped in a single pass. Otherwise, reads are grouped by length,
+        and the mapping rule is called once per length.
+
         Parameters
         ----------
-        mapping : func
-            Function that determines how each read alignment is mapped to a 
-            count at a position in the |BAMGenomeArray|. Examples include
-            mapping reads to their fiveprime or threeprime ends, with or
-            without offsets. Factories to produce such functions are provided.
-            See references below.
+        roi : |GenomicSegment| or |SegmentChain|
+            Region of interest in genome
 
-            
-        See also
-        --------
-        plastid.genomics.map_factories.FivePrimeMapFactory
-            map reads to 5' ends, with or without applying an offset
-        
-        plastid.genomics.map_factories.VariableFivePrimeMapFactory
+        min_length : int
+            Minimum read length to include
+
+        max_length : int
+            Maximum read length to include, inclusive
+
+        roi_order : bool, optional
+            If `True` (default) return columns 5' to 3' relative to `roi`
+            rather than genome.
+
+        Returns
+        -------
+        numpy.ndarray
+            2D array with one row for each read length from `min_length` to
+            `max_length`, and one column for each position in `roi`
+
+        Raises
+        ------
+        ValueError
+            if bamfiles not sorted or not indexed, or if `max_length` < `min_length`
+        """
+        if max_length < min_length:
+            raise ValueError("Max length '%s' must be >= min length '%s'." % (max_length,min_length))
+
+        num_lengths = max_length - min_length + 1
+        if isinstance(roi,SegmentChain):
+            if len(roi) == 0:
+                warn("%s is a zero-length SegmentChain. Returning 0-length count array." % roi.get_name(),DataWarning)
+                return numpy.zeros((num_lengths,0))
+
+            count_array = numpy.concatenate([self.get_stratified(X,min_length,max_length,roi_order=False) for X in roi],axis=1)
+            if roi_order == True and roi.strand == "-":
+                count_array = count_array[:,::-1]
+
+            return count_array
+
+        if roi.chrom not in self.chroms():
+            return numpy.zeros((num_lengths,len(roi)))
+
+        reads = list(self._filter_reads(self._fetch_reads(roi.chrom,roi.start,roi.end),roi.strand))
+        if hasattr(self.map_fn,"map_stratified"):
+            _, count_array = self.map_fn.map_stratified(reads,roi,min_length,max_length)
+        else:
+            read_dict = { K : [] for K in range(min_length,max_length+1) }
+            for read in reads:
+                read_length = len(read.positions)
+                if read_length in read_dict:
+                    read_dict[read_length].append(read)
+
+            count_array = numpy.zeros((num_lengths,len(roi)))
+            for read_length, length_reads in read_dict.items():
+                if len(length_reads) > 0:
+                    count_array[read_length - min_length] = self.map_fn(length_reads,roi)[1]
+
+        if self._normalize is True:
+            count_array = count_array / float(self.sum()) * 1e6
+
+        if roi_order == True and roi.strand == "-":
+            count_array = count_array[:,::-1]
+
+        return count_array
+
+    def get_many(self,rois,roi_order=True,max_window_size=MAX_FETCH_WINDOW):
+        """Retrieve arrays of counts for many regions of interest at once,
+        following the mapping rule set by :meth:`~BAMGenomeArray.set_mapping`.
+
+        Regions are sorted by chromosome and position, and overlapping or
+        adjacent regions are merged into windows. Each window is fetched from
+        the `BAM`_ file(s) once, and mapped once per strand. Count vectors for
+        individual regions are then sliced out of the mapped window. This is
+        much faster than calling :meth:`~BAMGenomeArray.get` once per region
+        when regions overlap one another, e.g. for transcripts from the same
+        gene.
+
+        Parameters
+        ----------
+        rois : list of |GenomicSegment|
+            Regions of interest in genome
+
+        roi_order : bool, optional
+            If `True` (default) return vectors of values 5' to 3'
+            relative to each region rather than genome.
+
+        max_window_size : int, optional
+            Maximum size, in nucleotides, of a merged window. Regions are not
+            merged into a window if doing so would make it larger than this.
+            Regions that are themselves larger are fetched alone.
+            (Default: `1000000`)
+
+        Returns
+        -------
+        list
+            List of :class:`numpy.ndarray`, one per region in `rois`, in the same
+            order as `rois`. Each array is identical to that returned by
+            :meth:`~BAMGenomeArray.get`
+
+        Raises
+        ------
+        ValueError
+            if bamfiles not sorted or not indexed
+
+        See also
+        --------
+        BAMGenomeArray.get_counts_many
+            Fetch spliced count vectors for many |SegmentChains| at once
+        """
+        rois   = list(rois)
+        if self._get_cache_key() is not None:
+            return [self._get_from_cache(X,roi_order=roi_order) for X in rois]
+
+        out    = [None] * len(rois)
+        shape  = list(getattr(self.map_fn,"shape",[]))
+        chroms = self.chroms()
+
+        # group by chromosome, and sort each group by position
+        by_chrom = {}
+        for n, roi in enumerate(rois):
+            if roi.chrom not in chroms:
+                out[n] = numpy.zeros(shape + [len(roi)])
+            else:
+                by_chrom.setdefault(roi.chrom,[]).append(n)
+
+        for chrom, idx in by_chrom.items():
+            idx.sort(key=lambda n: (rois[n].start,rois[n].end))
+            for window_start, window_end, members in _merge_windows(rois,idx,max_window_size):
+                reads = list(self._fetch_reads(chrom,window_start,window_end))
+
+                # map once per strand present in window
+                for strand in set([rois[n].strand for n in members]):
+                    window = GenomicSegment(chrom,window_start,window_end,strand)
+                    _, count_array = self.map_fn(list(self._filter_reads(reads,strand)),window)
+                    if self._normalize is True:
+                        count_array = count_array / float(self.sum()) * 1e6
+
+                    for n in members:
+                        roi = rois[n]
+                        if roi.strand != strand:
+                            continue
+
+                        vals = count_array[...,roi.start - window_start:roi.end - window_start]
+                        if roi_order == True and strand == "-":
+                            vals = vals[...,::-1]
+
+                        out[n] = vals
+
+        return out
+
+    def get_counts_many(self,chains,stranded=True,max_window_size=MAX_FETCH_WINDOW):
+        """Retrieve spliced count vectors for many |SegmentChains| at once.
+
+        All segments from all chains are fetched together via
+        :meth:`~BAMGenomeArray.get_many`, so that reads shared by several
+        chains (e.g. transcripts from the same gene) are fetched and mapped
+        only once.
+
+        Parameters
+        ----------
+        chains : list of |SegmentChain|
+            Chains for which counts should be fetched
+
+        stranded : bool, optional
+            If `True` and a chain is on the minus strand, count order
+            will be reversed relative to genome so that the array positions
+            march from the 5' to 3' end of the chain. (Default: `True`)
+
+        max_window_size : int, optional
+            Maximum size, in nucleotides, of a merged fetch window.
+            (Default: `1000000`)
+
+        Returns
+        -------
+        list
+            List of :class:`numpy.ndarray`, one per chain in `chains`, in the
+            same order as `chains`. Each array is identical to that returned by
+            :meth:`SegmentChain.get_counts <plastid.genomics.roitools.SegmentChain.get_counts>`
+        """
+        chains   = list(chains)
+        segments = []
+        for chain in chains:
+            segments.extend(chain)
+
+        seg_counts = self.get_many(segments,roi_order=False,max_window_size=max_window_size)
+
+        out = []
+        i   = 0
+        for chain in chains:
+            num_segs = len(chain)
+            if num_segs == 0:
+                warn("%s is a zero-length SegmentChain. Returning 0-length count vector." % chain.get_name(),DataWarning)
+                out.append(numpy.array([],dtype=float))
+                continue
+
+            count_array = numpy.concatenate(seg_counts[i:i+num_segs],axis=-1).astype(float)
+            i += num_segs
+            if stranded is True and chain.strand == "-":
+                count_array = count_array[...,::-1]
+
+            out.append(count_array)
+
+        return out
+
+    def _stream_reads(self,chrom,start):
+        """Iterate over reads on `chrom` from all `BAM`_ files, in order of
+        position, beginning with the first read that overlaps `start`
+
+        Parameters
+        ----------
+        chrom : str
+            Chromosome name
+
+        start : int
+            Zero-indexed position from which to begin
+
+        Yields
+        ------
+        :class:`pysam.AlignedSegment`
+        """
+        if len(self.bamfiles) == 1:
+            for read in self.bamfiles[0].fetch(reference=chrom,start=start):
+                yield read
+        else:
+            # decorate with file and read number so ties never compare reads
+            streams = [((read.reference_start,i,n,read) for n, read in enumerate(X.fetch(reference=chrom,start=start))) \
+                       for i, X in enumerate(self.bamfiles) if chrom in X.references]
+            for _, _, _, read in heapq.merge(*streams):
+                yield read
+
+    def iter_counts(self,chains,stranded=True):
+        """Stream spliced count vectors for position-sorted |SegmentChains|,
+        in a single linear pass through the `BAM`_ file(s).
+
+        Chains and reads are merge-joined: reads are decompressed once, in
+        order, and held only while they may still overlap a chain that has
+        not yet been reached. Counts for each chain are yielded as soon as
+        all reads overlapping it have been read. For whole-annotation jobs,
+        this is faster than fetching each chain from the `BAM`_ index, and
+        uses memory proportional to the active window, rather than to the
+        number of chains.
+
+        Parameters
+        ----------
+        chains : iterable of |SegmentChain|
+            Chains for which counts should be fetched, sorted by chromosome
+            and by start position within each chromosome. Chromosomes may
+            appear in any order, but each must appear in a single block.
+
+        stranded : bool, optional
+            If `True` and a chain is on the minus strand, count order
+            will be reversed relative to genome so that the array positions
+            march from the 5' to 3' end of the chain. (Default: `True`)
+
+        Yields
+        ------
+        numpy.ndarray
+            Counts for each chain in `chains`, in the same order as `chains`.
+            Each array is identical to that returned by
+            :meth:`SegmentChain.get_counts <plastid.genomics.roitools.SegmentChain.get_counts>`
+
+        Raises
+        ------
+        ValueError
+            if `chains` are not sorted
+        """
+        shape      = list(getattr(self.map_fn,"shape",[]))
+        done       = set()
+        chrom      = None
+        last_start = -1
+        known      = False
+        reads      = None
+        active     = []
+        next_read  = None
+
+        for chain in chains:
+            if len(chain) == 0:
+                warn("%s is a zero-length SegmentChain. Returning 0-length count vector." % chain.get_name(),DataWarning)
+                yield numpy.array([],dtype=float)
+                continue
+
+            span = chain.spanning_segment
+            if span.chrom != chrom:
+                if span.chrom in done:
+                    raise ValueError("Chains must be sorted by chromosome and position. Chromosome '%s' appeared more than once." % span.chrom)
+
+                if chrom is not None:
+                    done.add(chrom)
+
+                chrom      = span.chrom
+                last_start = span.start
+                active     = []
+                next_read  = None
+                known      = chrom in self.chroms()
+                reads      = self._stream_reads(chrom,span.start) if known else iter([])
+            elif span.start < last_start:
+                raise ValueError("Chains must be sorted by chromosome and position. Found %s after a chain starting at %s." % (chain,last_start))
+
+            last_start = span.start
+
+            # drop reads ending before chain; they cannot overlap it or later chains
+            active = [X for X in active if (X.reference_end or X.reference_start + 1) > span.start]
+
+            # pull reads until we pass the end of the chain
+            if next_read is None:
+                next_read = next(reads,None)
+
+            while next_read is not None and next_read.reference_start < span.end:
+                if (next_read.reference_end or next_read.reference_start + 1) > span.start:
+                    active.append(next_read)
+
+                next_read = next(reads,None)
+
+            seg_counts = []
+            for seg in chain:
+                seg_reads = [X for X in active if X.reference_start < seg.end \
+                                                  and (X.reference_end or X.reference_start + 1) > seg.start]
+                if known:
+                    _, count_array = self.map_fn(list(self._filter_reads(seg_reads,seg.strand)),seg)
+                else:
+                    count_array = numpy.zeros(shape + [len(seg)])
+
+                seg_counts.append(count_array)
+
+            count_array = numpy.concatenate(seg_counts,axis=-1).astype(float)
+            if self._normalize is True:
+                count_array = count_array / float(self.sum()) * 1e6
+
+            if stranded is True and chain.strand == "-":
+                count_array = count_array[...,::-1]
+
+            yield count_array
+
+    def get_mapping(self):
+        """Return the docstring of the current mapping function
+        """
+        return self.map_fn.__doc__
+    
+    def set_mapping(self,mapping_function):
+        """Change the mapping rule
+        
+        Parameters
+        ----------
+        mapping : func
+            Function that determines how each read alignment is mapped to a 
+            count at a position in the |BAMGenomeArray|. Examples include
+            mapping reads to their fiveprime or threeprime ends, with or
+            without offsets. Factories to produce such functions are provided.
+            See references below.
+
+            
+        See also
+        --------
+        plastid.genomics.map_factories.FivePrimeMapFactory
+            map reads to 5' ends, with or without applying an offset
+        
+        plastid.genomics.map_factories.VariableFivePrimeMapFactory
             map reads to 5' ends, choosing an offset determined by read length
         
         plastid.genomics.map_factories.ThreePrimeMapFactory
@@ -957,8 +2009,71 @@ class BAMGenomeArray(AbstractGenomeArray):
         """
         self.map_fn = mapping_function
         self._update()
+        self._reset_cache()
     
-    def to_genome_array(self,array_type=None):
+    def _iter_tiles(self,strands,window_size,processes=1):
+        """Map counts over the whole genome in tiles, optionally in parallel
+
+        Parameters
+        ----------
+        strands : sequence of str
+            Strands to map
+
+        window_size : int
+            Size of each tile, in nucleotides
+
+        processes : int, optional
+            Number of worker processes. If `1`, tiles are mapped in this process.
+            Otherwise, each worker opens its own copy of the `BAM`_ file(s).
+            (Default: `1`)
+
+        Yields
+        ------
+        tuple
+            `(chrom, start, end, strand)` of each tile, in order by chromosome,
+            strand, then position
+
+        numpy.ndarray
+            Counts at each position in the tile, in genome order
+        """
+        assert window_size > 0
+        tiles = ((chrom,start,min(start + window_size,self._chr_lengths[chrom]),strand)
+                 for chrom in sorted(self.chroms())
+                 for strand in strands
+                 for start in xrange(0,self._chr_lengths[chrom],window_size))
+
+        if processes == 1:
+            for tile in tiles:
+                yield tile, self.get(GenomicSegment(*tile),roi_order=False)
+        else:
+            bamfiles = [X.filename.decode() if isinstance(X.filename,bytes) else X.filename for X in self.bamfiles]
+            pool = multiprocessing.Pool(processes=processes,
+                                        initializer=_init_tile_worker,
+                                        initargs=(bamfiles,
+                                                  self.map_fn,
+                                                  list(self._filters.items()),
+                                                  self._normalize,
+                                                  self.sum(),
+                                                  self._cache_dir))
+            try:
+                # keep a bounded number of tiles in flight, so that memory
+                # use does not grow if results are consumed slowly
+                pending = deque()
+                for tile in itertools.islice(tiles,2*processes):
+                    pending.append((tile,pool.apply_async(_map_tile,(tile,))))
+
+                while len(pending) > 0:
+                    tile, result = pending.popleft()
+                    counts = result.get()
+                    for next_tile in itertools.islice(tiles,1):
+                        pending.append((next_tile,pool.apply_async(_map_tile,(next_tile,))))
+
+                    yield tile, counts
+            finally:
+                pool.terminate()
+                pool.join()
+
+    def to_genome_array(self,array_type=None,processes=1,window_size=MAX_FETCH_WINDOW,dtype=numpy.float64):
         """Converts |BAMGenomeArray| to a |GenomeArray| or |SparseGenomeArray|
         under the mapping rule set by :meth:`~BAMGenomeArray.set_mapping`
 
@@ -967,6 +2082,21 @@ class BAMGenomeArray(AbstractGenomeArray):
         array_type : class
             Type of GenomeArray to return. |GenomeArray| or |SparseGenomeArray|.
             (Default: |GenomeArray|)
+
+        processes : int, optional
+            Number of processes across which to divide the genome. Each
+            process opens its own copy of the `BAM`_ file(s). Mapping rules
+            and filters must be picklable. (Default: `1`)
+
+        window_size : int, optional
+            Size of chromosome/contig to process at a time.
+            (Default: `1000000`)
+
+        dtype : :class:`numpy.dtype` or str, optional
+            Type of values in returned array. Integer types such as `uint32`
+            save memory for rules that map integer :term:`counts`, but
+            truncate fractional counts, e.g. from |CenterMapFactory|.
+            (Default: `float64`)
         
         Returns
         -------
@@ -975,15 +2105,13 @@ class BAMGenomeArray(AbstractGenomeArray):
         if array_type is None:
             array_type = GenomeArray
             
-        ga = array_type(chr_lengths=self.lengths(),strands=self.strands())
-        for chrom in self.chroms():
-            for strand in self.strands():
-                seg = GenomicSegment(chrom,0,self.lengths()[chrom]-1,strand)
-                ga[seg] = self[seg]
+        ga = array_type(chr_lengths=self.lengths(),strands=self.strands(),dtype=dtype)
+        for tile, counts in self._iter_tiles(self.strands(),window_size,processes=processes):
+            ga.__setitem__(GenomicSegment(*tile),counts,roi_order=False)
 
         return ga
 
-    def to_variable_step(self,fh,trackname,strand,window_size=100000,printer=None,**kwargs):
+    def to_variable_step(self,fh,trackname,strand,window_size=100000,printer=None,processes=1,**kwargs):
         """Write the contents of the |BAMGenomeArray| to a variableStep `Wiggle`_ file
         under the mapping rule set by :meth:`~BAMGenomeArray.set_mapping`.
         
@@ -1007,6 +2135,11 @@ class BAMGenomeArray(AbstractGenomeArray):
         printer : file-like, optional
             Something implementing a write() method for output
 
+        processes : int, optional
+            Number of processes across which to divide the genome. Windows
+            are mapped in parallel and written in order. Mapping rules and
+            filters must be picklable. (Default: `1`)
+
         **kwargs
             Any other key-value pairs to include in track definition line
         """
@@ -1018,22 +2151,17 @@ class BAMGenomeArray(AbstractGenomeArray):
                 fh.write(" %s=%s" % (k,v))
         fh.write("\n")
 
-        for chrom in sorted(self.chroms()):
-            my_size = self.lengths()[chrom]
-            printer.write("Writing chromosome %s..." % chrom)
-            fh.write("variableStep chrom=%s span=1\n" % chrom)
-            window_starts = xrange(0,self._chr_lengths[chrom],window_size)
-            for my_start in window_starts:
-                my_end = min(my_start + window_size,my_size)
-                my_counts = self.get(GenomicSegment(chrom,my_start,my_end,strand),
-                                    roi_order=False)
-                if my_counts.sum() > 0:
-                    for idx in my_counts.nonzero()[0]:
-                        genomic_x = my_start + idx
-                        val = my_counts[idx]
-                        fh.write("%s\t%s\n" % (genomic_x + 1,val))
-
-    def to_bedgraph(self,fh,trackname,strand,window_size=100000,printer=None,**kwargs):
+        last_chrom = None
+        for (chrom,my_start,my_end,_), my_counts in self._iter_tiles([strand],window_size,processes=processes):
+            if chrom != last_chrom:
+                printer.write("Writing chromosome %s..." % chrom)
+                fh.write("variableStep chrom=%s span=1\n" % chrom)
+                last_chrom = chrom
+
+            positions = my_counts.nonzero()[0]
+            _write_variable_step_values(fh,my_start + positions,my_counts[positions])
+
+    def to_bedgraph(self,fh,trackname,strand,window_size=100000,printer=None,processes=1,**kwargs):
         """Write the contents of the |BAMGenomeArray| to a `bedGraph`_ file
         under the mapping rule set by :meth:`~BAMGenomeArray.set_mapping`.
         
@@ -1058,6 +2186,11 @@ class BAMGenomeArray(AbstractGenomeArray):
         printer : file-like, optional
             Something implementing a write() method for output
 
+        processes : int, optional
+            Number of processes across which to divide the genome. Windows
+            are mapped in parallel and written in order. Mapping rules and
+            filters must be picklable. (Default: `1`)
+
         **kwargs
             Any other key-value pairs to include in track definition line
         """
@@ -1071,36 +2204,345 @@ class BAMGenomeArray(AbstractGenomeArray):
                 fh.write(" %s=%s" % (k,v))
         fh.write("\n")
         
-        for chrom in sorted(self.chroms()):
-            printer.write("Writing chromosome %s..." % chrom)
-            window_starts = xrange(0,self._chr_lengths[chrom],window_size)
-            my_size = self.lengths()[chrom]
-            for my_start in window_starts:
-                my_end   = min(my_start + window_size,my_size) 
-                my_counts = self.get(GenomicSegment(chrom,my_start,my_end,strand),roi_order=False)
-                
-                if my_counts.sum() > 0:
-                    genomic_start_x = my_start
-                    last_val        = my_counts[0]
-
-                    for x, val in enumerate(my_counts[1:]):
-                        if val != last_val:
-                            genomic_end_x = 1 + x + my_start
-                            #write line: chrom chromStart chromEnd dataValue. 0-based half-open
-                            if last_val > 0:
-                                fh.write("%s\t%s\t%s\t%s\n" % (chrom,genomic_start_x,genomic_end_x,last_val))
-                            
-                            #update variables
-                            last_val = val
-                            genomic_start_x = genomic_end_x
-                        else:
-                            continue
-                    # write out last values for window
-                    if last_val > 0:
-                        fh.write("%s\t%s\t%s\t%s\n" % (chrom,genomic_start_x,
-                                                       my_end,
-                                                       last_val))
+        last_chrom = None
+        for (chrom,my_start,my_end,_), my_counts in self._iter_tiles([strand],window_size,processes=processes):
+            if chrom != last_chrom:
+                printer.write("Writing chromosome %s..." % chrom)
+                last_chrom = chrom
+
+            starts, ends, values = _value_runs(my_counts)
+            _write_bedgraph_runs(fh,chrom,my_start + starts,my_start + ends,values)
+
+
+
+class MultiSampleBAMGenomeArray(AbstractGenomeArray):
+    """
+    MultiSampleBAMGenomeArray(*samples,mapping=CenterMapFactory(),sample_names=None)
+
+    A GenomeArray for :term:`read alignments` from several samples (e.g.
+    biological replicates, or conditions), each held in one or more `BAM`_ files.
+
+    Unlike a |BAMGenomeArray|, which sums all of its `BAM`_ files into a single
+    track, a |MultiSampleBAMGenomeArray| keeps samples separate. Counts fetched
+    from a region of interest are returned as a 2D array with one row per
+    sample, so that all samples may be fetched in a single call. Mapping rules
+    and filters are shared by all samples. Sums and normalization are tracked
+    separately for each sample.
+
+    Parameters
+    ----------
+    samples : One or more filenames, open :class:`pysam.AlignmentFile`, or lists of these
+        `BAM`_ files for each sample. If a sample is given as a list, all
+        `BAM`_ files in the list are summed into that sample. Note: all `BAM`_
+        files must be sorted and indexed by `samtools`_.
+
+    mapping : func, optional
+        :term:`mapping function` used for all samples. See |BAMGenomeArray|.
+        (Default: :func:`CenterMapFactory`)
+
+    sample_names : list of str, optional
+        Names for each sample. (Default: `sample_0`, `sample_1`, et c)
+
+
+    Attributes
+    ----------
+    samples : list
+        |BAMGenomeArray| for each sample
+
+    sample_names : list
+        Names of each sample, in the same order as rows of fetched arrays
+
+
+    Notes
+    -----
+    For :term:`mapping rules <mapping rule>` that themselves return
+    multidimensional arrays (e.g. |StratifiedVariableFivePrimeMapFactory|),
+    samples are added as a new first axis.
+    """
+
+    def __init__(self,*samples,**kwargs):
+        """Create a |MultiSampleBAMGenomeArray|
+
+        Parameters
+        ----------
+        samples : One or more filenames, open :class:`pysam.AlignmentFile`, or lists of these
+            `BAM`_ files for each sample. If a sample is given as a list, all
+            `BAM`_ files in the list are summed into that sample.
+
+        mapping : func, optional
+            :term:`mapping function` used for all samples. See |BAMGenomeArray|.
+            (Default: :func:`CenterMapFactory`)
+
+        sample_names : list of str, optional
+            Names for each sample. (Default: `sample_0`, `sample_1`, et c)
+        """
+        if len(samples) == 0:
+            raise ValueError("MultiSampleBAMGenomeArray: at least one sample is required.")
+
+        mapping      = kwargs.get("mapping",CenterMapFactory())
+        sample_names = kwargs.get("sample_names",None)
+        if sample_names is None:
+            sample_names = ["sample_%s" % X for X in range(len(samples))]
+        elif len(sample_names) != len(samples):
+            raise ValueError("MultiSampleBAMGenomeArray: got %s sample names for %s samples." % (len(sample_names),len(samples)))
+
+        self.samples      = [BAMGenomeArray(X if isinstance(X,list) else [X],mapping=mapping) for X in samples]
+        self.sample_names = list(sample_names)
+        self._strands     = ("+","-",".")
+        self._normalize   = False
+
+        self._chr_lengths = {}
+        for sample in self.samples:
+            for k,v in sample.lengths().items():
+                self._chr_lengths[k] = max(self._chr_lengths.get(k,0),v)
+
+        self._chroms = sorted(list(self._chr_lengths.keys()))
+        self.reset_sum()
+
+    def chroms(self):
+        """Returns a list of chromosomes present in any sample
+        
+        Returns
+        -------
+        list
+            sorted chromosome names as strings
+        """
+        return self._chroms
+
+    def lengths(self):
+        """Returns a dictionary mapping chromosome names to lengths. If a
+        chromosome has different lengths in different samples, the maximum
+        is taken.
+        
+        Returns
+        -------
+        dict
+            Dictionary mapping chromosome names to chromosome lengths
+        """
+        return self._chr_lengths
 
+    def reset_sum(self):
+        """Reset the sum of each sample to its total number of mapped reads.
+        See :meth:`BAMGenomeArray.reset_sum`
+        """
+        for sample in self.samples:
+            sample.reset_sum()
+
+        self._sum = numpy.array([X.sum() for X in self.samples])
+
+    def set_sum(self,val):
+        """Set sums used for normalization of each sample to arbitrary values
+
+        Parameters
+        ----------
+        val : sequence of int or float
+            One number per sample
+        """
+        if len(val) != len(self.samples):
+            raise ValueError("MultiSampleBAMGenomeArray: got %s sums for %s samples." % (len(val),len(self.samples)))
+
+        for sample, my_sum in zip(self.samples,val):
+            sample.set_sum(my_sum)
+
+        self._sum = numpy.array(val)
+
+    def sum(self):
+        """Return the total number of aligned reads in each sample
+
+        Unlike other GenomeArrays, which return a scalar, this returns one
+        value per sample. So, expressions like ``1e6 / ga.sum()`` yield an
+        array of per-sample factors, which broadcast along the first axis of
+        arrays returned by :meth:`~MultiSampleBAMGenomeArray.get` only after
+        reshaping (e.g. ``(1e6 / ga.sum())[:,None]``).
+
+        Returns
+        -------
+        numpy.ndarray
+            Sum for each sample, in the order of :attr:`sample_names`
+        """
+        return self._sum
+
+    def set_normalize(self,value=True):
+        """Toggle normalization of reported values to reads per million mapped
+        in each sample. Each sample is normalized by its own sum.
+
+        Parameters
+        ----------
+        value : bool
+            If `True`, all values fetched will be normalized to reads
+            per million. If `False`, all values will not be normalized.
+        """
+        assert value in (True,False)
+        self._normalize = value
+        for sample in self.samples:
+            sample.set_normalize(value)
+
+    def set_mapping(self,mapping_function):
+        """Change the mapping rule for all samples. See :meth:`BAMGenomeArray.set_mapping`
+
+        Parameters
+        ----------
+        mapping : func
+            Function that determines how each read alignment is mapped to a 
+            count at a position
+        """
+        for sample in self.samples:
+            sample.set_mapping(mapping_function)
+
+        self.reset_sum()
+
+    def add_filter(self,name,func):
+        """Add a read filter to all samples. See :meth:`BAMGenomeArray.add_filter`
+
+        Parameters
+        ----------
+        name : str
+            A name for the filter. If not unique, will overwrite
+            previous filter
+        
+        func : func
+            Filter function
+        """
+        for sample in self.samples:
+            sample.add_filter(name,func)
+
+    def remove_filter(self,name):
+        """Remove a read filter from all samples
+
+        Parameters
+        ----------
+        name : str
+            A name for the filter
+
+        Returns
+        -------
+        func
+            the removed filter function
+        """
+        for sample in self.samples:
+            retval = sample.remove_filter(name)
+
+        return retval
+
+    def _stack(self,count_arrays,roi):
+        """Stack per-sample count arrays for `roi` along a new first axis,
+        substituting zeros for samples lacking the chromosome of `roi`"""
+        shape = list(getattr(self.samples[0].map_fn,"shape",[])) + [len(roi)]
+        return numpy.array([X if X.shape[-1] == len(roi) else numpy.zeros(shape) for X in count_arrays])
+
+    def __getitem__(self,roi):
+        """Retrieve counts for each sample from a region of interest. See
+        :meth:`~MultiSampleBAMGenomeArray.get`
+
+        Parameters
+        ----------
+        roi : |GenomicSegment| or |SegmentChain|
+            Region of interest in genome
+
+        Returns
+        -------
+        numpy.ndarray
+            2D array of counts, with one row per sample and one column per
+            position in `roi`, from 5' to 3' relative to `roi`
+        """
+        return self.get(roi,roi_order=True)
+
+    def get(self,roi,roi_order=True):
+        """Retrieve counts for each sample from a region of interest, following
+        the mapping rule set by :meth:`~MultiSampleBAMGenomeArray.set_mapping`.
+
+        Counts for each sample are fetched by :meth:`BAMGenomeArray.get` and
+        copied into one row of the returned array. Each sample is held in its
+        own `BAM`_ file(s), so reads are fetched once per sample, rather than in
+        a single pass.
+
+        Parameters
+        ----------
+        roi : |GenomicSegment| or |SegmentChain|
+            Region of interest in genome
+
+        roi_order : bool, optional
+            If `True` (default) return values 5' to 3' relative to
+            `roi` rather than genome.
+
+        Returns
+        -------
+        numpy.ndarray
+            2D array of counts, with one row per sample and one column per
+            position in `roi`
+
+        See also
+        --------
+        plastid.genomics.roitools.SegmentChain.get_counts
+            Fetch spliced counts covering a |SegmentChain|. When called with a
+            |MultiSampleBAMGenomeArray|, the sample axis is kept.
+        """
+        if isinstance(roi,SegmentChain):
+            return roi.get_counts(self)
+
+        shape = [len(self.samples)] + list(getattr(self.samples[0].map_fn,"shape",[])) + [len(roi)]
+        count_array = numpy.zeros(shape)
+        for row, sample in zip(count_array,self.samples):
+            if roi.chrom in sample.chroms():
+                row[...] = sample.get(roi,roi_order=False)
+
+        if roi_order == True and roi.strand == "-":
+            count_array = count_array[...,::-1]
+
+        return count_array
+
+    def get_many(self,rois,roi_order=True,max_window_size=MAX_FETCH_WINDOW):
+        """Retrieve counts for each sample from many regions of interest at once.
+        Each sample's `BAM`_ file(s) are read in a single pass over `rois`, as
+        in :meth:`BAMGenomeArray.get_many`, so there is one pass per sample
+
+        Parameters
+        ----------
+        rois : list of |GenomicSegment|
+            Regions of interest in genome
+
+        roi_order : bool, optional
+            If `True` (default) return values 5' to 3' relative to
+            each region rather than genome.
+
+        max_window_size : int, optional
+            Maximum size, in nucleotides, of a merged window. (Default: `1000000`)
+
+        Returns
+        -------
+        list
+            List of 2D :class:`numpy.ndarray`, one per region in `rois`, each
+            with one row per sample
+        """
+        rois = list(rois)
+        by_sample = [X.get_many(rois,roi_order=roi_order,max_window_size=max_window_size) for X in self.samples]
+        return [self._stack(X,roi) for roi, X in zip(rois,zip(*by_sample))]
+
+    def get_counts_many(self,chains,stranded=True,max_window_size=MAX_FETCH_WINDOW):
+        """Retrieve spliced counts for each sample for many |SegmentChains| at once.
+        See :meth:`BAMGenomeArray.get_counts_many`
+
+        Parameters
+        ----------
+        chains : list of |SegmentChain|
+            Chains for which to fetch counts
+
+        stranded : bool, optional
+            If `True` (default), reverse counts for minus-strand chains so
+            that they run 5' to 3'.
+
+        max_window_size : int, optional
+            Maximum size, in nucleotides, of a merged window. (Default: `1000000`)
+
+        Returns
+        -------
+        list
+            List of 2D :class:`numpy.ndarray`, one per chain in `chains`, each
+            with one row per sample
+        """
+        chains = list(chains)
+        by_sample = [X.get_counts_many(chains,stranded=stranded,max_window_size=max_window_size) for X in self.samples]
+        return [numpy.array(X) for X in zip(*by_sample)]
 
 
 class BigWigGenomeArray(AbstractGenomeArray):
@@ -1114,9 +2556,14 @@ class BigWigGenomeArray(AbstractGenomeArray):
         Maximum desired memory footprint for C objects, in megabytes.
         May be temporarily exceeded if large queries are requested.
         (Default: 0, No maximum)        
+
+    sum_sidecar : bool, optional
+        If `True`, store the exact sum of each `BigWig`_ file in a sidecar
+        file beside it, and reuse it on later runs. See :meth:`BigWigReader.sum`
+        (Default: `False`)
     
     """
-    def __init__(self,maxmem=0,**kwargs): #,fill=0.0):
+    def __init__(self,maxmem=0,sum_sidecar=False,**kwargs): #,fill=0.0):
         """Create a |BigWigGenomeArray|.
         
         `BigWig`_ files may be added to the array via
@@ -1128,6 +2575,10 @@ class BigWigGenomeArray(AbstractGenomeArray):
             Maximum desired memory footprint for C objects, in megabytes.
             May be temporarily exceeded if large queries are requested.
             (Default: 0, No maximum)        
+
+        sum_sidecar : bool, optional
+            If `True`, store the exact sum of each `BigWig`_ file in a sidecar
+            file beside it, and reuse it on later runs. (Default: `False`)
         """
 #         """
 #         
@@ -1145,6 +2596,7 @@ class BigWigGenomeArray(AbstractGenomeArray):
         self._lengths   = None
         self._strands   = []
         self._maxmem    = maxmem
+        self._sum_sidecar = sum_sidecar
         self.fill       = 0.0 # fill
     
     def __getitem__(self,roi):
@@ -1211,6 +2663,59 @@ class BigWigGenomeArray(AbstractGenomeArray):
             count_vec = count_vec[::-1]
             
         return count_vec
+
+    def get_many(self,rois,roi_order=True,out=None):
+        """Retrieve arrays of counts for many regions of interest at once,
+        writing them into a single buffer rather than allocating one array
+        per region and per `BigWig`_ file. See :meth:`BigWigReader.get_many`
+
+        Parameters
+        ----------
+        rois : list of |GenomicSegment|
+            Regions of interest in genome
+
+        roi_order : bool, optional
+            If `True` (default) write values for each region 5' to 3'
+            relative to the region rather than genome.
+
+        out : :class:`numpy.ndarray`, optional
+            C-contiguous `float64` buffer to fill, 2D with one row per region,
+            or 1D holding all regions consecutively, as described in
+            :meth:`BigWigReader.get_many`. Existing contents are overwritten.
+            If `None`, a 2D buffer as wide as the longest region is allocated
+
+        Returns
+        -------
+        :class:`numpy.ndarray`
+            `out`, filled
+        """
+        rois    = list(rois)
+        lengths = numpy.array([len(X) for X in rois],dtype=numpy.int64)
+        if out is None:
+            out = numpy.zeros((len(rois),lengths.max() if len(rois) > 0 else 0))
+        else:
+            out[...] = 0
+
+        offsets, flat = many_offsets(out,lengths)
+
+        by_strand = {}
+        for n, roi in enumerate(rois):
+            by_strand.setdefault(roi.strand,[]).append(n)
+
+        sdict = self._strand_dict
+        for strand, idx in by_strand.items():
+            if strand not in sdict:
+                warn("Strand '%s' not in BigWigGenomeArray (has %s)." % (strand,", ".join(sdict.keys())),DataWarning)
+                continue
+
+            my_rois = [rois[X] for X in idx]
+            for bw in sdict[strand]:
+                bw.fill_many(my_rois,offsets[idx],flat,roi_order=roi_order,add=True)
+
+        if self._normalize is True:
+            flat *= 1e6 / float(self.sum())
+
+        return out
         
     def strands(self):
         """Return a tuple of strands in the GenomeArray
@@ -1287,24 +2792,36 @@ class BigWigGenomeArray(AbstractGenomeArray):
             
         self._strands = sorted(self._strand_dict.keys())
 
-    def reset_sum(self):
-        """Reset sum to total of data in the |BigWigGenomeArray|"""
+    def reset_sum(self,processes=1):
+        """Reset sum to total of data in the |BigWigGenomeArray|
+
+        Parameters
+        ----------
+        processes : int, optional
+            Number of processes across which to divide chromosomes of each
+            `BigWig`_ file when summing. (Default: `1`)
+        """
         my_sum = 0
         for ltmp in self._strand_dict.values():
             for bw in ltmp:
-                my_sum += bw.sum()
+                my_sum += bw.sum(processes=processes,sidecar=self._sum_sidecar)
  
         self._sum = my_sum       
         return my_sum
     
-    def to_genome_array(self):
+    def to_genome_array(self,dtype=numpy.float64):
         """Converts |BigWigGenomeArray| to a |GenomeArray|
 
+        Parameters
+        ----------
+        dtype : :class:`numpy.dtype` or str, optional
+            Type of values in returned array. (Default: `float64`)
+
         Returns
         -------
         |GenomeArray|
         """
-        ga = GenomeArray(chr_lengths=self.lengths(),strands=self.strands())
+        ga = GenomeArray(chr_lengths=self.lengths(),strands=self.strands(),dtype=dtype)
         for chrom, length in self.lengths().items():
             for strand in self._strands:
                 region = GenomicSegment(chrom,0,length,strand)
@@ -1345,9 +2862,23 @@ class GenomeArray(MutableAbstractGenomeArray):
     
     strands : sequence
         Sequence of strand names for the |GenomeArray|. (Default: `('+','-')`)    
+
+    storage_dir : str or `None`, optional
+        If given, chromosome-strand arrays are stored in :class:`numpy.memmap`
+        files in this directory, alongside a small manifest, rather than in
+        RAM. The directory is created if it does not exist, and any array
+        previously stored there is overwritten. Use :meth:`from_storage` to
+        reopen the array later, or from another process. (Default: `None`,
+        hold arrays in memory)
+
+    dtype : :class:`numpy.dtype` or str, optional
+        Type of values held in the array. Integer types such as `uint32`
+        take a half or less of the memory of the default, and suffice
+        for read :term:`counts`. Values set in the array are cast to
+        this type. (Default: `float64`)
     """
     def __init__(self,chr_lengths=None,strands=None,
-                 min_chr_size=MIN_CHR_SIZE):
+                 min_chr_size=MIN_CHR_SIZE,storage_dir=None,dtype=numpy.float64):
         """Create a |GenomeArray|
         
         Parameters
@@ -1369,23 +2900,250 @@ class GenomeArray(MutableAbstractGenomeArray):
         
         strands : sequence
             Sequence of strand names for the |GenomeArray|. (Default: `('+','-')`)
+
+        storage_dir : str or `None`, optional
+            If given, back chromosome-strand arrays with :class:`numpy.memmap`
+            files in this directory instead of holding them in RAM.
+            (Default: `None`)
+
+        dtype : :class:`numpy.dtype` or str, optional
+            Type of values held in the array. (Default: `float64`)
+        """
+        self._chroms       = {}
+        self.dtype         = numpy.dtype(dtype)
+        self._strands      = _DEFAULT_STRANDS if strands is None else strands
+        self.min_chr_size  = min_chr_size
+        self._sum          = None
+        self._normalize    = False
+        self._storage_dir  = storage_dir
+        self._storage_mode = None
+        self._storage_files = {}
+        self._buffers      = {}
+        self._data_sum     = _sum_dtype(self.dtype).type(0).item()
+        if storage_dir is not None:
+            if not os.path.isdir(storage_dir):
+                os.makedirs(storage_dir)
+            self._storage_mode = "w+"
+            
+        if chr_lengths is not None:
+            for chrom in chr_lengths.keys():
+                self._add_chrom(chrom,chr_lengths[chrom])
+
+        if storage_dir is not None:
+            self._write_manifest()
+
+    @staticmethod
+    def from_storage(storage_dir,mode="r"):
+        """Reopen a |GenomeArray| previously created with `storage_dir`.
+        Data are memory-mapped from disk rather than read into RAM, so
+        large arrays open immediately, and several processes may open
+        the same directory at once.
+
+        Parameters
+        ----------
+        storage_dir : str
+            Directory passed as `storage_dir` when the array was created
+
+        mode : str, choice of `'r'` or `'r+'`, optional
+            If `'r'` (default), the array is read-only: values may not be
+            set, and regions beyond the ends of chromosomes read as zero
+            rather than growing the array. If `'r+'`, changes are written
+            back to the files in `storage_dir`.
+
+        Returns
+        -------
+        |GenomeArray|
+        """
+        if mode not in ("r","r+"):
+            raise ValueError("GenomeArray.from_storage(): mode must be 'r' or 'r+', not '%s'." % mode)
+
+        with open(os.path.join(storage_dir,_STORAGE_MANIFEST)) as fh:
+            manifest = json.load(fh)
+
+        if manifest.get("format") != _STORAGE_FORMAT:
+            raise ValueError("'%s' does not contain a stored GenomeArray." % storage_dir)
+
+        ga = GenomeArray(strands=tuple(manifest["strands"]),
+                         min_chr_size=manifest["min_chr_size"],
+                         dtype=manifest["dtype"])
+        ga._storage_dir  = storage_dir
+        ga._storage_mode = mode
+        ga._data_sum     = None
+        for chrom, info in manifest["chroms"].items():
+            ga._chroms[chrom] = {}
+            ga._storage_files[chrom] = info["files"]
+            for strand in ga._strands:
+                ga._chroms[chrom][strand] = numpy.memmap(os.path.join(storage_dir,info["files"][strand]),
+                                                         dtype=manifest["dtype"],
+                                                         mode=mode,
+                                                         shape=(info["length"],))
+        return ga
+
+    def _add_chrom(self,chrom,length):
+        """Allocate zero-filled arrays for each strand of a new chromosome,
+        in memory or, if the |GenomeArray| has a `storage_dir`, on disk.
+
+        Parameters
+        ----------
+        chrom : str
+            Chromosome name
+
+        length : int
+            Length of chromosome
+        """
+        self._chroms[chrom] = {}
+        if self._storage_dir is None:
+            for strand in self._strands:
+                self._chroms[chrom][strand] = numpy.zeros(length,dtype=self.dtype)
+        else:
+            n = len(self._storage_files)
+            files = {}
+            for strand in self._strands:
+                fn = "chrom%06d_%s.dat" % (n,_CACHE_STRAND_NAMES.get(strand,"s%s" % len(files)))
+                files[strand] = fn
+                self._chroms[chrom][strand] = numpy.memmap(os.path.join(self._storage_dir,fn),
+                                                           dtype=self.dtype,
+                                                           mode="w+",
+                                                           shape=(length,))
+            self._storage_files[chrom] = files
+
+    def _resize_chrom(self,chrom,new_size):
+        """Grow all strands of a chromosome to `new_size`, padding with zeros
+
+        In-memory strands are views of larger buffers. When a buffer is
+        full, it is replaced by one :data:`CHROM_GROWTH_FACTOR` times larger,
+        so that growing a chromosome many times copies it only a logarithmic
+        number of times. Memory-mapped strands are extended on disk instead.
+        
+        Parameters
+        ----------
+        chrom : str
+            Chromosome name
+
+        new_size : int
+            New length of chromosome
+        """
+        if new_size < len(self._chroms[chrom][self._strands[0]]):
+            self._data_sum = None
+
+        if self._storage_dir is None:
+            buffers = self._buffers.setdefault(chrom,{})
+            for my_strand in self.strands():
+                vec = self._chroms[chrom][my_strand]
+                buf = buffers.get(my_strand)
+                if buf is None or vec.base is not buf:
+                    # array was replaced, e.g. by arithmetic, since last resize
+                    buf = vec
+
+                if new_size > len(buf):
+                    capacity = max(new_size,int(CHROM_GROWTH_FACTOR*len(buf)))
+                    buf = numpy.zeros(capacity,dtype=vec.dtype)
+                    buf[:len(vec)] = vec
+                else:
+                    # clear any values left past the end by an earlier shrink
+                    buf[len(vec):new_size] = 0
+
+                buffers[my_strand] = buf
+                self._chroms[chrom][my_strand] = buf[:new_size]
+        else:
+            # memmap extends the underlying file with zeros when reopened
+            # with a larger shape in mode 'r+'
+            for my_strand in self.strands():
+                old = self._chroms[chrom][my_strand]
+                old.flush()
+                self._chroms[chrom][my_strand] = numpy.memmap(old.filename,
+                                                              dtype=old.dtype,
+                                                              mode="r+",
+                                                              shape=(new_size,))
+                del old
+            self._write_manifest()
+
+    def _write_manifest(self):
+        """Write the manifest describing chromosomes, strands, lengths and
+        files of a |GenomeArray| with a `storage_dir`
         """
-        self._chroms       = {}
-        self._strands      = _DEFAULT_STRANDS if strands is None else strands
-        self.min_chr_size  = min_chr_size
-        self._sum          = None
-        self._normalize    = False
-        if chr_lengths is not None:
-            for chrom in chr_lengths.keys():
-                self._chroms[chrom] = {}
+        manifest = { "format"       : _STORAGE_FORMAT,
+                     "version"      : 1,
+                     "dtype"        : self.dtype.str,
+                     "strands"      : list(self._strands),
+                     "min_chr_size" : self.min_chr_size,
+                     "chroms"       : {},
+                   }
+        for chrom in self._chroms:
+            manifest["chroms"][chrom] = { "length" : len(self._chroms[chrom][self._strands[0]]),
+                                          "files"  : self._storage_files[chrom],
+                                        }
+        
+        fn = os.path.join(self._storage_dir,_STORAGE_MANIFEST)
+        tmp = "%s.%s.tmp" % (fn,os.getpid())
+        with open(tmp,"w") as fout:
+            json.dump(manifest,fout,indent=1,sort_keys=True)
+        os.rename(tmp,fn)
+
+    def flush(self):
+        """Write any pending changes in a |GenomeArray| created with
+        `storage_dir` to disk. Has no effect on in-memory arrays.
+        """
+        if self._storage_dir is not None and self._storage_mode != "r":
+            for chrom in self._chroms:
                 for strand in self._strands:
-                    l = chr_lengths[chrom]
-                    self._chroms[chrom][strand] = numpy.zeros(l)
+                    self._chroms[chrom][strand].flush()
+            self._write_manifest()
+
+    def __getstate__(self):
+        # arrays backed by files are reopened from disk rather than copied
+        # when pickled, e.g. when passed to worker processes
+        state = self.__dict__.copy()
+        if state.get("_storage_dir") is not None:
+            self.flush()
+            state["_chroms"] = None
+
+        # spare capacity is not worth copying. Strands are pickled at their lengths
+        state["_buffers"] = {}
+        return state
+
+    def __setstate__(self,state):
+        self.__dict__.update(state)
+        self.__dict__.setdefault("_buffers",{})
+        self.__dict__.setdefault("_data_sum",None)
+        if state.get("_storage_dir") is not None and state["_chroms"] is None:
+            mode = "r+" if self._storage_mode == "w+" else self._storage_mode
+            self._chroms = GenomeArray.from_storage(self._storage_dir,mode=mode)._chroms
+            self._storage_mode = mode
+            self._data_sum = None
 
     def reset_sum(self):
         """Reset the sum of the |GenomeArray| to the sum of all positions in the array
         """
-        self._sum = sum([X.sum() for X in self.iterchroms()])
+        # accumulate in widest type of same kind, so small integer types don't overflow
+        sum_dtype = _sum_dtype(self.dtype)
+        self._data_sum = sum([X.sum(dtype=sum_dtype).item() for X in self.iterchroms()])
+        self._sum = self._data_sum
+
+    def sum(self):
+        """Return the sum of the quantitative data across all positions in
+        the |GenomeArray|, or the value given to :meth:`set_sum`
+
+        Notes
+        -----
+        The sum of the data is updated as values are set, so that it need not
+        be recomputed over the whole genome. A value given to :meth:`set_sum`
+        is kept until values are next set.
+
+        The true (i.e. unnormalized) sum is always reported, even if 
+        :meth:`set_normalize` is set to True
+        
+        Returns
+        -------
+        int or float
+        """
+        if self._sum is None:
+            if self._data_sum is None:
+                self.reset_sum()
+            else:
+                self._sum = self._data_sum
+
+        return self._sum
         
     def _has_same_dimensions(self,other):
         """Return `True` if `self` and `other` have the chromosomes, strands, and chromosome lengths
@@ -1497,25 +3255,19 @@ class GenomeArray(MutableAbstractGenomeArray):
         strand = roi.strand
         start  = roi.start
         end    = roi.end
-        try:
-            assert roi.end < len(self._chroms[chrom][strand])
-        except AssertionError:
-            my_len = len(self._chroms[chrom][strand])
-            new_size = max(my_len + 10000,end + 10000)
-            for my_strand in self.strands():
-                new_strand = copy.deepcopy(self._chroms[roi.chrom][my_strand])
-                new_strand.resize(new_size)
-                self._chroms[chrom][my_strand] = new_strand
-        except KeyError:
+        if self._storage_mode == "r":
+            # read-only arrays can't grow, so pad with zeros instead
             assert strand in self.strands()
-            if chrom not in self.keys():
-                self._chroms[chrom] = {}
-                for my_strand in self.strands():
-                    self._chroms[chrom][my_strand] = numpy.zeros(self.min_chr_size)
-        
-        vals = self._chroms[chrom][strand][start:end]
+            vals = numpy.zeros(end-start,dtype=self.dtype)
+            if chrom in self._chroms:
+                my_vals = self._chroms[chrom][strand][start:end]
+                vals[:len(my_vals)] = my_vals
+        else:
+            assert strand in self.strands()
+            self._ensure_chrom(chrom,end)
+            vals = self._chroms[chrom][strand][start:end]
         if self._normalize is True:
-            vals = 1e6 * vals / self.sum()
+            vals = vals * (1e6 / self.sum())
             
         if roi_order == True and strand == "-":
             vals = vals[::-1]
@@ -1578,24 +3330,28 @@ class GenomeArray(MutableAbstractGenomeArray):
         if strand == "-" and isinstance(val,numpy.ndarray) and roi_order == True:
             val = val[::-1]
 
-        try:
-            assert end < len(self._chroms[seg.chrom][seg.strand])
-        except AssertionError:
-            my_len = len(self._chroms[chrom][strand])
-            new_size = max(my_len + 10000,end + 10000)
-            for my_strand in self.strands():
-                # this looks silly; but resize() can't work in-place iwth refs to array
-                new_strand = copy.deepcopy(self._chroms[chrom][my_strand])
-                new_strand.resize(new_size)
-                self._chroms[chrom][my_strand]  = new_strand
-        except KeyError:
-            assert strand in self.strands()
-            if chrom not in self.keys():
-                self._chroms[chrom] = {}
-                for my_strand in self.strands():
-                    self._chroms[chrom][my_strand] = numpy.zeros(self.min_chr_size) 
-            
-        self._chroms[chrom][strand][start:end] = val
+        if self._storage_mode == "r":
+            self.set_normalize(old_normalize)
+            raise ValueError("Cannot set values in a GenomeArray opened read-only. Reopen with mode='r+'.")
+
+        assert strand in self.strands()
+        self._ensure_chrom(chrom,end)
+        vec = self._chroms[chrom][strand]
+        if self._data_sum is None:
+            vec[start:end] = val
+        elif isinstance(val,numpy.ndarray) and numpy.shares_memory(val,vec[start:end]):
+            # `val` is a view of storage, e.g. from ``ga[seg] += 1``, and so
+            # was changed before this call. The old sum is gone; recompute lazily
+            vec[start:end] = val
+            self._data_sum = None
+        else:
+            # update sum by the change in value, rather than recomputing it.
+            # python numbers are used, so differences of unsigned sums can be negative
+            sum_dtype = _sum_dtype(self.dtype)
+            old_sum = vec[start:end].sum(dtype=sum_dtype).item()
+            vec[start:end] = val
+            self._data_sum += vec[start:end].sum(dtype=sum_dtype).item() - old_sum
+
         self.set_normalize(old_normalize)
 
     def keys(self):
@@ -1682,12 +3438,18 @@ class GenomeArray(MutableAbstractGenomeArray):
                 d_out[key][strand] = self._chroms[key][strand].nonzero()[0]
         return d_out
     
-    def apply_operation(self,other,func,mode="same"):
+    def apply_operation(self,other,func,mode="same",inplace=False,threads=1,tile_size=OPERATION_TILE_SIZE):
         """Applies a binary operator to a copy of `self` and to `other` elementwise.
-        `other` may be a scalar quantity or another |GenomeArray|. In both cases,
-        a new |GenomeArray| is returned, and `self` is left unmodified.
-        If :meth:`set_normalize` is set to `True`, it is disabled during the
-        operation.
+        `other` may be a scalar quantity or another |GenomeArray| or
+        |SparseGenomeArray|. Unless `inplace` is `True`, a new |GenomeArray|
+        is returned, and `self` is left unmodified. If :meth:`set_normalize`
+        is set to `True`, it is disabled during the operation.
+
+        Chromosomes are processed in tiles of `tile_size` positions, so that
+        temporary arrays are small. Tiles are independent, and may be spread
+        over several threads. For :mod:`numpy` ufuncs and for the operators
+        in :mod:`operator` that match them, results are written directly to
+        the output without temporary arrays.
         
         Parameters
         ----------
@@ -1727,68 +3489,95 @@ class GenomeArray(MutableAbstractGenomeArray):
             Parents are not required to have the same chromosomes
             or strands; chromosomes or strands not common
             to both parents will be ignored.    
+
+        inplace : bool, optional
+            If `True`, write results into `self` and keep its `dtype`,
+            rather than allocating a new array. Other names bound to `self`
+            see the change. With mode `'all'`, chromosomes of `self` are
+            grown or added as needed. With mode `'truncate'`, positions
+            outside the common region are left unchanged. (Default: `False`)
+
+        threads : int, optional
+            Number of threads over which to divide tiles. (Default: `1`)
+
+        tile_size : int, optional
+            Positions per tile. (Default: `1000000`)
         
         Returns
         -------
         |GenomeArray|
-            new |GenomeArray| after the operation is applied
+            new |GenomeArray| after the operation is applied, or `self` if
+            `inplace` is `True`. The `dtype` of a new array follows :mod:`numpy`
+            type promotion rules for `func`, so that e.g. multiplying an integer
+            array by a float yields a float array
         """
-        new_array = GenomeArray.like(self)
+        if mode not in ("same","all","truncate"):
+            raise ValueError("Mode not understood. Must be 'same', 'all', or 'truncate.'")
+
+        if inplace == True and self._storage_mode == "r":
+            raise ValueError("Cannot set values in a GenomeArray opened read-only. Reopen with mode='r+'.")
+
+        _check_inplace_dtype(func,self.dtype,other,inplace)
+
         old_normalize = self._normalize
         if old_normalize == True:
             warn("Temporarily turning off normalization during value set. It will be re-enabled automatically when complete.",DataWarning)
 
-        if type(other) == self.__class__:
-            if mode == "same":       
-                self._has_same_dimensions(other)
-                for chrom in self.keys():
-                    for strand in self.strands():
-                        seg = GenomicSegment(chrom,0,len(self._chroms[chrom][strand]),strand)
-                        new_array[seg] = func(self[seg],other[seg])               
-            elif mode == "all":
-                chroms    = {}.fromkeys(set(self.keys()) | set(other.keys()))
-                strands   = set(self.strands()) | set(other.strands())
-                new_array = GenomeArray(chroms,strands=strands)
-                for chrom in chroms:
-                    if chrom in self.keys() and chrom in other.keys():
-                        for strand in strands:
-                            if strand in self.strands() and strand in other.strands():
-                                sc = copy.deepcopy(self._chroms[chrom][strand])
-                                oc = copy.deepcopy(other._chroms[chrom][strand])
-                                if len(sc) > len(oc):
-                                    oc.resize(len(sc),refcheck=False)
-                                elif len(oc) > len(sc):
-                                    sc.resize(len(oc),refcheck=False)
-                                new_array._chroms[chrom][strand] = func(sc,oc)
-                            elif strand in self.strands():
-                                new_array._chroms[chrom][strand] = func(copy.deepcopy(self._chroms[chrom][strand]),0)
-                            else:
-                                new_array._chroms[chrom][strand] = func(copy.deepcopy(other._chroms[chrom][strand]),0)
-                    elif chrom in self.keys():
-                        for strand in strands:
-                            new_array._chroms[chrom][strand] = func(copy.deepcopy(self[chrom][strand]),0)
-                    else:
-                        for strand in strands:
-                            new_array._chroms[chrom][strand] = func(copy.deepcopy(other[chrom][strand]),0)
-            elif mode == "truncate":
-                my_strands = set(self.strands()) & set(other.strands())
-                my_chroms  = set(self.chroms())  & set(other.chroms())
-                for chrom in my_chroms:
-                    for strand in my_strands:
-                        sc = copy.deepcopy(self._chroms[chrom][strand])
-                        oc = copy.deepcopy(other._chroms[chrom][strand])
-                        if len(sc) > len(oc):
-                            sc.resize(len(oc),refcheck=False)
-                        elif len(oc) > len(sc):
-                            oc.resize(len(sc),refcheck=False)
-                        new_array._chroms[chrom][strand] = func(sc,oc)
+        is_array  = isinstance(other,GenomeArray)
+        out_dtype = self.dtype if inplace == True else _result_dtype(func,self.dtype,other)
+        if not is_array:
+            pairs = [(X,Y) for X in self.keys() for Y in self.strands()]
+            new_array = self if inplace == True else GenomeArray.like(self,dtype=out_dtype)
+        elif mode == "same":
+            self._has_same_dimensions(other)
+            pairs = [(X,Y) for X in self.keys() for Y in self.strands()]
+            new_array = self if inplace == True else GenomeArray.like(self,dtype=out_dtype)
+        elif mode == "all":
+            my_lengths, other_lengths = self.lengths(), other.lengths()
+            lengths = { K : max(my_lengths.get(K,0),other_lengths.get(K,0)) for K in set(my_lengths) | set(other_lengths) }
+            strands = tuple(self.strands()) + tuple([X for X in other.strands() if X not in self.strands()])
+            if inplace == True:
+                if len(strands) > len(self.strands()):
+                    raise ValueError("Cannot add strands %s to GenomeArray in place." % ", ".join(strands[len(self.strands()):]))
+                self.reserve(lengths)
+                new_array = self
             else:
-                raise ValueError("Mode not understood. Must be 'same', 'all', or 'truncate.'")
-        else:
-            for chrom in self.keys():
-                for strand in self.strands():
-                    new_array._chroms[chrom][strand] = func(self._chroms[chrom][strand],other)
-
+                new_array = GenomeArray(lengths,strands=strands,dtype=out_dtype)
+            pairs = [(X,Y) for X in lengths for Y in strands]
+        else: # truncate
+            my_lengths, other_lengths = self.lengths(), other.lengths()
+            strands = [X for X in self.strands() if X in other.strands()]
+            chroms  = [X for X in my_lengths if X in other_lengths]
+            new_array = self if inplace == True else GenomeArray.like(self,dtype=out_dtype)
+            pairs = []
+            for chrom in chroms:
+                length = min(my_lengths[chrom],other_lengths[chrom])
+                if inplace == False and length < my_lengths[chrom]:
+                    new_array._resize_chrom(chrom,length)
+                pairs.extend([(chrom,X) for X in strands])
+
+        # read-only access to sparse vectors from several threads is safe once buffers are merged
+        tasks = []
+        for chrom, strand in pairs:
+            out   = new_array._chroms[chrom][strand]
+            mine  = self._chroms.get(chrom,{}).get(strand)
+            theirs = other._chroms.get(chrom,{}).get(strand) if is_array else other
+            if isinstance(theirs,_SparseVector):
+                theirs._consolidate()
+
+            length = len(out)
+            if is_array and mode == "truncate":
+                length = min(length,len(theirs))
+
+            for start in range(0,length,tile_size):
+                end = min(start + tile_size,length)
+                tasks.append(functools.partial(_apply_tile,func,out,mine,theirs,start,end))
+
+        _run_tasks(tasks,threads)
+
+        # chromosomes were written directly, so the sum must be recomputed
+        new_array._sum      = None
+        new_array._data_sum = None
         self.set_normalize(old_normalize)
         return new_array
         
@@ -1902,6 +3691,45 @@ class GenomeArray(MutableAbstractGenomeArray):
         |GenomeArray|
         """
         return self.__add__(other*-1)
+
+    def _inplace_operation(self,other,func):
+        """Apply `func` to `self` and `other`, writing into `self` if the result
+        keeps the `dtype` of `self`. Other names bound to `self` see the change.
+        Otherwise, e.g. when adding floats to an integer array, a new promoted
+        array is returned, as by the corresponding binary operator.
+
+        Parameters
+        ----------
+        other : |GenomeArray| or scalar
+            Second argument
+
+        func : func
+            :func:`operator.add`, :func:`operator.sub`, or :func:`operator.mul`
+
+        Returns
+        -------
+        |GenomeArray|
+            `self`, or a new array
+        """
+        if _result_dtype(func,self.dtype,other) != self.dtype:
+            return func(self,other)
+
+        return self.apply_operation(other,func,mode="all",inplace=True)
+
+    def __iadd__(self,other):
+        """Add `other` to `self`, in place if the result keeps the `dtype` of `self`.
+        See :meth:`_inplace_operation`"""
+        return self._inplace_operation(other,operator.add)
+
+    def __isub__(self,other):
+        """Subtract `other` from `self`, in place if the result keeps the `dtype` of `self`.
+        See :meth:`_inplace_operation`"""
+        return self._inplace_operation(other,operator.sub)
+
+    def __imul__(self,other):
+        """Multiply `self` by `other`, in place if the result keeps the `dtype` of `self`.
+        See :meth:`_inplace_operation`"""
+        return self._inplace_operation(other,operator.mul)
     
     def add_from_bowtie(self,fh,mapfunc,min_length=25,
                           max_length=numpy.inf,**trans_args):
@@ -1943,17 +3771,120 @@ class GenomeArray(MutableAbstractGenomeArray):
         center_map
             map each read fractionally to every position in the read, optionally
             trimming positions from the ends first            
+
+        Notes
+        -----
+        When `mapfunc` is one of the mapping functions above, alignments are
+        parsed in chunks into arrays of coordinates, mapped in a vectorized
+        manner, and accumulated into the array once per chunk and chromosome
+        strand. Other mapping functions are called on each alignment.
         """
-        for feature in BowtieReader(fh):
-            span_len = len(feature.spanning_segment)
-            if span_len >= min_length and span_len <= max_length:
-                tuples = mapfunc(feature,**trans_args)
-                for seg, val in tuples:
-                    self[seg] += val
-        
+        if mapfunc not in _VECTORIZED_BOWTIE_MAPS:
+            for feature in BowtieReader(fh):
+                span_len = len(feature.spanning_segment)
+                if span_len >= min_length and span_len <= max_length:
+                    tuples = mapfunc(feature,**trans_args)
+                    for seg, val in tuples:
+                        self[seg] += val
+            
+            self._sum = None
+            return
+
+        for refs, strands, starts, lengths in read_bowtie_chunks(fh):
+            keep = (lengths >= min_length) & (lengths <= max_length)
+            refs, strands, starts, lengths = refs[keep], strands[keep], starts[keep], lengths[keep]
+
+            # group alignments by chromosome and strand
+            ref_names, ref_codes = numpy.unique(refs,return_inverse=True)
+            strand_names, strand_codes = numpy.unique(strands,return_inverse=True)
+            group_codes = ref_codes*len(strand_names) + strand_codes
+            order = numpy.argsort(group_codes,kind="mergesort")
+            bounds = numpy.flatnonzero(numpy.diff(group_codes[order])) + 1
+            for idx in numpy.split(order,bounds):
+                if len(idx) == 0:
+                    continue
+
+                chrom  = str(ref_names[ref_codes[idx[0]]])
+                strand = str(strand_names[strand_codes[idx[0]]])
+                positions, values = _map_bowtie_arrays(mapfunc,starts[idx],lengths[idx],strand,**trans_args)
+                inbounds = positions >= 0
+                positions, inverse = numpy.unique(positions[inbounds],return_inverse=True)
+                values = numpy.bincount(inverse,weights=values[inbounds],minlength=len(positions))
+                self._add_at(chrom,strand,positions,values)
+
         self._sum = None
 
-    def add_from_wiggle(self,fh,strand):
+    def reserve(self,chr_lengths):
+        """Allocate chromosomes, or grow existing ones, to at least the lengths
+        in `chr_lengths`, so that data can be loaded without growing the array
+        piecemeal. Chromosomes already longer are left as they are.
+
+        Parameters
+        ----------
+        chr_lengths : dict
+            Dictionary mapping chromosome names to lengths, e.g. as returned
+            by :func:`infer_chr_lengths`
+        """
+        for chrom, length in chr_lengths.items():
+            if chrom not in self._chroms:
+                self._add_chrom(chrom,length)
+            elif length > len(self._chroms[chrom][self._strands[0]]):
+                self._resize_chrom(chrom,length)
+
+    def _ensure_chrom(self,chrom,end):
+        """Allocate or grow a chromosome so that it holds positions up to `end`.
+        Chromosomes are grown to `10000` positions past `end`, or past their
+        current length, whichever is larger
+
+        Parameters
+        ----------
+        chrom : str
+            Chromosome name
+
+        end : int
+            Position one past the last position that must fit
+        """
+        if chrom not in self._chroms:
+            self._add_chrom(chrom,self.min_chr_size if end <= self.min_chr_size else end + 10000)
+        else:
+            my_len = len(self._chroms[chrom][self._strands[0]])
+            if end > my_len:
+                self._resize_chrom(chrom,max(my_len + 10000,end + 10000))
+
+    def _add_at(self,chrom,strand,positions,values):
+        """Add `values` to the array at `positions` on a chromosome strand,
+        allocating or growing the chromosome as needed
+
+        Parameters
+        ----------
+        chrom : str
+            Chromosome name
+
+        strand : str
+            Chromosome strand
+
+        positions : :class:`numpy.ndarray`
+            Sorted, unique, non-negative positions
+
+        values : :class:`numpy.ndarray`
+            Values to add at `positions`
+        """
+        if self._storage_mode == "r":
+            raise ValueError("Cannot set values in a GenomeArray opened read-only. Reopen with mode='r+'.")
+
+        assert strand in self.strands()
+        if len(positions) == 0:
+            return
+
+        self._ensure_chrom(chrom,positions[-1] + 1)
+        vec = self._chroms[chrom][strand]
+        old = vec[positions]
+        vec[positions] = old + values
+        if self._data_sum is not None:
+            sum_dtype = _sum_dtype(self.dtype)
+            self._data_sum += vec[positions].sum(dtype=sum_dtype).item() - old.sum(dtype=sum_dtype).item()
+
+    def add_from_wiggle(self,fh,strand,prescan=False):
         """Import data from a `Wiggle`_ or `bedGraph`_ file to current GenomeArray
         
         Parameters
@@ -1963,17 +3894,52 @@ class GenomeArray(MutableAbstractGenomeArray):
         
         strand : str
             Strand to which data should be added. `'+'`, `'-'`, or `'.'`
+
+        prescan : bool, optional
+            If `True`, scan `fh` for chromosome lengths, and allocate
+            chromosomes before loading data. `fh` must be seekable.
+            (Default: `False`)
         """
         assert strand in self.strands()
-        for chrom,start,stop,val in WiggleReader(fh):
-            seg = GenomicSegment(chrom,start,stop,strand)
-            self[seg] += val
+        if prescan == True:
+            self.reserve(infer_chr_lengths(fh))
+
+        for chrom, starts, ends, values in read_wiggle_chunks(fh):
+            self._add_intervals(chrom,strand,starts,ends,values)
 
         self._sum = None
-        
-    def to_variable_step(self,fh,trackname,strand,printer=None,**kwargs):
+
+    def _add_intervals(self,chrom,strand,starts,ends,values):
+        """Add values over half-open intervals on a chromosome strand, in
+        batches of at most :data:`INTERVAL_BATCH_SIZE` positions
+
+        Parameters
+        ----------
+        chrom : str
+            Chromosome name
+
+        strand : str
+            Chromosome strand
+
+        starts, ends : :class:`numpy.ndarray`
+            Start and end coordinates of intervals
+
+        values : :class:`numpy.ndarray`
+            Value to add over each interval
+        """
+        keep = ends > starts
+        starts, ends, values = starts[keep], ends[keep], values[keep]
+        batches = (numpy.cumsum(ends - starts) - 1) // INTERVAL_BATCH_SIZE
+        bounds  = numpy.flatnonzero(numpy.diff(batches)) + 1
+        for idx in numpy.split(numpy.arange(len(starts)),bounds):
+            if len(idx) > 0:
+                positions, vals = _expand_intervals(starts[idx],ends[idx],values[idx])
+                self._add_at(chrom,strand,positions,vals)
+        
+    def to_variable_step(self,fh,trackname,strand,printer=None,chunk_size=EXPORT_CHUNK_SIZE,**kwargs):
         """Export the contents of the GenomeArray to a variable step
         `Wiggle`_ file. For sparse data, `bedGraph`_ can be more efficient format.
+        Nonzero positions are found and written a chunk at a time.
         
         See the `Wiggle spec <http://genome.ucsc.edu/goldenpath/help/wiggle.html>`_
         for format details
@@ -1991,6 +3957,9 @@ class GenomeArray(MutableAbstractGenomeArray):
         
         printer : file-like, optional
             Something implementing a write() method for output
+
+        chunk_size : int, optional
+            Positions scanned at once (Default: `1000000`)
             
         **kwargs
             Any other key-value pairs to include in track definition line
@@ -2002,17 +3971,24 @@ class GenomeArray(MutableAbstractGenomeArray):
             for k,v in sorted(kwargs.items(),key = lambda x: x[0]):
                 fh.write(" %s=%s" % (k,v))
         fh.write("\n")
-        nonzero = self.nonzero()
-        for chrom in sorted(nonzero):
+        for chrom in sorted(self.keys()):
             printer.write("Writing chromosome %s..." % chrom)
             fh.write("variableStep chrom=%s span=1\n" % chrom)
-            indices = nonzero[chrom][strand]
-            for idx in indices:
-                val = self._chroms[chrom][strand][self._slicewrap(idx)]
-                fh.write("%s\t%s\n" % (idx+1, val))
+            vec = self._chroms[chrom][strand]
+            if isinstance(vec,_SparseVector):
+                positions, values = vec.items(0,len(vec))
+                for start in range(0,len(positions),chunk_size):
+                    _write_variable_step_values(fh,positions[start:start+chunk_size],values[start:start+chunk_size])
+            else:
+                for start in range(0,len(vec),chunk_size):
+                    values = vec[start:start+chunk_size]
+                    positions = values.nonzero()[0]
+                    _write_variable_step_values(fh,start + positions,values[positions])
                 
-    def to_bedgraph(self,fh,trackname,strand,printer=None,**kwargs):
-        """Write the contents of the GenomeArray to a `bedGraph`_ file
+    def to_bedgraph(self,fh,trackname,strand,printer=None,chunk_size=EXPORT_CHUNK_SIZE,**kwargs):
+        """Write the contents of the GenomeArray to a `bedGraph`_ file.
+        Runs of equal values are found a chunk at a time, and each is written
+        as a single line. Positions with zero value are omitted.
         
         See the `bedGraph spec <https://cgwb.nci.nih.gov/goldenPath/help/bedgraph.html>`_
         for format details
@@ -2031,60 +4007,620 @@ class GenomeArray(MutableAbstractGenomeArray):
         printer : file-like, optional
             Something implementing a write() method for output       
 
+        chunk_size : int, optional
+            Positions scanned at once (Default: `1000000`)
+
         **kwargs
             Any other key-value pairs to include in track definition line
         """
-        assert strand in self.strands()
-        printer = NullWriter() if printer is None else printer
-        fh.write("track type=bedGraph name=%s" % trackname)
-        if kwargs is not None:
-            for k,v in sorted(kwargs.items(),key = lambda x: x[0]):
-                fh.write(" %s=%s" % (k,v))
-        fh.write("\n")
-        nonzero = self.nonzero()
-        for chrom in sorted(nonzero):
-            printer.write("Writing chromosome %s..." % chrom)
-            if self._chroms[chrom][strand].sum() > 0:
-                last_val = 0
-                last_x   = 0
-                nz = nonzero[chrom][strand]
-                for x in range(nz.min(),nz.max()+1):
-                    val = self._chroms[chrom][strand][self._slicewrap(x)]
-                    if val != last_val:
-                        #write line: chrom chromStart chromEnd dataValue
-                        fh.write("%s\t%s\t%s\t%s\n" % (chrom,last_x,x,last_val))
-                        #update variables
-                        last_val = val
-                        last_x = x
-                    else:
-                        continue
-                # write last line
-                fh.write("%s\t%s\t%s\t%s\n" % (chrom,last_x,x+1,last_val))
-        
-    @staticmethod
-    def like(other):
-        """Return a |GenomeArray| of same dimension as the input array
-        
+        assert strand in self.strands()
+        printer = NullWriter() if printer is None else printer
+        fh.write("track type=bedGraph name=%s" % trackname)
+        if kwargs is not None:
+            for k,v in sorted(kwargs.items(),key = lambda x: x[0]):
+                fh.write(" %s=%s" % (k,v))
+        fh.write("\n")
+        for chrom in sorted(self.keys()):
+            printer.write("Writing chromosome %s..." % chrom)
+            vec = self._chroms[chrom][strand]
+            for starts, ends, values in _iter_value_runs(vec,len(vec),chunk_size):
+                _write_bedgraph_runs(fh,chrom,starts,ends,values)
+        
+    def save(self,filename,chunk_size=NATIVE_CHUNK_SIZE,compresslevel=6):
+        """Save the |GenomeArray| to a compressed binary file, which can be
+        reopened with :meth:`load`, or queried region by region without
+        loading it via |NativeGenomeArray|. Unlike export to `wiggle`_ or
+        `bedGraph`_, values are stored exactly, in the `dtype` of the array.
+
+        Each chromosome strand is split into chunks of `chunk_size` positions,
+        which are compressed separately. Chunks that hold only zeros are not
+        stored. A header records chromosome lengths, strands, `dtype`, the
+        sum of the array, and the location of each chunk.
+
+        Parameters
+        ----------
+        filename : str
+            Name of file to write
+
+        chunk_size : int, optional
+            Positions per compressed chunk. Smaller chunks make queries of
+            small regions faster, at some cost in compression
+            (Default: `65536`)
+
+        compresslevel : int, optional
+            :mod:`zlib` compression level, from `0` (none) to `9` (most)
+            (Default: `6`)
+        """
+        header = { "format"       : _NATIVE_FORMAT,
+                   "version"      : 1,
+                   "dtype"        : self.dtype.str,
+                   "strands"      : list(self.strands()),
+                   "min_chr_size" : self.min_chr_size,
+                   "sum"          : numpy.asarray(self.sum()).item(),
+                   "chunk_size"   : chunk_size,
+                   "chroms"       : {},
+                 }
+        with open(filename,"wb") as fout:
+            fout.write(_NATIVE_MAGIC)
+            for chrom, length in sorted(self.lengths().items()):
+                chunks = {}
+                for strand in self.strands():
+                    vec = self._chroms[chrom][strand]
+                    chunks[strand] = []
+                    for n, start in enumerate(range(0,length,chunk_size)):
+                        vals = numpy.asarray(vec[start:start+chunk_size],dtype=self.dtype)
+                        if vals.any():
+                            data = zlib.compress(vals.tobytes(),compresslevel)
+                            chunks[strand].append((n,fout.tell(),len(data)))
+                            fout.write(data)
+
+                header["chroms"][chrom] = { "length" : length, "chunks" : chunks }
+
+            header_offset = fout.tell()
+            fout.write(json.dumps(header,sort_keys=True).encode("utf-8"))
+            fout.write(_NATIVE_FOOTER.pack(header_offset,_NATIVE_MAGIC))
+
+    @staticmethod
+    def load(filename):
+        """Load a |GenomeArray| from a file written by :meth:`save`
+
+        Parameters
+        ----------
+        filename : str
+            Name of file
+
+        Returns
+        -------
+        |GenomeArray|
+
+        See also
+        --------
+        NativeGenomeArray
+            Query saved arrays region by region without loading them
+        """
+        with NativeGenomeArray(filename) as native:
+            return native.to_genome_array()
+
+    @staticmethod
+    def like(other,dtype=None):
+        """Return a |GenomeArray| of same dimension as the input array
+        
+        Parameters
+        ----------
+        other : |GenomeArray|
+
+        dtype : :class:`numpy.dtype` or str, optional
+            Type of values in new array. If `None`, the `dtype` of `other`
+            is used, or `float64` if `other` has none. (Default: `None`)
+        
+        Returns
+        -------
+        GenomeArray
+            empty |GenomeArray| of same size as `other`
+        """
+        if dtype is None:
+            dtype = getattr(other,"dtype",numpy.float64)
+
+        return GenomeArray(other.lengths(),strands=other.strands(),dtype=dtype)
+
+    def _slicewrap(self,x):
+        """Helper function to wrap coordinates for VariableStep/`bedGraph`_ export"""
+        return x
+
+
+class _SparseVector(object):
+    """Sparse vector of values along a chromosome strand, stored as sorted
+    arrays of the coordinates and values of nonzero positions. Reads of
+    ranges are binary searches on the coordinates.
+
+    Writes to small ranges are appended to a buffer, and merged into the
+    sorted arrays in a single vectorized pass when the buffer holds
+    :data:`SPARSE_BUFFER_SIZE` positions, or when the vector is next read.
+    Writes to large ranges are spliced into the arrays directly.
+
+    Parameters
+    ----------
+    length : int
+        Length of vector
+
+    dtype : :class:`numpy.dtype`, optional
+        Type of values (Default: `float64`)
+
+    indices : :class:`numpy.ndarray`, optional
+        Sorted, unique coordinates of nonzero positions
+
+    values : :class:`numpy.ndarray`, optional
+        Values at `indices`
+    """
+    def __init__(self,length,dtype=numpy.float64,indices=None,values=None):
+        self.length    = int(length)
+        self.dtype     = numpy.dtype(dtype)
+        self.indices   = numpy.zeros(0,dtype=numpy.int64) if indices is None else numpy.asarray(indices,dtype=numpy.int64)
+        self.values    = numpy.zeros(0,dtype=self.dtype) if values is None else numpy.asarray(values,dtype=self.dtype)
+        self._buffer   = []
+        self._buffered = 0
+
+    @staticmethod
+    def from_dense(vec,dtype=None):
+        """Create a |_SparseVector| from the nonzero positions of a dense vector
+
+        Parameters
+        ----------
+        vec : :class:`numpy.ndarray`
+
+        dtype : :class:`numpy.dtype`, optional
+            Type of values. If `None`, `vec.dtype` is used
+
+        Returns
+        -------
+        |_SparseVector|
+        """
+        vec = numpy.asarray(vec)
+        idx = vec.nonzero()[0]
+        return _SparseVector(len(vec),vec.dtype if dtype is None else dtype,idx,vec[idx])
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self,key):
+        if isinstance(key,slice):
+            start, stop, step = key.indices(self.length)
+            return self.get(start,stop)[::step]
+
+        return self.get(key,key+1)[0]
+
+    def __array__(self,dtype=None):
+        vals = self.get(0,self.length)
+        return vals if dtype is None else vals.astype(dtype)
+
+    def _consolidate(self):
+        """Merge buffered writes into the sorted coordinate and value arrays"""
+        if len(self._buffer) == 0:
+            return
+
+        positions = [self.indices] + [X[0] for X in self._buffer]
+        values    = [self.values]  + [X[1] for X in self._buffer]
+        order     = [numpy.full(len(X),n,dtype=numpy.int64) for n, X in enumerate(positions)]
+        positions = numpy.concatenate(positions)
+        values    = numpy.concatenate(values)
+
+        # sort by position, then by write order, and keep the last write at each position
+        sort_order = numpy.lexsort((numpy.concatenate(order),positions))
+        positions  = positions[sort_order]
+        values     = values[sort_order]
+        keep = numpy.ones(len(positions),dtype=bool)
+        keep[:-1] = positions[1:] != positions[:-1]
+        keep &= values != 0
+
+        self.indices   = positions[keep]
+        self.values    = values[keep]
+        self._buffer   = []
+        self._buffered = 0
+
+    def resize(self,length):
+        """Change the length of the vector, discarding values beyond `length`
+
+        Parameters
+        ----------
+        length : int
+        """
+        if length < self.length:
+            self._consolidate()
+            hi = numpy.searchsorted(self.indices,length)
+            self.indices = self.indices[:hi]
+            self.values  = self.values[:hi]
+
+        self.length = int(length)
+
+    def get(self,start,end):
+        """Return a dense vector of values from `start` to `end`
+
+        Parameters
+        ----------
+        start, end : int
+            Half-open range of positions
+
+        Returns
+        -------
+        :class:`numpy.ndarray`
+        """
+        self._consolidate()
+        out = numpy.zeros(end-start,dtype=self.dtype)
+        lo, hi = numpy.searchsorted(self.indices,(start,end))
+        out[self.indices[lo:hi] - start] = self.values[lo:hi]
+        return out
+
+    def set(self,start,end,val):
+        """Set values from `start` to `end`
+
+        Parameters
+        ----------
+        start, end : int
+            Half-open range of positions
+
+        val : scalar or :class:`numpy.ndarray`
+            Value(s) to set, cast to `dtype`
+        """
+        length = end - start
+        if length >= SPARSE_BUFFER_SIZE:
+            self._consolidate()
+            lo, hi = numpy.searchsorted(self.indices,(start,end))
+            if numpy.ndim(val) == 0 and val == 0:
+                new_indices = numpy.zeros(0,dtype=numpy.int64)
+                new_values  = numpy.zeros(0,dtype=self.dtype)
+            else:
+                dense = numpy.empty(length,dtype=self.dtype)
+                dense[:] = val
+                new_indices = dense.nonzero()[0]
+                new_values  = dense[new_indices]
+                new_indices += start
+
+            self.indices = numpy.concatenate((self.indices[:lo],new_indices,self.indices[hi:]))
+            self.values  = numpy.concatenate((self.values[:lo],new_values,self.values[hi:]))
+        else:
+            dense = numpy.empty(length,dtype=self.dtype)
+            dense[:] = val
+            self._buffer.append((numpy.arange(start,end,dtype=numpy.int64),dense))
+            self._buffered += length
+            if self._buffered >= SPARSE_BUFFER_SIZE:
+                self._consolidate()
+
+    def add_at(self,positions,values):
+        """Add `values` at sorted, unique `positions`
+
+        Parameters
+        ----------
+        positions : :class:`numpy.ndarray`
+
+        values : :class:`numpy.ndarray`
+        """
+        new_values = numpy.empty(len(positions),dtype=self.dtype)
+        new_values[:] = self.values_at(positions) + values
+        self._buffer.append((numpy.asarray(positions,dtype=numpy.int64),new_values))
+        self._buffered += len(positions)
+        if self._buffered >= SPARSE_BUFFER_SIZE:
+            self._consolidate()
+
+    def items(self,start,end):
+        """Return coordinates and values of nonzero positions from `start` to `end`
+
+        Parameters
+        ----------
+        start, end : int
+            Half-open range of positions
+
+        Returns
+        -------
+        :class:`numpy.ndarray`
+            Coordinates of nonzero positions
+
+        :class:`numpy.ndarray`
+            Values at those positions
+        """
+        self._consolidate()
+        lo, hi = numpy.searchsorted(self.indices,(start,end))
+        return self.indices[lo:hi].copy(), self.values[lo:hi]
+
+    def values_at(self,positions):
+        """Return values at arbitrary sorted `positions`
+
+        Parameters
+        ----------
+        positions : :class:`numpy.ndarray`
+
+        Returns
+        -------
+        :class:`numpy.ndarray`
+        """
+        self._consolidate()
+        out = numpy.zeros(len(positions),dtype=self.dtype)
+        if len(self.indices) > 0:
+            idx   = numpy.minimum(numpy.searchsorted(self.indices,positions),len(self.indices) - 1)
+            found = self.indices[idx] == positions
+            out[found] = self.values[idx[found]]
+
+        return out
+
+    def nonzero(self):
+        """Return coordinates of nonzero positions, in a tuple like :meth:`numpy.ndarray.nonzero`
+
+        Returns
+        -------
+        tuple
+            Tuple containing a sorted :class:`numpy.ndarray` of coordinates
+        """
+        self._consolidate()
+        return (self.indices.copy(),)
+
+    def sum(self,dtype=None):
+        """Return sum of values in vector
+
         Parameters
         ----------
-        other : |GenomeArray|
-        
+        dtype : :class:`numpy.dtype`, optional
+            Type in which to accumulate sum
+
         Returns
         -------
-        GenomeArray
-            empty |GenomeArray| of same size as `other`
+        number
         """
-        return GenomeArray(other.lengths(),strands=other.strands())
+        self._consolidate()
+        return self.values.sum(dtype=dtype)
 
-    def _slicewrap(self,x):
-        """Helper function to wrap coordinates for VariableStep/`bedGraph`_ export"""
-        return x
+
+def _values_at(vec,positions,dtype):
+    """Fetch values at sorted `positions` from a dense or |_SparseVector|,
+    which may be `None` or shorter than `positions` require, reading zeros
+    for missing positions
+    """
+    if vec is None:
+        return numpy.zeros(len(positions),dtype=dtype)
+    elif isinstance(vec,_SparseVector):
+        return vec.values_at(positions)
+
+    out = numpy.zeros(len(positions),dtype=vec.dtype)
+    inbounds = positions < len(vec)
+    out[inbounds] = vec[positions[inbounds]]
+    return out
+
+def _apply_sparse(func,mine,other,dtype):
+    """Apply `func` elementwise to a |_SparseVector| and a vector or scalar.
+    When `func` maps zeros to zero, `func` is evaluated only at positions
+    nonzero in either argument. Otherwise, the result is dense, and is
+    evaluated everywhere.
+
+    Parameters
+    ----------
+    func : func
+        Binary function, as passed to :meth:`SparseGenomeArray.apply_operation`
+
+    mine : |_SparseVector| or `None`
+        First argument. `None` is read as zeros
+
+    other : |_SparseVector|, :class:`numpy.ndarray`, scalar, or `None`
+        Second argument. `None` is read as zeros
+
+    dtype : :class:`numpy.dtype`
+        Type of output
+
+    Returns
+    -------
+    |_SparseVector|
+    """
+    if isinstance(other,_SparseVector) or (other is not None and numpy.ndim(other) > 0):
+        vectors = [mine,other]
+        other_scalar = None
+    else:
+        vectors = [mine]
+        other_scalar = 0 if other is None else other
+
+    length = max([len(X) for X in vectors if X is not None] + [0])
+    my_dtype = dtype if mine is None else mine.dtype
+    other_zero = numpy.zeros(1,dtype=other.dtype) if other_scalar is None else other_scalar
+    if numpy.asarray(func(numpy.zeros(1,dtype=my_dtype),other_zero)).any():
+        first  = numpy.zeros(length,dtype=my_dtype)
+        if mine is not None:
+            first[:len(mine)] = numpy.asarray(mine)
+        if other_scalar is None:
+            second = numpy.zeros(length,dtype=other.dtype)
+            second[:len(other)] = numpy.asarray(other)
+        else:
+            second = other_scalar
+        return _SparseVector.from_dense(func(first,second),dtype=dtype)
+
+    positions = numpy.zeros(0,dtype=numpy.int64)
+    for vec in vectors:
+        if vec is not None:
+            positions = numpy.union1d(positions,vec.nonzero()[0])
+
+    first  = _values_at(mine,positions,my_dtype)
+    second = other_scalar if other_scalar is not None else _values_at(other,positions,other.dtype)
+    values = numpy.asarray(func(first,second),dtype=dtype)
+    keep   = values != 0
+    return _SparseVector(length,dtype,positions[keep],values[keep])
+
+def _tile_values(vec,start,end,dtype):
+    """Fetch values from `start` to `end` of a dense or |_SparseVector|,
+    which may be `None` or shorter than `end`, reading zeros for missing
+    positions. Where possible, a view rather than a copy is returned
+    """
+    if vec is None:
+        return numpy.zeros(end-start,dtype=dtype)
+    elif not isinstance(vec,_SparseVector) and end <= len(vec):
+        return vec[start:end]
+
+    out = numpy.zeros(end-start,dtype=vec.dtype)
+    stop = min(end,len(vec))
+    if stop > start:
+        out[:stop-start] = vec[start:stop] if not isinstance(vec,_SparseVector) else vec.get(start,stop)
+    return out
+
+def _apply_tile(func,out,mine,other,start,end):
+    """Apply `func` elementwise to a tile of `mine` and `other`, writing the
+    result into `out`. Temporary arrays are at most the size of the tile.
+
+    Parameters
+    ----------
+    func : func
+        Binary function, as passed to :meth:`GenomeArray.apply_operation`
+
+    out : :class:`numpy.ndarray`
+        Output vector. May be `mine`, for in-place operations
+
+    mine : :class:`numpy.ndarray` or `None`
+        First argument. `None` is read as zeros
+
+    other : :class:`numpy.ndarray`, |_SparseVector|, scalar, or `None`
+        Second argument. `None` is read as zeros
+
+    start, end : int
+        Half-open range of positions in tile
+    """
+    ufunc = _OPERATOR_UFUNCS.get(func,func if isinstance(func,numpy.ufunc) else None)
+    dest  = out[start:end]
+    first = dest if mine is out else _tile_values(mine,start,end,out.dtype)
+    if isinstance(other,_SparseVector) and ufunc in (numpy.add,numpy.subtract):
+        # adding zeros changes nothing, so visit only nonzero positions of `other`
+        positions, values = other.items(start,end)
+        positions -= start
+        if first is not dest:
+            dest[:] = first
+        dest[positions] = ufunc(dest[positions],values)
+        return
+
+    second = 0 if other is None else other
+    if numpy.ndim(second) > 0 or isinstance(second,_SparseVector):
+        second = _tile_values(second,start,end,out.dtype)
+
+    if ufunc is not None:
+        ufunc(first,second,out=dest,casting="same_kind")
+    else:
+        dest[:] = func(first,second)
+
+def _run_tasks(tasks,threads):
+    """Call each function in `tasks`, in a pool of `threads` threads if `threads` > 1.
+    :mod:`numpy` releases the GIL in elementwise operations, so tasks on
+    large arrays run in parallel
+    """
+    if threads > 1 and len(tasks) > 1:
+        pool = multiprocessing.pool.ThreadPool(threads)
+        try:
+            return pool.map(lambda task: task(),tasks)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        return [task() for task in tasks]
+
+def _value_runs(values):
+    """Find runs of equal, nonzero values in a vector
+
+    Parameters
+    ----------
+    values : :class:`numpy.ndarray`
+        Values to scan. Must not be empty
+
+    Returns
+    -------
+    :class:`numpy.ndarray`
+        Start of each run, relative to the beginning of `values`
+
+    :class:`numpy.ndarray`
+        End of each run, half-open
+
+    :class:`numpy.ndarray`
+        Value of each run
+    """
+    bounds = numpy.flatnonzero(values[1:] != values[:-1]) + 1
+    starts = numpy.concatenate(([0],bounds))
+    ends   = numpy.concatenate((bounds,[len(values)]))
+    vals   = values[starts]
+    keep   = vals != 0
+    return starts[keep], ends[keep], vals[keep]
+
+def _iter_value_runs(vec,length,chunk_size=EXPORT_CHUNK_SIZE):
+    """Find runs of equal, nonzero values along a chromosome strand, scanning
+    `chunk_size` positions at a time. Runs that cross chunk boundaries are
+    merged, so each run is reported once.
+
+    Parameters
+    ----------
+    vec : :class:`numpy.ndarray` or |_SparseVector|
+        Chromosome strand to scan
+
+    length : int
+        Number of positions to scan
+
+    chunk_size : int, optional
+        Positions scanned at once (Default: `1000000`)
+
+    Yields
+    ------
+    :class:`numpy.ndarray`
+        Starts of runs, in chromosome coordinates
+
+    :class:`numpy.ndarray`
+        Ends of runs, half-open
+
+    :class:`numpy.ndarray`
+        Values of runs
+    """
+    if isinstance(vec,_SparseVector):
+        # runs break wherever nonzero positions are not adjacent, or values change
+        positions, values = vec.items(0,length)
+        if len(positions) == 0:
+            return
+
+        breaks = (numpy.diff(positions) != 1) | (values[1:] != values[:-1])
+        first  = numpy.flatnonzero(numpy.concatenate(([True],breaks)))
+        last   = numpy.concatenate((first[1:] - 1,[len(positions) - 1]))
+        for start in range(0,len(first),chunk_size):
+            idx_first = first[start:start+chunk_size]
+            idx_last  = last[start:start+chunk_size]
+            yield positions[idx_first], positions[idx_last] + 1, values[idx_first]
+        return
+
+    carry = None
+    for start in range(0,length,chunk_size):
+        end = min(start + chunk_size,length)
+        run_starts, run_ends, run_vals = _value_runs(_tile_values(vec,start,end,vec.dtype))
+        run_starts += start
+        run_ends   += start
+        if carry is not None:
+            if len(run_starts) > 0 and run_starts[0] == start and run_vals[0] == carry[2]:
+                run_starts[0] = carry[0]
+            else:
+                run_starts = numpy.concatenate(([carry[0]],run_starts))
+                run_ends   = numpy.concatenate(([carry[1]],run_ends))
+                run_vals   = numpy.concatenate(([carry[2]],run_vals))
+
+        # hold back the last run if it may continue into the next chunk
+        if len(run_ends) > 0 and run_ends[-1] == end and end < length:
+            carry = (run_starts[-1],run_ends[-1],run_vals[-1])
+            run_starts, run_ends, run_vals = run_starts[:-1], run_ends[:-1], run_vals[:-1]
+        else:
+            carry = None
+
+        yield run_starts, run_ends, run_vals
+
+def _write_bedgraph_runs(fh,chrom,starts,ends,values):
+    """Write runs of values to `fh` as `bedGraph`_ lines, in a single write"""
+    if len(starts) > 0:
+        fh.write("".join(["%s\t%s\t%s\t%s\n" % (chrom,X,Y,Z) for X,Y,Z in zip(starts.tolist(),ends.tolist(),values.tolist())]))
+
+def _write_variable_step_values(fh,positions,values):
+    """Write 0-indexed `positions` and their `values` to `fh` as 1-indexed
+    variableStep `Wiggle`_ lines, in a single write"""
+    if len(positions) > 0:
+        fh.write("".join(["%s\t%s\n" % X for X in zip((positions + 1).tolist(),values.tolist())]))
 
 
 class SparseGenomeArray(GenomeArray):
     """A memory-efficient sublcass of |GenomeArray| using sparse internal representation.
-    Note, savings in memory may come at a cost in performance when repeatedly
-    getting/setting values, compared to a |GenomeArray|.
+    Each chromosome strand is stored as sorted arrays of the coordinates
+    and values of its nonzero positions. Note, savings in memory may come
+    at a cost in performance when repeatedly getting/setting values, compared
+    to a |GenomeArray|.
     
 
     Parameters
@@ -2107,8 +4643,11 @@ class SparseGenomeArray(GenomeArray):
     
     strands : sequence
         Sequence of strand names for the |GenomeArray|. (Default: `('+','-')`)    
+
+    dtype : :class:`numpy.dtype` or str, optional
+        Type of values held in the array. (Default: `float64`)
     """
-    def __init__(self,chr_lengths=None,strands=None,min_chr_size=MIN_CHR_SIZE):
+    def __init__(self,chr_lengths=None,strands=None,min_chr_size=MIN_CHR_SIZE,dtype=numpy.float64):
         """Create a |SparseGenomeArray|
 
         Parameters
@@ -2131,18 +4670,83 @@ class SparseGenomeArray(GenomeArray):
         
         strands : sequence
             Sequence of strand names for the |GenomeArray|. (Default: `('+','-')`)
+
+        dtype : :class:`numpy.dtype` or str, optional
+            Type of values held in the array. (Default: `float64`)
         """ % MIN_CHR_SIZE
         self._chroms       = {}
+        self.dtype         = numpy.dtype(dtype)
         self._strands      = _DEFAULT_STRANDS if strands is None else strands
         self._sum          = None
         self._normalize    = False
         self.min_chr_size = min_chr_size
+        self._storage_dir  = None
+        self._storage_mode = None
+        self._storage_files = {}
+        # sums of sparse vectors are cheap, so are recomputed rather than updated on write
+        self._data_sum     = None
         if chr_lengths is not None:
             for chrom in chr_lengths.keys():
                 self._chroms[chrom] = {}
                 for strand in self._strands:
                     l = chr_lengths[chrom]
-                    self._chroms[chrom][strand] = scipy.sparse.dok_matrix((1,l))
+                    self._chroms[chrom][strand] = _SparseVector(l,self.dtype)
+
+    def _add_chrom(self,chrom,length):
+        """Allocate empty sparse vectors for each strand of a new chromosome
+
+        Parameters
+        ----------
+        chrom : str
+            Chromosome name
+
+        length : int
+            Length of chromosome
+        """
+        self._chroms[chrom] = { K : _SparseVector(length,self.dtype) for K in self.strands() }
+
+    def _resize_chrom(self,chrom,new_size):
+        """Grow all strands of a chromosome to `new_size`
+        
+        Parameters
+        ----------
+        chrom : str
+            Chromosome name
+
+        new_size : int
+            New length of chromosome
+        """
+        if new_size < len(self._chroms[chrom][self._strands[0]]):
+            self._data_sum = None
+
+        for strand in self.strands():
+            self._chroms[chrom][strand].resize(new_size)
+
+    def _add_at(self,chrom,strand,positions,values):
+        """Add `values` to the array at `positions` on a chromosome strand,
+        allocating or growing the chromosome as needed
+
+        Parameters
+        ----------
+        chrom : str
+            Chromosome name
+
+        strand : str
+            Chromosome strand
+
+        positions : :class:`numpy.ndarray`
+            Sorted, unique, non-negative positions
+
+        values : :class:`numpy.ndarray`
+            Values to add at `positions`
+        """
+        assert strand in self.strands()
+        if len(positions) == 0:
+            return
+
+        self._data_sum = None
+        self._ensure_chrom(chrom,positions[-1] + 1)
+        self._chroms[chrom][strand].add_at(positions,values)
 
     def lengths(self):
         """Return a dictionary mapping chromosome names to lengths. In the
@@ -2156,7 +4760,7 @@ class SparseGenomeArray(GenomeArray):
         """
         d_out = {}.fromkeys(self.keys())
         for key in d_out:
-            d_out[key] = max([self._chroms[key][X].shape[1] for X in self.strands()])
+            d_out[key] = max([len(self._chroms[key][X]) for X in self.strands()])
         
         return d_out
 
@@ -2190,18 +4794,14 @@ class SparseGenomeArray(GenomeArray):
             return roi.get_counts(self)
 
         if roi.chrom not in self:
-            self._chroms[roi.chrom] = { K : copy.deepcopy(scipy.sparse.dok_matrix((1,self.min_chr_size)))
-                                       for K in self.strands()
-                                      }
-        if roi.end > self._chroms[roi.chrom][roi.strand].shape[1]:
-            for strand in self.strands():
-                self._chroms[roi.chrom][strand].resize((1,roi.end+10000))
+            self._add_chrom(roi.chrom,self.min_chr_size)
+        if roi.end > len(self._chroms[roi.chrom][roi.strand]):
+            self._resize_chrom(roi.chrom,roi.end+10000)
 
-        vals = self._chroms[roi.chrom][roi.strand][0,roi.start:roi.end]
+        vals = self._chroms[roi.chrom][roi.strand].get(roi.start,roi.end)
         if self._normalize is True:
-            vals = 1e6 * vals / self.sum()
+            vals = vals * (1e6 / self.sum())
             
-        vals = vals.toarray().reshape(vals.shape[1],)
         if roi.strand == "-" and roi_order == True:
             vals = vals[::-1]
 
@@ -2231,7 +4831,8 @@ class SparseGenomeArray(GenomeArray):
             are assorted to go 5' to 3' relative to `seg` rather than
             genome
        """
-        self._sum = None
+        self._sum      = None
+        self._data_sum = None
 
         if isinstance(seg,SegmentChain):
             if isinstance(val,numpy.ndarray):
@@ -2259,14 +4860,11 @@ class SparseGenomeArray(GenomeArray):
         self.set_normalize(False)
 
         if seg.chrom not in self:
-            self._chroms[seg.chrom] = { K : copy.deepcopy(scipy.sparse.dok_matrix((1,self.min_chr_size)))
-                                       for K in self.strands()
-                                      }
-        if seg.end > self._chroms[seg.chrom][seg.strand].shape[1]:
-            for strand in self.strands():
-                self._chroms[seg.chrom][strand].resize((1,seg.end+10000))
+            self._add_chrom(seg.chrom,self.min_chr_size)
+        if seg.end > len(self._chroms[seg.chrom][seg.strand]):
+            self._resize_chrom(seg.chrom,seg.end+10000)
         
-        self._chroms[seg.chrom][seg.strand][0,seg.start:seg.end] = val
+        self._chroms[seg.chrom][seg.strand].set(seg.start,seg.end,val)
         self.set_normalize(old_normalize)
 
     def __mul__(self,other,mode=None):
@@ -2305,23 +4903,28 @@ class SparseGenomeArray(GenomeArray):
         |SparseGenomeArray|
         """
         if isinstance(other,GenomeArray):
-            new_array = SparseGenomeArray.like(self)
+            out_dtype = _result_dtype(operator.mul,self.dtype,other)
+            new_array = SparseGenomeArray.like(self,dtype=out_dtype)
             chroms    = set(self.keys()) & set(other.keys())
             strands   = set(self.strands()) & set(other.strands())
             for chrom in chroms:
                 for strand in strands:
-                    new_array._chroms[chrom][strand] = self._chroms[chrom][strand].multiply(other._chroms[chrom][strand])
+                    mine = self._chroms[chrom][strand]
+                    positions = mine.nonzero()[0]
+                    values = mine.values_at(positions) * _values_at(other._chroms[chrom][strand],positions,other.dtype)
+                    keep = values != 0
+                    new_array._chroms[chrom][strand] = _SparseVector(len(mine),out_dtype,positions[keep],values[keep])
                     
             return new_array
         else:
             return self.apply_operation(other,operator.mul,mode=mode)
         
-    def apply_operation(self,other,func,mode=None):
+    def apply_operation(self,other,func,mode=None,inplace=False,threads=1):
         """Apply a binary operator to a copy of `self` and to `other` elementwise.
-        `other` may be a scalar quantity or another |GenomeArray|. In both cases,
-        a new |SparseGenomeArray| is returned, and `self` is left unmodified.
-        If :meth:`set_normalize` is set to `True`, it is disabled during the
-        operation.
+        `other` may be a scalar quantity or another |GenomeArray|. Unless
+        `inplace` is `True`, a new |SparseGenomeArray| is returned, and `self`
+        is left unmodified. If :meth:`set_normalize` is set to `True`, it is
+        disabled during the operation.
         
         Parameters
         ----------
@@ -2361,13 +4964,24 @@ class SparseGenomeArray(GenomeArray):
             Parents are not required to have the same chromosomes
             or strands; chromosomes or strands not common
             to both parents will be ignored.   
+
+        inplace : bool, optional
+            If `True`, replace the vectors of `self` with the results, keeping
+            its `dtype`, rather than creating a new array. Other names bound
+            to `self` see the change. (Default: `False`)
+
+        threads : int, optional
+            Number of threads over which to divide chromosome strands.
+            (Default: `1`)
         
         Returns
         -------
         |SparseGenomeArray|
-            new |SparseGenomeArray| after the operation is applied
+            new |SparseGenomeArray| after the operation is applied, or `self`
+            if `inplace` is `True`
         """
-        new_array = SparseGenomeArray.like(self)
+        _check_inplace_dtype(func,self.dtype,other,inplace)
+        out_dtype = self.dtype if inplace == True else _result_dtype(func,self.dtype,other)
 
         old_normalize = self._normalize
         if old_normalize == True:
@@ -2377,29 +4991,37 @@ class SparseGenomeArray(GenomeArray):
         if isinstance(other,GenomeArray):
             chroms    = {}.fromkeys(set(self.keys()) | set(other.keys()),10)
             strands   = set(self.strands()) | set(other.strands())
-            new_array = SparseGenomeArray(chroms,strands=strands)
-            for chrom in chroms:
-                if chrom in self.keys() and chrom in other.keys():
-                    for strand in strands:
-                        if strand in self.strands() and strand in other.strands():
-                            sc = self._chroms[chrom][strand]
-                            oc = other._chroms[chrom][strand]
-                            new_array._chroms[chrom][strand] = func(sc,oc)
-                        elif strand in self.strands():
-                            new_array._chroms[chrom][strand] = func(copy.deepcopy(self._chroms[chrom][strand]),0)
-                        else:
-                            new_array._chroms[chrom][strand] = func(copy.deepcopy(other._chroms[chrom][strand]),0)
-                elif chrom in self.keys():
-                    for strand in strands:
-                        new_array._chroms[chrom][strand] = func(copy.deepcopy(self[chrom][strand]),0)
-                else:
-                    for strand in strands:
-                        new_array._chroms[chrom][strand] = func(copy.deepcopy(other[chrom][strand]),0)
+            if inplace == True:
+                if not strands <= set(self.strands()):
+                    self.set_normalize(old_normalize)
+                    raise ValueError("Cannot add strands %s to SparseGenomeArray in place." % ", ".join(strands - set(self.strands())))
+                for chrom in chroms:
+                    if chrom not in self._chroms:
+                        self._add_chrom(chrom,chroms[chrom])
+                new_array = self
+            else:
+                new_array = SparseGenomeArray(chroms,strands=strands,dtype=out_dtype)
+            pairs = [(X,Y) for X in chroms for Y in strands]
         else:
-            for chrom in self.keys():
-                for strand in self.strands():
-                    new_array._chroms[chrom][strand] = func(self._chroms[chrom][strand],other)
-
+            new_array = self if inplace == True else SparseGenomeArray.like(self,dtype=out_dtype)
+            pairs = [(X,Y) for X in self.keys() for Y in self.strands()]
+
+        # merge write buffers first, so that threads only read vectors
+        tasks = []
+        for chrom, strand in pairs:
+            # chromosomes or strands missing from either array are read as zeros
+            mine   = self._chroms.get(chrom,{}).get(strand)
+            theirs = other._chroms.get(chrom,{}).get(strand) if isinstance(other,GenomeArray) else other
+            for vec in (mine,theirs):
+                if isinstance(vec,_SparseVector):
+                    vec._consolidate()
+            tasks.append(functools.partial(_apply_sparse,func,mine,theirs,out_dtype))
+
+        for (chrom, strand), result in zip(pairs,_run_tasks(tasks,threads)):
+            new_array._chroms[chrom][strand] = result
+
+        new_array._sum      = None
+        new_array._data_sum = None
         self.set_normalize(old_normalize)
         return new_array    
     
@@ -2418,26 +5040,281 @@ class SparseGenomeArray(GenomeArray):
         for key in self.keys():
             d_out[key] = {}
             for strand in self.strands():
-                # need to sort because dok doens't guarantee sorted indices in nonzero()                
-                d_out[key][strand] = numpy.array(sorted(self._chroms[key][strand].nonzero()[1]))
+                d_out[key][strand] = self._chroms[key][strand].nonzero()[0]
                 
         return d_out
 
-    def _slicewrap(self,x):
-        """Helper function to wrap coordinates for VariableStep/`bedGraph`_ export"""
-        return (0,x)
+    @staticmethod
+    def load(filename):
+        """Load a |SparseGenomeArray| from a file written by :meth:`save`
+
+        Parameters
+        ----------
+        filename : str
+            Name of file
+
+        Returns
+        -------
+        |SparseGenomeArray|
+        """
+        with NativeGenomeArray(filename) as native:
+            return native.to_genome_array(array_type=SparseGenomeArray)
 
     @staticmethod
-    def like(other):
+    def like(other,dtype=None):
         """Return a |SparseGenomeArray| of same dimension as the input array
         
         Parameters
         ----------
         other : |GenomeArray| or |SparseGenomeArray|
+
+        dtype : :class:`numpy.dtype` or str, optional
+            Type of values in new array. If `None`, the `dtype` of `other`
+            is used, or `float64` if `other` has none. (Default: `None`)
         
         Returns
         -------
         |SparseGenomeArray|
             of same size as `other`
         """
-        return SparseGenomeArray(other.lengths(),strands=other.strands())
+        if dtype is None:
+            dtype = getattr(other,"dtype",numpy.float64)
+
+        return SparseGenomeArray(other.lengths(),strands=other.strands(),dtype=dtype)
+
+
+class NativeGenomeArray(AbstractGenomeArray):
+    """Read-only GenomeArray for files written by :meth:`GenomeArray.save`.
+
+    Only the header is read when the file is opened. Queries decompress
+    only the chunks that overlap the region of interest, so regions can be
+    fetched from very large arrays without loading them into memory.
+
+    Parameters
+    ----------
+    filename : str
+        Name of file written by :meth:`GenomeArray.save`
+    """
+    def __init__(self,filename):
+        """Open a |NativeGenomeArray|
+
+        Parameters
+        ----------
+        filename : str
+            Name of file written by :meth:`GenomeArray.save`
+        """
+        self.filename   = filename
+        self._normalize = False
+        self._open()
+
+    def _open(self):
+        """Open file and read header"""
+        self._fh = open(self.filename,"rb")
+        self._fh.seek(-_NATIVE_FOOTER.size,os.SEEK_END)
+        footer_offset = self._fh.tell()
+        header_offset, magic = _NATIVE_FOOTER.unpack(self._fh.read(_NATIVE_FOOTER.size))
+        if magic != _NATIVE_MAGIC:
+            self._fh.close()
+            raise ValueError("'%s' is not a file written by GenomeArray.save()." % self.filename)
+
+        self._fh.seek(header_offset)
+        header = json.loads(self._fh.read(footer_offset - header_offset).decode("utf-8"))
+        self.dtype        = numpy.dtype(header["dtype"])
+        self.min_chr_size = header["min_chr_size"]
+        self.chunk_size   = header["chunk_size"]
+        self._strands     = tuple(header["strands"])
+        self._sum         = header["sum"]
+        self._lengths     = { K : V["length"] for K, V in header["chroms"].items() }
+        self._chunks      = {}
+        for chrom, info in header["chroms"].items():
+            self._chunks[chrom] = { strand : { n : (offset,nbytes) for n, offset, nbytes in chunks }
+                                    for strand, chunks in info["chunks"].items() }
+
+    def close(self):
+        """Close the underlying file"""
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,exc_type,exc_value,traceback):
+        self.close()
+
+    def __getstate__(self):
+        # reopened from disk rather than copied when pickled
+        return { "filename" : self.filename, "_normalize" : self._normalize, "_sum" : self._sum }
+
+    def __setstate__(self,state):
+        self.filename = state["filename"]
+        self._open()
+        self._normalize = state["_normalize"]
+        self._sum       = state["_sum"]
+
+    def __contains__(self,chrom):
+        return chrom in self._lengths
+
+    def __getitem__(self,roi):
+        """Retrieve array of counts from a region of interest.
+        
+        Parameters
+        ----------
+        roi : |GenomicSegment| or |SegmentChain|
+            Region of interest in genome
+
+        Returns
+        -------
+        numpy.ndarray
+            vector of numbers, each position corresponding to a position
+            in `roi`, from 5' to 3' relative to `roi`
+        
+        See also
+        --------
+        plastid.genomics.roitools.SegmentChain.get_counts
+            Fetch a spliced vector of data covering a |SegmentChain|
+        """
+        return self.get(roi,roi_order=True)
+
+    def _read_chunk(self,chrom,strand,n):
+        """Decompress a chunk of a chromosome strand
+
+        Parameters
+        ----------
+        chrom : str
+            Chromosome name
+
+        strand : str
+            Chromosome strand
+
+        n : int
+            Index of chunk
+
+        Returns
+        -------
+        :class:`numpy.ndarray` or `None`
+            Values in chunk, or `None` if the chunk holds only zeros
+        """
+        loc = self._chunks[chrom][strand].get(n)
+        if loc is None:
+            return None
+
+        offset, nbytes = loc
+        self._fh.seek(offset)
+        return numpy.frombuffer(zlib.decompress(self._fh.read(nbytes)),dtype=self.dtype)
+
+    def get(self,roi,roi_order=True):
+        """Retrieve array of counts from a region of interest. Regions
+        beyond the ends of chromosomes, or on chromosomes not in the array,
+        read as zero.
+        
+        Parameters
+        ----------
+        roi : |GenomicSegment| or |SegmentChain|
+            Region of interest in genome
+        
+        roi_order : bool, optional
+            If `True` (default) return vector of values 5' to 3' 
+            relative to vector rather than genome.
+
+        Returns
+        -------
+        numpy.ndarray
+            vector of numbers, each position corresponding to a position
+            in `roi`, from 5' to 3' relative to `roi`
+        
+        See also
+        --------
+        plastid.genomics.roitools.SegmentChain.get_counts
+            Fetch a spliced vector of data covering a |SegmentChain|
+        """
+        if isinstance(roi,SegmentChain):
+            return roi.get_counts(self)
+
+        assert roi.strand in self.strands()
+        start = roi.start
+        end   = min(roi.end,self._lengths.get(roi.chrom,0))
+        vals  = numpy.zeros(len(roi),dtype=self.dtype)
+        if end > start:
+            size = self.chunk_size
+            for n in range(start // size,(end - 1) // size + 1):
+                chunk = self._read_chunk(roi.chrom,roi.strand,n)
+                if chunk is not None:
+                    chunk_start = n*size
+                    lo = max(start,chunk_start)
+                    hi = min(end,chunk_start + len(chunk))
+                    vals[lo-start:hi-start] = chunk[lo-chunk_start:hi-chunk_start]
+
+        if self._normalize is True:
+            vals = vals * (1e6 / self.sum())
+
+        if roi_order == True and roi.strand == "-":
+            vals = vals[::-1]
+
+        return vals
+
+    def chroms(self):
+        """Return a list of chromosomes in the GenomeArray
+        
+        Returns
+        -------
+        list
+            Chromosome names as strings
+        """
+        return self._lengths.keys()
+
+    def lengths(self):
+        """Return a dictionary mapping chromosome names to lengths
+        
+        Returns
+        -------
+        dict
+            Dictionary mapping chromosome names to chromosome lengths
+        """
+        return dict(self._lengths)
+
+    def reset_sum(self):
+        """Reset sum to the total of all positions in the array, rather than
+        the sum recorded when the array was saved. This reads the whole file.
+        """
+        sum_dtype = _sum_dtype(self.dtype)
+        total = 0
+        for chrom in self._chunks:
+            for strand in self._chunks[chrom]:
+                for n in self._chunks[chrom][strand]:
+                    total += self._read_chunk(chrom,strand,n).sum(dtype=sum_dtype)
+
+        self._sum = total
+
+    def to_genome_array(self,array_type=None,dtype=None):
+        """Load the contents of the |NativeGenomeArray| into memory
+
+        Parameters
+        ----------
+        array_type : class
+            Type of GenomeArray to return. |GenomeArray| or |SparseGenomeArray|.
+            (Default: |GenomeArray|)
+
+        dtype : :class:`numpy.dtype` or str, optional
+            Type of values in returned array. If `None`, the `dtype`
+            of the saved array is used. (Default: `None`)
+
+        Returns
+        -------
+        |GenomeArray| or |SparseGenomeArray|
+        """
+        if array_type is None:
+            array_type = GenomeArray
+
+        dtype = self.dtype if dtype is None else dtype
+        ga = array_type(chr_lengths=self.lengths(),strands=self.strands(),min_chr_size=self.min_chr_size,dtype=dtype)
+        for chrom, strands in self._chunks.items():
+            for strand, chunks in strands.items():
+                for n in sorted(chunks):
+                    chunk = self._read_chunk(chrom,strand,n)
+                    start = n*self.chunk_size
+                    ga.__setitem__(GenomicSegment(chrom,start,start+len(chunk),strand),chunk,roi_order=False)
+
+        if ga.dtype == self.dtype:
+            ga.set_sum(self._sum)
+
+        return ga
+
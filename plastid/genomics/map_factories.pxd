@@ -10,10 +10,14 @@ cdef class ThreePrimeMapFactory:
 cdef class VariableFivePrimeMapFactory:
     cdef int [10000] forward_offsets
     cdef int [10000] reverse_offsets
+    cdef readonly dict offset_dict
 
 cdef class StratifiedVariableFivePrimeMapFactory(VariableFivePrimeMapFactory):
     cdef int min_length, max_length, _numlengths
      
 
-cdef class SizeFilterFactory:
-    cdef int min_, max_
\ No newline at end of file
+cdef class AlignmentFilterFactory:
+    cdef readonly int min_length, max_length, min_mapq, require_flags, exclude_flags
+
+cdef class SizeFilterFactory(AlignmentFilterFactory):
+    pass
\ No newline at end of file
@@ -119,6 +119,19 @@ is that the last dimension represent the positions in the query interval. For
 a 2D array, the positions would thus be columns. See
 |StratifiedVariableFivePrimeMapFactory| below for an example.
 
+Mapping functions may optionally implement a ``map_stratified(reads, seg,
+min_length, max_length)`` method, which maps reads in a single pass into a 2D
+array of counts stratified by read length (rows). This is used by
+:meth:`~plastid.genomics.genome_array.BAMGenomeArray.get_stratified`. All
+mapping factories in this module implement it.
+
+Mapping factories in this module also implement ``map_arrays(block_starts,
+block_ends, block_offsets, seg)``, which maps reads supplied as
+:class:`numpy.ndarray` of aligned blocks instead of as
+:class:`pysam.AlignedSegment`. This allows reads from sources other than
+`BAM`_ files to be mapped by the same rules, without per-read overhead in
+Python. :func:`reads_to_block_arrays` converts read alignments to this form.
+
 
 
 See also
@@ -143,6 +156,14 @@ from plastid.util.io.filters import CommentReader
 from plastid.util.scriptlib.argparsers import _parse_variable_offset_file
 
 DEF _BAD_OFFSET = -1
+DEF _FLAG_REVERSE = 16
+
+# CIGAR operations
+DEF _CIGAR_MATCH    = 0
+DEF _CIGAR_DEL      = 2
+DEF _CIGAR_REF_SKIP = 3
+DEF _CIGAR_SEQMATCH = 7
+DEF _CIGAR_SEQDIFF  = 8
 INT    = np.int
 FLOAT  = np.float
 DOUBLE = np.double
@@ -154,6 +175,210 @@ ctypedef np.double_t DOUBLE_t
 ctypedef np.long_t   LONG_t
 
 
+cdef int _check_length_window(int min_length, int max_length) except -1:
+    """Validate a read length window for stratified mapping, and return the
+    number of read lengths (rows) it spans"""
+    if min_length < 1:
+        raise ValueError("Stratified mapping: min read length must be >= 1. Got %s." % min_length)
+    if max_length < min_length:
+        raise ValueError("Stratified mapping: max read length '%s' must be >= min read length '%s'." % (max_length,min_length))
+
+    return max_length - min_length + 1
+
+
+cdef inline int _aligned_length(AlignedSegment read):
+    """Return the number of reference positions covered by aligned bases in
+    `read`, which equals ``len(read.positions)`` without building that list"""
+    cdef:
+        int length = 0
+        int op, oplen
+
+    if read.cigartuples is None:
+        return 0
+
+    for op, oplen in read.cigartuples:
+        if op == _CIGAR_MATCH or op == _CIGAR_SEQMATCH or op == _CIGAR_SEQDIFF:
+            length += oplen
+
+    return length
+
+
+@cython.boundscheck(False) # valid because indices are clipped to [0, seg_len]
+cdef void _spread_over_blocks(AlignedSegment read, int read_length, unsigned int nibble, double val,
+                              long seg_start, long seg_len, double [:,:] diff_view, long [:,:] cover_view,
+                              int row):
+    """Add `val` to row `row` of a difference array at each aligned position
+    of `read` that remains after trimming `nibble` positions from each end, by
+    walking its aligned blocks. `cover_view` tallies the number of reads
+    covering each position in the same way. Positions outside the region of
+    interest are ignored.
+
+    Views are created once by the caller and passed whole, so that no buffer
+    is acquired or sliced per read.
+    """
+    cdef:
+        long ref_pos   = read.reference_start
+        int  read_pos  = 0
+        int  trim_lo   = nibble
+        int  trim_hi   = read_length - nibble
+        int  op, oplen, lo, hi
+        long block_start, block_end
+
+    for op, oplen in read.cigartuples:
+        if op == _CIGAR_MATCH or op == _CIGAR_SEQMATCH or op == _CIGAR_SEQDIFF:
+            lo = max(read_pos,trim_lo)
+            hi = min(read_pos + oplen,trim_hi)
+            if lo < hi:
+                block_start = min(max(ref_pos + lo - read_pos - seg_start,0),seg_len)
+                block_end   = min(max(ref_pos + hi - read_pos - seg_start,0),seg_len)
+                if block_start < block_end:
+                    diff_view[row,block_start]  += val
+                    diff_view[row,block_end]    -= val
+                    cover_view[row,block_start] += 1
+                    cover_view[row,block_end]   -= 1
+
+            read_pos += oplen
+            ref_pos  += oplen
+        elif op == _CIGAR_DEL or op == _CIGAR_REF_SKIP:
+            ref_pos  += oplen
+
+
+cdef np.ndarray _integrate_blocks(np.ndarray diff_array, np.ndarray cover_array):
+    """Convert difference arrays from :func:`_spread_over_blocks` into counts,
+    removing rounding residue from positions no read covers"""
+    cdef np.ndarray count_array = np.cumsum(diff_array[...,:-1],axis=-1)
+    count_array[np.cumsum(cover_array[...,:-1],axis=-1) == 0] = 0
+    return count_array
+
+
+#===============================================================================
+# Helpers for mapping reads supplied as arrays of aligned blocks, rather than
+# as pysam.AlignedSegments. See the map_arrays() methods of the factories below
+#===============================================================================
+
+def reads_to_block_arrays(list reads not None):
+    """reads_to_block_arrays(reads)
+
+    Extract the aligned blocks of read alignments into arrays, for use with the
+    ``map_arrays()`` methods of mapping factories.
+
+    Parameters
+    ----------
+    reads : list of :py:class:`pysam.AlignedSegment`
+        Reads to convert
+
+    Returns
+    -------
+    numpy.ndarray
+        Genomic start of each aligned block, 0-indexed
+
+    numpy.ndarray
+        Genomic end of each aligned block, 0-indexed, half-open
+
+    numpy.ndarray
+        Offsets of each read's blocks in the first two arrays. Blocks
+        from read `i` are at positions ``block_offsets[i]:block_offsets[i+1]``.
+        Length is ``len(reads) + 1``.
+    """
+    cdef:
+        AlignedSegment read
+        list starts  = []
+        list ends    = []
+        list offsets = [0]
+        long start, end
+
+    for read in reads:
+        for start, end in read.get_blocks():
+            starts.append(start)
+            ends.append(end)
+
+        offsets.append(len(starts))
+
+    return np.array(starts,dtype=np.int64), np.array(ends,dtype=np.int64), np.array(offsets,dtype=np.int64)
+
+
+def _prepare_block_arrays(object block_starts, object block_ends, object block_offsets):
+    """Validate arrays of aligned blocks, and compute cumulative aligned
+    lengths needed to convert positions within reads to genomic coordinates
+
+    Parameters
+    ----------
+    block_starts, block_ends, block_offsets : array-like
+        Aligned blocks, as returned by :func:`reads_to_block_arrays`
+
+    Returns
+    -------
+    tuple
+        `block_starts`, `block_offsets`, cumulative aligned length before
+        each block (length ``len(block_starts) + 1``), and length of each read
+        (all as `numpy.ndarray` of int64)
+
+    Raises
+    ------
+    ValueError
+        If arrays are not mutually consistent
+    """
+    block_starts  = np.asarray(block_starts,dtype=np.int64)
+    block_ends    = np.asarray(block_ends,dtype=np.int64)
+    block_offsets = np.asarray(block_offsets,dtype=np.int64)
+
+    if block_starts.ndim != 1 or block_starts.shape != block_ends.shape:
+        raise ValueError("Block starts and ends must be 1D arrays of equal length.")
+    if block_offsets.ndim != 1 or len(block_offsets) == 0 \
+       or block_offsets[0] != 0 or block_offsets[-1] != len(block_starts) \
+       or (np.diff(block_offsets) < 0).any():
+        raise ValueError("Block offsets must start at 0, end at the number of blocks, and never decrease.")
+    if (block_ends < block_starts).any():
+        raise ValueError("Block ends must be >= block starts.")
+
+    cumlength = np.zeros(len(block_starts) + 1,dtype=np.int64)
+    np.cumsum(block_ends - block_starts,out=cumlength[1:])
+    read_lengths = cumlength[block_offsets[1:]] - cumlength[block_offsets[:-1]]
+
+    return block_starts, block_offsets, cumlength, read_lengths
+
+
+def _positions_at(object block_starts, object block_offsets, object cumlength, object read_idx, object read_pos):
+    """Return the genomic coordinate of position `read_pos` (0-indexed, from
+    the leftmost aligned position) in each read in `read_idx`"""
+    cdef object total = cumlength[block_offsets[read_idx]] + read_pos
+    cdef object block = np.searchsorted(cumlength,total,side="right") - 1
+    return block_starts[block] + total - cumlength[block]
+
+
+def _count_sites(object read_idx, object positions, object rows, long seg_start, long seg_len, int num_rows = 0):
+    """Tally mapped sites inside a region into a 1D, or if `rows` is not
+    `None`, 2D count array. Returns indices of reads whose sites fell in the
+    region, and the count array"""
+    cdef object inside = (positions >= seg_start) & (positions < seg_start + seg_len)
+    positions = positions[inside] - seg_start
+    if rows is None:
+        count_array = np.bincount(positions,minlength=seg_len)[:seg_len]
+    else:
+        count_array = np.bincount(rows[inside]*seg_len + positions,minlength=num_rows*seg_len)
+        count_array = count_array[:num_rows*seg_len].reshape((num_rows,seg_len))
+
+    return read_idx[inside], count_array.astype(LONG)
+
+
+def _map_at_offsets(object block_starts, object block_ends, object block_offsets, GenomicSegment seg,
+                    object read_offsets, object rows = None, int num_rows = 0):
+    """Map each read at a single position, given as an offset from the read's
+    leftmost aligned position. Reads with negative offsets are ignored.
+    Returns indices of mapped reads, count array, and a boolean array
+    marking reads that could not be mapped"""
+    block_starts, block_offsets, cumlength, read_lengths = _prepare_block_arrays(block_starts,block_ends,block_offsets)
+    read_offsets = np.broadcast_to(read_offsets,read_lengths.shape)
+    unmappable   = (read_offsets < 0) | (read_offsets >= read_lengths)
+    read_idx     = (~unmappable).nonzero()[0]
+    positions    = _positions_at(block_starts,block_offsets,cumlength,read_idx,read_offsets[read_idx])
+    if rows is not None:
+        rows = rows[read_idx]
+
+    reads_out, count_array = _count_sites(read_idx,positions,rows,seg.start,seg.end - seg.start,num_rows)
+    return reads_out, count_array, unmappable
+
+
 #===============================================================================
 # Factories for mapping functions for BAMGenomeArray or other structures
 # Each factory returns a function that takes a list of pysam.AlignedSegments
@@ -195,6 +420,12 @@ cdef class CenterMapFactory:
 
         self.nibble = nibble
 
+    def __repr__(self):
+        return "<%s nibble=%s>" % (self.__class__.__name__,self.nibble)
+
+    def __reduce__(self):
+        return (self.__class__,(self.nibble,))
+
     @cython.boundscheck(False) # valid because indices are explicitly checked
     @cython.cdivision(True) # we can do this because we explicitly check map_length > 0
     def __call__(self, list reads not None, GenomicSegment seg not None):
@@ -226,40 +457,174 @@ cdef class CenterMapFactory:
         cdef long seg_len   = seg_end - seg_start
         cdef unsigned int nibble = self.nibble
 
-        # count array we will return
-        cdef np.ndarray[DOUBLE_t,ndim=1] count_array = np.zeros(seg_len,dtype=DOUBLE)
-        cdef double [:] count_view = count_array
+        # difference arrays of counts and of coverage, one position longer
+        # than seg to hold ends of blocks that run to the end of seg
+        cdef np.ndarray[DOUBLE_t,ndim=2] diff_array  = np.zeros((1,seg_len + 1),dtype=DOUBLE)
+        cdef np.ndarray[LONG_t,ndim=2]   cover_array = np.zeros((1,seg_len + 1),dtype=LONG)
+        cdef double [:,:] diff_view  = diff_array
+        cdef long   [:,:] cover_view = cover_array
 
         cdef list reads_out = []
-        cdef list read_positions
  
         cdef:
             AlignedSegment read 
-            int coord, map_length
-            unsigned int read_length, i
+            int map_length
+            int read_length
             DOUBLE_t val
        
         for read in reads:
-            read_positions = <list>read.positions
-            read_length = len(read_positions)
+            read_length = _aligned_length(read)
             map_length = read_length - 2*nibble
             if map_length < 0:
                 do_warn = 1
                 continue
             elif map_length > 0:
                 val = 1.0 / map_length
-                for i in range(nibble,read_length - nibble):
-                    coord = <long>(read_positions[i]) - seg_start
-                    if coord >= 0 and coord < seg_len:
-                        count_view[coord] += val
-
+                _spread_over_blocks(read,read_length,nibble,val,seg_start,seg_len,diff_view,cover_view,0)
                 reads_out.append(read)
 
         if do_warn == 1:
             warn_onceperfamily("Data contains read alignments shorter than `2*nibble` value of '%s' nt. Ignoring these." % (2*nibble),
                   DataWarning)
         
-        return reads_out, count_array
+        return reads_out, _integrate_blocks(diff_array,cover_array)[0]
+
+    @cython.boundscheck(False) # valid because indices are explicitly checked
+    @cython.cdivision(True) # we can do this because we explicitly check map_length > 0
+    def map_stratified(self, list reads not None, GenomicSegment seg not None, int min_length, int max_length):
+        """Map reads covering a region into a 2D count array, in which counts
+        at each position (column) are stratified by read length (row), in a
+        single pass over the reads. Mapping within each row follows the same
+        rule as :meth:`CenterMapFactory.__call__`. Reads outside the length
+        window are ignored.
+
+        Parameters
+        ----------
+        reads : list of :py:class:`pysam.AlignedSegment`
+            Reads to map
+
+        seg : |GenomicSegment|
+            Region of interest
+
+        min_length : int
+            Minimum read length to map
+
+        max_length : int
+            Maximum read length to map, inclusive
+
+        Returns
+        -------
+        list
+            List of reads that were mapped into the output array
+
+        :py:class:`numpy.ndarray`
+            2D array of counts, with one row for each read length from
+            `min_length` to `max_length`, and one column for each position in `seg`
+        """
+        cdef:
+            bint do_warn = 0
+            long seg_start = seg.start
+            long seg_end   = seg.end
+            long seg_len   = seg_end - seg_start
+            unsigned int nibble = self.nibble
+            int num_lengths = _check_length_window(min_length,max_length)
+
+            np.ndarray[DOUBLE_t,ndim=2] diff_array  = np.zeros((num_lengths,seg_len + 1),dtype=DOUBLE)
+            np.ndarray[LONG_t,ndim=2]   cover_array = np.zeros((num_lengths,seg_len + 1),dtype=LONG)
+            double [:,:] diff_view  = diff_array
+            long   [:,:] cover_view = cover_array
+
+            list reads_out = []
+            AlignedSegment read
+            int map_length, row
+            int read_length
+            DOUBLE_t val
+
+        for read in reads:
+            read_length = _aligned_length(read)
+            if read_length < min_length or read_length > max_length:
+                continue
+
+            map_length = read_length - 2*nibble
+            if map_length < 0:
+                do_warn = 1
+                continue
+            elif map_length > 0:
+                row = read_length - min_length
+                val = 1.0 / map_length
+                _spread_over_blocks(read,read_length,nibble,val,seg_start,seg_len,diff_view,cover_view,row)
+                reads_out.append(read)
+
+        if do_warn == 1:
+            warn_onceperfamily("Data contains read alignments shorter than `2*nibble` value of '%s' nt. Ignoring these." % (2*nibble),
+                  DataWarning)
+
+        return reads_out, _integrate_blocks(diff_array,cover_array)
+
+    def map_arrays(self, object block_starts, object block_ends, object block_offsets, GenomicSegment seg not None):
+        """Array-based alternative to :meth:`CenterMapFactory.__call__`, for
+        reads supplied as arrays of aligned blocks (e.g. from non-`BAM`_ sources,
+        or from :func:`reads_to_block_arrays`). Counting is vectorized, so
+        there is no per-read overhead in Python.
+
+        Parameters
+        ----------
+        block_starts : :py:class:`numpy.ndarray`
+            Genomic start of each aligned block, 0-indexed
+
+        block_ends : :py:class:`numpy.ndarray`
+            Genomic end of each aligned block, 0-indexed, half-open
+
+        block_offsets : :py:class:`numpy.ndarray`
+            Offsets of each read's blocks in `block_starts` and `block_ends`.
+            Blocks from read `i` are at ``block_offsets[i]:block_offsets[i+1]``.
+            Unspliced reads each have one block.
+
+        seg : |GenomicSegment|
+            Region of interest
+
+        Returns
+        -------
+        :py:class:`numpy.ndarray`
+            Indices of reads that were mapped into the output array
+
+        :py:class:`numpy.ndarray`
+            Vector of counts at each position in `seg`
+        """
+        cdef:
+            long seg_start = seg.start
+            long seg_len   = seg.end - seg.start
+            int nibble     = self.nibble
+
+        block_starts, block_offsets, cumlength, read_lengths = _prepare_block_arrays(block_starts,block_ends,block_offsets)
+        map_lengths = read_lengths - 2*nibble
+        if (map_lengths < 0).any():
+            warn_onceperfamily("Data contains read alignments shorter than `2*nibble` value of '%s' nt. Ignoring these." % (2*nibble),
+                  DataWarning)
+
+        # trim each block to the part of its read that remains after nibbling,
+        # in coordinates relative to the read's leftmost aligned position
+        block_read = np.repeat(np.arange(len(read_lengths)),np.diff(block_offsets))
+        read_first = cumlength[block_offsets[:-1]][block_read]
+        block_lo   = cumlength[:-1] - read_first
+        block_hi   = cumlength[1:] - read_first
+        trim_lo    = np.maximum(block_lo,nibble)
+        trim_hi    = np.minimum(block_hi,read_lengths[block_read] - nibble)
+
+        # spread 1/N counts over trimmed blocks using a difference array
+        keep   = trim_lo < trim_hi
+        starts = np.clip(block_starts[keep] + trim_lo[keep] - block_lo[keep] - seg_start,0,seg_len)
+        ends   = np.clip(block_starts[keep] + trim_hi[keep] - block_lo[keep] - seg_start,0,seg_len)
+        vals   = 1.0 / map_lengths[block_read[keep]]
+
+        count_array = np.cumsum(np.bincount(starts,weights=vals,minlength=seg_len+1)
+                                - np.bincount(ends,weights=vals,minlength=seg_len+1))[:seg_len]
+
+        # zero out rounding residue at positions no read covers
+        coverage = np.cumsum(np.bincount(starts,minlength=seg_len+1) - np.bincount(ends,minlength=seg_len+1))[:seg_len]
+        count_array[coverage == 0] = 0
+
+        return (map_lengths > 0).nonzero()[0], count_array.astype(DOUBLE)
 
     property nibble:
         """Number of positions to trim from each side of read alignment before assigning genomic positions."""
@@ -298,6 +663,12 @@ cdef class FivePrimeMapFactory:
             raise ValueError("FivePrimeMapFactory: `offset` must be <= 0. Got %s." % offset)
         self.offset = offset
 
+    def __repr__(self):
+        return "<%s offset=%s>" % (self.__class__.__name__,self.offset)
+
+    def __reduce__(self):
+        return (self.__class__,(self.offset,))
+
     def __call__(self, list reads not None, GenomicSegment seg not None):
         """Returns reads covering a region, and a count vector mapping reads
         to specific positions in the region, mapping reads at `self.offset`
@@ -356,6 +727,119 @@ cdef class FivePrimeMapFactory:
 
         return reads_out, count_array
 
+    def map_stratified(self, list reads not None, GenomicSegment seg not None, int min_length, int max_length):
+        """Map reads covering a region into a 2D count array, in which counts
+        at each position (column) are stratified by read length (row), in a
+        single pass over the reads. Mapping within each row follows the same
+        rule as :meth:`FivePrimeMapFactory.__call__`. Reads outside the length
+        window are ignored.
+
+        Parameters
+        ----------
+        reads : list of :py:class:`pysam.AlignedSegment`
+            Reads to map
+
+        seg : |GenomicSegment|
+            Region of interest
+
+        min_length : int
+            Minimum read length to map
+
+        max_length : int
+            Maximum read length to map, inclusive
+
+        Returns
+        -------
+        list
+            List of reads that were mapped into the output array
+
+        :py:class:`numpy.ndarray`
+            2D array of counts, with one row for each read length from
+            `min_length` to `max_length`, and one column for each position in `seg`
+        """
+        cdef:
+            long seg_start = seg.start
+            long seg_end   = seg.end
+            long seg_len   = seg_end - seg_start
+            int num_lengths = _check_length_window(min_length,max_length)
+            np.ndarray[LONG_t,ndim=2] count_array = np.zeros((num_lengths,seg_len),dtype=LONG)
+            long [:,:] count_view = count_array
+
+            list reads_out = []
+            list read_positions
+            AlignedSegment read
+            long p_site
+            int read_length
+            int do_warn = 0
+            int read_offset = self.offset
+
+        if seg.c_strand == reverse_strand:
+            read_offset = -read_offset - 1
+
+        for read in reads:
+            read_positions = <list>read.positions
+            read_length = len(read_positions)
+            if read_length < min_length or read_length > max_length:
+                continue
+
+            if self.offset >= read_length:
+                do_warn = 1
+                continue
+
+            p_site = read_positions[read_offset]
+            if p_site >= seg_start and p_site < seg_end:
+                reads_out.append(read)
+                count_view[read_length - min_length,p_site - seg_start] += 1
+
+        if do_warn == 1:
+            warn_onceperfamily("Data contains read alignments shorter than offset (%s nt). Ignoring." % self.offset,
+                 DataWarning)
+
+        return reads_out, count_array
+
+    def map_arrays(self, object block_starts, object block_ends, object block_offsets, GenomicSegment seg not None):
+        """Array-based alternative to :meth:`FivePrimeMapFactory.__call__`, for
+        reads supplied as arrays of aligned blocks (e.g. from non-`BAM`_ sources,
+        or from :func:`reads_to_block_arrays`). Counting is vectorized, so
+        there is no per-read overhead in Python.
+
+        Parameters
+        ----------
+        block_starts : :py:class:`numpy.ndarray`
+            Genomic start of each aligned block, 0-indexed
+
+        block_ends : :py:class:`numpy.ndarray`
+            Genomic end of each aligned block, 0-indexed, half-open
+
+        block_offsets : :py:class:`numpy.ndarray`
+            Offsets of each read's blocks in `block_starts` and `block_ends`.
+            Blocks from read `i` are at ``block_offsets[i]:block_offsets[i+1]``.
+            Unspliced reads each have one block.
+
+        seg : |GenomicSegment|
+            Region of interest
+
+        Returns
+        -------
+        :py:class:`numpy.ndarray`
+            Indices of reads that were mapped into the output array
+
+        :py:class:`numpy.ndarray`
+            Vector of counts at each position in `seg`
+        """
+        _, _, _, read_lengths = _prepare_block_arrays(block_starts,block_ends,block_offsets)
+        if seg.c_strand == reverse_strand:
+            read_offsets = read_lengths - self.offset - 1
+        else:
+            read_offsets = np.full_like(read_lengths,self.offset)
+
+        reads_out, count_array, unmappable = _map_at_offsets(block_starts,block_ends,block_offsets,seg,read_offsets)
+        if unmappable.any():
+            warn_onceperfamily("Data contains read alignments shorter than offset (%s nt). Ignoring." % (self.offset),
+                 DataWarning)
+
+        return reads_out, count_array
+
     property offset:
         """Distance from 5' end of read at which to assign reads"""
         def __get__(self):
@@ -392,6 +876,12 @@ cdef class ThreePrimeMapFactory:
             raise ValueError("ThreePrimeMapFactory: `offset` must be <= 0. Got %s." % offset)
         self.offset = offset
 
+    def __repr__(self):
+        return "<%s offset=%s>" % (self.__class__.__name__,self.offset)
+
+    def __reduce__(self):
+        return (self.__class__,(self.offset,))
+
     def __call__(self, list reads not None, GenomicSegment seg not None):
         """Returns reads covering a region, and a count vector mapping reads
         to specific positions in the region, mapping reads at `self.offset`
@@ -450,6 +940,119 @@ cdef class ThreePrimeMapFactory:
 
         return reads_out, count_array
 
+    def map_stratified(self, list reads not None, GenomicSegment seg not None, int min_length, int max_length):
+        """Map reads covering a region into a 2D count array, in which counts
+        at each position (column) are stratified by read length (row), in a
+        single pass over the reads. Mapping within each row follows the same
+        rule as :meth:`ThreePrimeMapFactory.__call__`. Reads outside the length
+        window are ignored.
+
+        Parameters
+        ----------
+        reads : list of :py:class:`pysam.AlignedSegment`
+            Reads to map
+
+        seg : |GenomicSegment|
+            Region of interest
+
+        min_length : int
+            Minimum read length to map
+
+        max_length : int
+            Maximum read length to map, inclusive
+
+        Returns
+        -------
+        list
+            List of reads that were mapped into the output array
+
+        :py:class:`numpy.ndarray`
+            2D array of counts, with one row for each read length from
+            `min_length` to `max_length`, and one column for each position in `seg`
+        """
+        cdef:
+            long seg_start = seg.start
+            long seg_end   = seg.end
+            long seg_len   = seg_end - seg_start
+            int num_lengths = _check_length_window(min_length,max_length)
+            np.ndarray[LONG_t,ndim=2] count_array = np.zeros((num_lengths,seg_len),dtype=LONG)
+            long [:,:] count_view = count_array
+
+            list reads_out = []
+            list read_positions
+            AlignedSegment read
+            long p_site
+            int read_length
+            int do_warn = 0
+            int read_offset = self.offset
+
+        if seg.c_strand != reverse_strand:
+            read_offset = -read_offset - 1
+
+        for read in reads:
+            read_positions = <list>read.positions
+            read_length = len(read_positions)
+            if read_length < min_length or read_length > max_length:
+                continue
+
+            if self.offset >= read_length:
+                do_warn = 1
+                continue
+
+            p_site = read_positions[read_offset]
+            if p_site >= seg_start and p_site < seg_end:
+                reads_out.append(read)
+                count_view[read_length - min_length,p_site - seg_start] += 1
+
+        if do_warn == 1:
+            warn_onceperfamily("Data contains read alignments shorter than offset (%s nt). Ignoring." % self.offset,
+                 DataWarning)
+
+        return reads_out, count_array
+
+
+    def map_arrays(self, object block_starts, object block_ends, object block_offsets, GenomicSegment seg not None):
+        """Array-based alternative to :meth:`ThreePrimeMapFactory.__call__`, for
+        reads supplied as arrays of aligned blocks (e.g. from non-`BAM`_ sources,
+        or from :func:`reads_to_block_arrays`). Counting is vectorized, so
+        there is no per-read overhead in Python.
+
+        Parameters
+        ----------
+        block_starts : :py:class:`numpy.ndarray`
+            Genomic start of each aligned block, 0-indexed
+
+        block_ends : :py:class:`numpy.ndarray`
+            Genomic end of each aligned block, 0-indexed, half-open
+
+        block_offsets : :py:class:`numpy.ndarray`
+            Offsets of each read's blocks in `block_starts` and `block_ends`.
+            Blocks from read `i` are at ``block_offsets[i]:block_offsets[i+1]``.
+            Unspliced reads each have one block.
+
+        seg : |GenomicSegment|
+            Region of interest
+
+        Returns
+        -------
+        :py:class:`numpy.ndarray`
+            Indices of reads that were mapped into the output array
+
+        :py:class:`numpy.ndarray`
+            Vector of counts at each position in `seg`
+        """
+        _, _, _, read_lengths = _prepare_block_arrays(block_starts,block_ends,block_offsets)
+        if seg.c_strand != reverse_strand:
+            read_offsets = read_lengths - self.offset - 1
+        else:
+            read_offsets = np.full_like(read_lengths,self.offset)
+
+        reads_out, count_array, unmappable = _map_at_offsets(block_starts,block_ends,block_offsets,seg,read_offsets)
+        if unmappable.any():
+            warn_onceperfamily("Data contains read alignments shorter than offset (%s nt). Ignoring." % self.offset,
+                 DataWarning)
+
+        return reads_out, count_array
 
     property offset:
         """Distance from 3' end of read at which to assign reads"""
@@ -501,6 +1104,8 @@ cdef class VariableFivePrimeMapFactory:
         # reuse of this __cinit__ in StratifiedVariableFivePrimeMapFactory.
         if offset_dict is None:
             offset_dict = { "default" : 0 }
+
+        self.offset_dict = dict(offset_dict)
             
         if "default" in offset_dict:
             default = int(offset_dict["default"])
@@ -526,6 +1131,13 @@ cdef class VariableFivePrimeMapFactory:
 
                 fw_view[read_length] = offset
                 rc_view[read_length] = read_length - offset - 1
+
+    def __repr__(self):
+        offsets = ", ".join(["%s: %s" % X for X in sorted(self.offset_dict.items(),key=str)])
+        return "<%s offset_dict={%s}>" % (self.__class__.__name__,offsets)
+
+    def __reduce__(self):
+        return (self.__class__,(self.offset_dict,))
     
     @staticmethod
     def from_file(object fn_or_fh):
@@ -628,6 +1240,148 @@ cdef class VariableFivePrimeMapFactory:
 
         return reads_out, count_array
 
+    @cython.boundscheck(False) # valid because indices are explicitly checked in __cinit__
+    def map_stratified(self, list reads not None, GenomicSegment seg not None, int min_length, int max_length):
+        """Map reads covering a region into a 2D count array, in which counts
+        at each position (column) are stratified by read length (row), in a
+        single pass over the reads. Mapping within each row follows the same
+        rule as :meth:`VariableFivePrimeMapFactory.__call__`. Reads outside the length
+        window are ignored.
+
+        Parameters
+        ----------
+        reads : list of :py:class:`pysam.AlignedSegment`
+            Reads to map
+
+        seg : |GenomicSegment|
+            Region of interest
+
+        min_length : int
+            Minimum read length to map
+
+        max_length : int
+            Maximum read length to map, inclusive
+
+        Returns
+        -------
+        list
+            List of reads that were mapped into the output array
+
+        :py:class:`numpy.ndarray`
+            2D array of counts, with one row for each read length from
+            `min_length` to `max_length`, and one column for each position in `seg`
+        """
+        cdef:
+            int [:] offsets = self.forward_offsets
+
+            long seg_start = seg.start
+            long seg_end   = seg.end
+            long seg_len   = seg_end - seg_start
+            int num_lengths = _check_length_window(min_length,max_length)
+
+            int no_offset_length
+            int do_no_offset_warning = 0
+
+            int            read_length, offset
+            long           p_site
+            AlignedSegment read
+
+            np.ndarray count_array = np.zeros((num_lengths,seg_len),dtype=LONG)
+            long [:,:] count_view  = count_array
+            list read_positions
+            list reads_out       = []
+
+        if seg.c_strand == reverse_strand:
+            offsets = self.reverse_offsets
+
+        for read in reads:
+            read_positions = <list>read.positions
+            read_length    = len(read_positions)
+            if read_length < min_length or read_length > max_length:
+                continue
+
+            offset = offsets[read_length]
+            if offset == _BAD_OFFSET:
+                do_no_offset_warning = 1
+                no_offset_length = read_length
+                continue
+
+            p_site = read_positions[offset]
+            if p_site >= seg_start and p_site < seg_end:
+                reads_out.append(read)
+                count_view[read_length - min_length,p_site - seg_start] += 1
+
+        if do_no_offset_warning == 1:
+            warn_onceperfamily("No usable offset for reads of length %s nt in offset dict. Ignoring these." % (no_offset_length),
+                 DataWarning)
+
+        return reads_out, count_array
+
+    def map_arrays(self, object block_starts, object block_ends, object block_offsets, GenomicSegment seg not None):
+        """Array-based alternative to :meth:`VariableFivePrimeMapFactory.__call__`, for
+        reads supplied as arrays of aligned blocks (e.g. from non-`BAM`_ sources,
+        or from :func:`reads_to_block_arrays`). Counting is vectorized, so
+        there is no per-read overhead in Python.
+
+        Parameters
+        ----------
+        block_starts : :py:class:`numpy.ndarray`
+            Genomic start of each aligned block, 0-indexed
+
+        block_ends : :py:class:`numpy.ndarray`
+            Genomic end of each aligned block, 0-indexed, half-open
+
+        block_offsets : :py:class:`numpy.ndarray`
+            Offsets of each read's blocks in `block_starts` and `block_ends`.
+            Blocks from read `i` are at ``block_offsets[i]:block_offsets[i+1]``.
+            Unspliced reads each have one block.
+
+        seg : |GenomicSegment|
+            Region of interest
+
+        Returns
+        -------
+        :py:class:`numpy.ndarray`
+            Indices of reads that were mapped into the output array
+
+        :py:class:`numpy.ndarray`
+            Vector of counts at each position in `seg`
+        """
+        reads_out, count_array, _ = self._map_arrays_at_offsets(block_starts,block_ends,block_offsets,seg)
+        return reads_out, count_array
+
+    def _map_arrays_at_offsets(self, object block_starts, object block_ends, object block_offsets,
+                               GenomicSegment seg, int min_length = 1, int max_length = 9999,
+                               bint stratify = False):
+        """Look up offsets for reads supplied as arrays of aligned blocks, and
+        map them. Reads outside `min_length` and `max_length` are ignored.
+        Returns indices of mapped reads, a count array (stratified by read
+        length into rows, if `stratify` is `True`), and lengths of all reads"""
+        cdef int [:] offsets = self.forward_offsets
+        if seg.c_strand == reverse_strand:
+            offsets = self.reverse_offsets
+
+        _, _, _, read_lengths = _prepare_block_arrays(block_starts,block_ends,block_offsets)
+        offset_table = np.asarray(offsets)
+        in_window    = (read_lengths >= min_length) & (read_lengths <= max_length)
+        read_offsets = np.full_like(read_lengths,-1)
+        read_offsets[in_window] = offset_table[read_lengths[in_window]]
+
+        no_offset = in_window & (read_offsets == _BAD_OFFSET)
+        if no_offset.any():
+            warn_onceperfamily("No usable offset for reads of length %s nt in offset dict. Ignoring these." % (read_lengths[no_offset][-1]),
+                 DataWarning)
+
+        if stratify == True:
+            rows = read_lengths - min_length
+            num_rows = max_length - min_length + 1
+        else:
+            rows = None
+            num_rows = 0
+
+        reads_out, count_array, _ = _map_at_offsets(block_starts,block_ends,block_offsets,seg,read_offsets,rows,num_rows)
+        return reads_out, count_array, read_lengths
+
 
 cdef class StratifiedVariableFivePrimeMapFactory(VariableFivePrimeMapFactory):
     """
@@ -699,6 +1453,13 @@ cdef class StratifiedVariableFivePrimeMapFactory(VariableFivePrimeMapFactory):
         self.max_length  = max
         self._numlengths = max - min + 1
 
+    def __repr__(self):
+        offsets = ", ".join(["%s: %s" % X for X in sorted(self.offset_dict.items(),key=str)])
+        return "<%s offset_dict={%s} min=%s max=%s>" % (self.__class__.__name__,offsets,self.min_length,self.max_length)
+
+    def __reduce__(self):
+        return (self.__class__,(self.offset_dict,self.min_length,self.max_length))
+
     @cython.boundscheck(False) # valid because indices are explicitly checked in VariableFivePrimeMapFactory.__cinit__
     def __call__(self, list reads not None, GenomicSegment seg not None):
         """
@@ -758,6 +1519,41 @@ cdef class StratifiedVariableFivePrimeMapFactory(VariableFivePrimeMapFactory):
 
         return reads_out, count_array
 
+    def map_arrays(self, object block_starts, object block_ends, object block_offsets, GenomicSegment seg not None):
+        """Array-based alternative to :meth:`StratifiedVariableFivePrimeMapFactory.__call__`, for
+        reads supplied as arrays of aligned blocks (e.g. from non-`BAM`_ sources,
+        or from :func:`reads_to_block_arrays`). Counting is vectorized, so
+        there is no per-read overhead in Python.
+
+        Parameters
+        ----------
+        block_starts : :py:class:`numpy.ndarray`
+            Genomic start of each aligned block, 0-indexed
+
+        block_ends : :py:class:`numpy.ndarray`
+            Genomic end of each aligned block, 0-indexed, half-open
+
+        block_offsets : :py:class:`numpy.ndarray`
+            Offsets of each read's blocks in `block_starts` and `block_ends`.
+            Blocks from read `i` are at ``block_offsets[i]:block_offsets[i+1]``.
+            Unspliced reads each have one block.
+
+        seg : |GenomicSegment|
+            Region of interest
+
+        Returns
+        -------
+        :py:class:`numpy.ndarray`
+            Indices of reads that were mapped into the output array
+
+        :py:class:`numpy.ndarray`
+            2D array, in which each cell value is the number of counts
+            of a given length (row) at  given position (column)
+        """
+        reads_out, count_array, _ = self._map_arrays_at_offsets(block_starts,block_ends,block_offsets,seg,
+                                                                self.min_length,self.max_length,True)
+        return reads_out, count_array
+
     property row_keys:
         """numpy array of read lengths corresponding to each row of mapped data."""
         def __get__(self):
@@ -770,7 +1566,84 @@ cdef class StratifiedVariableFivePrimeMapFactory(VariableFivePrimeMapFactory):
             return [self._numlengths]
 
 
-cdef class SizeFilterFactory:
+#===============================================================================
+# Read filters for BAMGenomeArray. Filters defined as AlignmentFilterFactory
+# objects are combined and applied in a single compiled pass over reads by
+# filter_alignments(). Other callables are applied afterwards, in Python.
+#===============================================================================
+
+cdef class AlignmentFilterFactory:
+    """
+    AlignmentFilterFactory(min_length = 1, max_length = -1, min_mapq = 0, require_flags = 0, exclude_flags = 0)
+
+    Declarative read filter that can be applied at runtime to a |BAMGenomeArray|
+    using :meth:`BAMGenomeArray.add_filter`.
+
+    Unlike arbitrary filter functions, all |AlignmentFilterFactory| filters
+    added to a |BAMGenomeArray| are combined with strand-matching and applied
+    in a single compiled pass inside the fetch loop (see :func:`filter_alignments`).
+    Instances are also callable, so they may be used anywhere a filter function
+    is expected.
+
+    Parameters
+    ----------
+    min_length : int, optional
+        Minimum read length to pass filter, inclusive (Default: `1`)
+
+    max_length : int, optional
+        Maximum read length to pass filter, inclusive. If `-1`,
+        then there is no maximum length filter. (Default: `-1`, no filter)
+
+    min_mapq : int, optional
+        Minimum mapping quality to pass filter, inclusive (Default: `0`)
+
+    require_flags : int, optional
+        Bitmask of SAM flags that must all be set for a read to pass
+        filter (Default: `0`, no requirement)
+
+    exclude_flags : int, optional
+        Bitmask of SAM flags, none of which may be set for a read to pass
+        filter (Default: `0`, no exclusion)
+    """
+
+    def __init__(self, int min_length = 1, int max_length = -1, int min_mapq = 0,
+                 int require_flags = 0, int exclude_flags = 0):
+        if max_length != -1 and max_length < min_length:
+            raise ValueError("Alignment filter: max read length must be >= min read length")
+
+        if min_length < 1:
+            raise ValueError("Alignment filter: min read length must be >= 1. Got %s" % min_length)
+
+        if min_mapq < 0:
+            raise ValueError("Alignment filter: min mapping quality must be >= 0. Got %s" % min_mapq)
+
+        self.min_length    = min_length
+        self.max_length    = max_length
+        self.min_mapq      = min_mapq
+        self.require_flags = require_flags
+        self.exclude_flags = exclude_flags
+
+    def __call__(self, AlignedSegment read not None):
+        cdef:
+            int my_length = _aligned_length(read)
+            int flag = read.flag
+
+        return my_length >= self.min_length \
+               and (my_length <= self.max_length or self.max_length == -1) \
+               and read.mapping_quality >= self.min_mapq \
+               and (flag & self.require_flags) == self.require_flags \
+               and (flag & self.exclude_flags) == 0
+
+    def __repr__(self):
+        return "<%s min_length=%s max_length=%s min_mapq=%s require_flags=%s exclude_flags=%s>" % (self.__class__.__name__,
+                                                                                                   self.min_length,
+                                                                                                   self.max_length,
+                                                                                                   self.min_mapq,
+                                                                                                   self.require_flags,
+                                                                                                   self.exclude_flags)
+
+
+cdef class SizeFilterFactory(AlignmentFilterFactory):
     """
     SizeFilterFactory(min = 1, max = -1)
     
@@ -787,7 +1660,7 @@ cdef class SizeFilterFactory:
         then there is no maximum length filter. (Default: -1, no filter)
     """
 
-    def __cinit__(self,int min = 1, int max = -1):
+    def __init__(self,int min = 1, int max = -1):
         """Create a read-length filter can be applied at runtime to a |BAMGenomeArray|
         using ::meth:`BAMGenomeArray.add_filter`
         
@@ -806,14 +1679,78 @@ cdef class SizeFilterFactory:
         """
         if max != -1 and max < min:
             raise ValueError("Alignment size filter: max read length must be >= min read length")
-
         if min < 1:
             raise ValueError("Alignment size filter: min read length must be >= 1. Got %s" % min)
 
-        self.min_ = min
-        self.max_ = max
-        
-    def __call__(self,AlignedSegment read not None):
-        cdef unsigned int my_length = len(read.positions)
-        return my_length >= self.min_ and (my_length <= self.max_ or self.max_ == -1)
+        AlignmentFilterFactory.__init__(self,min_length=min,max_length=max)
+
+    def __repr__(self):
+        return "<%s min=%s max=%s>" % (self.__class__.__name__,self.min_length,self.max_length)
+
+
+def filter_alignments(object reads, str strand = ".", object filters = ()):
+    """filter_alignments(reads, strand = '.', filters = ())
+
+    Strand-match read alignments and apply |AlignmentFilterFactory| filters
+    to them in a single compiled pass.
+
+    Parameters
+    ----------
+    reads : iterable
+        :class:`pysam.AlignedSegment` to filter
+
+    strand : str, optional
+        `'+'`, `'-'`, or `'.'`. If `'+'` or `'-'`, only reads aligning to that
+        strand pass. If `'.'`, reads are not strand-matched. (Default: `'.'`)
+
+    filters : sequence of |AlignmentFilterFactory|, optional
+        Filters to apply. A read must pass all of them. (Default: no filters)
+
+    Returns
+    -------
+    list
+        :class:`pysam.AlignedSegment` passing all filters, in input order
+    """
+    cdef:
+        AlignmentFilterFactory my_filter
+        AlignedSegment read
+        list reads_out = []
+        int min_length = 1
+        int max_length = -1
+        int min_mapq   = 0
+        int require_flags = 0
+        int exclude_flags = 0
+        int flag, read_length
+        bint check_length
+
+    # combine filters into a single set of bounds
+    for my_filter in filters:
+        min_length     = max(min_length,my_filter.min_length)
+        min_mapq       = max(min_mapq,my_filter.min_mapq)
+        require_flags |= my_filter.require_flags
+        exclude_flags |= my_filter.exclude_flags
+        if my_filter.max_length != -1:
+            max_length = my_filter.max_length if max_length == -1 else min(max_length,my_filter.max_length)
+
+    if strand == "+":
+        exclude_flags |= _FLAG_REVERSE
+    elif strand == "-":
+        require_flags |= _FLAG_REVERSE
+
+    check_length = min_length > 1 or max_length != -1
+    for read in reads:
+        flag = read.flag
+        if (flag & require_flags) != require_flags or (flag & exclude_flags) != 0:
+            continue
+
+        if min_mapq > 0 and read.mapping_quality < min_mapq:
+            continue
+
+        if check_length:
+            read_length = _aligned_length(read)
+            if read_length < min_length or (max_length != -1 and read_length > max_length):
+                continue
+
+        reads_out.append(read)
 
+    return reads_out
@@ -22,12 +22,30 @@ cdef extern from "<common.h>" nogil:
     ctypedef unsigned long long bits64
 
     void freeMem(void *pt)
-#     
-#     cdef struct fileOffsetSize:
-#         fileOffsetSize * next
-#         bits64           offset
-#         bits64           size
-    
+
+    cdef struct fileOffsetSize:
+        fileOffsetSize * next
+        bits64           offset
+        bits64           size
+
+    void slFreeList(void *listPt)
+    bits32 memReadBits32(char **pPt, bint isSwapped)
+    float memReadFloat(char **pPt, bint isSwapped)
+
+
+cdef extern from "<udc.h>" nogil:
+    cdef struct udcFile
+
+    void udcSeek(udcFile *file, bits64 offset)
+    void udcMustRead(udcFile *file, void *buf, bits64 size)
+
+
+cdef extern from "<zlibFace.h>" nogil:
+    size_t zUncompress(void *compressed, size_t compressedSize, void *uncompBuf, size_t uncompBufSize)
+
+
+cdef extern from "<cirTree.h>":
+    cdef struct cirTreeFile
 
 
 cdef extern from "<bits.h>":
@@ -42,7 +60,7 @@ cdef extern from "<bits.h>":
     bint bitReadOne(Bits *b, int bitIx)
 
 
-cdef extern from "<localmem.h>":
+cdef extern from "<localmem.h>" nogil:
     cdef struct lm:
         lmBlock *blocks
         size_t blockSize
@@ -61,6 +79,7 @@ cdef extern from "<localmem.h>":
     void * lmAlloc(lm *lm, size_t size)
     void * lmAllocMoreMem(lm *lm, void *pt, size_t oldSize, size_t newSize)
     void lmCleanup(lm **pLm)
+    char * lmCloneStringZ(lm *lm, char *string, int size)
 
 
 cdef extern from "<bbiFile.h>":
@@ -73,7 +92,7 @@ cdef extern from "<bbiFile.h>":
     cdef struct bbiFile:
         bbiFile *next
         char *fileName
-        #struct udcFile *udc
+        udcFile *udc
         bits32 typeSig
         bint   isSwapped
         #struct bptFile *chromBpt
@@ -88,7 +107,7 @@ cdef extern from "<bbiFile.h>":
         bits64 totalSummaryOffset
         bits32 uncompressBufSize
         #bits64 extensionOffset
-        #struct cirTreeFile unzoomedCir
+        cirTreeFile *unzoomedCir
         bbiZoomLevel *levelList
         #bits16 extensionSize
         bits16 extraIndexCount
@@ -129,7 +148,9 @@ cdef extern from "<bbiFile.h>":
         bbiSumCoverage          = 3
         bbiSumStandardDeviation = 4
 
-    # bbiFile *bbiFileOpen(char *fileName, bits32 sig, char *typeName)
+    bbiFile *bbiFileOpen(char *fileName, bits32 sig, char *typeName)
+
+    bbiZoomLevel *bbiBestZoom(bbiZoomLevel *levelList, int desiredReduction)
 
     void bbiFileClose(bbiFile **pBwf)
 
@@ -144,6 +165,15 @@ cdef extern from "<bbiFile.h>":
 
     bbiSummaryElement bbiTotalSummary(bbiFile *bbi)
 
+    void bbiAttachUnzoomedCir(bbiFile *bbi)
+
+    fileOffsetSize *bbiOverlappingBlocks(bbiFile *bbi,
+                                         cirTreeFile *ctf,
+                                         char *chrom,
+                                         bits32 start,
+                                         bits32 end,
+                                         bits32 *retChromId) nogil
+
 
 # cdef extern from "<cirTree.h>":
 #     cdef struct cirTreeFile:
@@ -180,6 +210,13 @@ cdef lm * get_lm(lm * my_lm=*, int maxmem=*) except NULL
 #===============================================================================
 
 
+cdef class _BBI_Handle:
+
+    cdef:
+        bbiFile * bbi
+        lm *      lm
+
+
 cdef class _BBI_Reader:
 
     cdef:
@@ -190,6 +227,13 @@ cdef class _BBI_Reader:
         dict      _summary
         lm *      _lm
         long      _maxmem
+        bint      threadsafe
+        object    _local
+        object    _block_cache
+        long      _cache_max
+        long      _cache_bytes
+        long      _cache_hits
+        long      _cache_misses
 
 #         dict _zoomlevels
 #         dict offsets
@@ -198,4 +242,10 @@ cdef class _BBI_Reader:
     cdef dict _define_chroms(self)
     cdef dict c_chroms(self)
     cdef lm* _get_lm(self)
+    cdef bbiFile * _get_bbi(self) except NULL
+    cdef bbiFile * _open_bbi(self) except NULL
+    cdef _BBI_Handle _thread_handle(self)
+    cdef list _query_blocks(self, bbiFile * bbi, bytes chrom, bits32 start, bits32 end, bits32 * chromId)
+    cdef list _fetch_blocks(self, bbiFile * bbi, list blocks)
+    cdef bytes _read_block(self, bbiFile * bbi, bits64 offset, bits64 size)
 #     cdef dict fetch_summary(self)
@@ -12,7 +12,11 @@ See also
     The header files are particularly useful.
 """
 import os
+import threading
 import warnings
+from collections import OrderedDict
+from cpython.bytes cimport PyBytes_FromStringAndSize
+from libc.stdlib cimport malloc, free
 
 from plastid.readers.autosql import AutoSqlDeclaration
 from plastid.util.io.binary import BinaryParserFactory, find_null_bytes
@@ -25,6 +29,9 @@ from plastid.util.services.mini2to3 import safe_bytes, safe_str
 WARN_CHROM_NOT_FOUND = "No data for chromosome '%s' in file '%s'." 
 WARN_FILE_NOT_FOUND = "File '%s' not found."
 
+BLOCK_CACHE_SIZE = 16
+"""Default maximum size, in megabytes, of decompressed data blocks cached by each reader"""
+
 
 #===============================================================================
 # Functions
@@ -85,6 +92,23 @@ cdef lm * get_lm(lm * my_lm=NULL, int maxmem=0) except NULL:
 #===============================================================================
 
 
+cdef class _BBI_Handle:
+    """File handle and local memory pool for a single thread, used by
+    readers opened with `threadsafe=True`. Both are freed when the handle
+    is garbage-collected, e.g. when its thread exits.
+    """
+    def __cinit__(self):
+        self.bbi = NULL
+        self.lm  = NULL
+
+    def __dealloc__(self):
+        if self.lm != NULL:
+            lmCleanup(&self.lm)
+
+        if self.bbi != NULL:
+            close_file(self.bbi)
+
+
 cdef class _BBI_Reader:
     """Abstract base class for `BigWig`_ file readers
 
@@ -99,6 +123,12 @@ cdef class _BBI_Reader:
         Maximum desired memory footprint for C objects, in megabytes.
         May be temporarily exceeded if large queries are requested.
         (Default: 0, No maximum)
+
+    cache_size : float, optional
+        Maximum size, in megabytes, of decompressed data blocks kept in a
+        least-recently-used cache, so that neighboring queries do not read
+        and decompress the same blocks again. If `0`, no blocks are cached.
+        (Default: :data:`BLOCK_CACHE_SIZE`)
     """
     def __cinit__(self, str filename, maxmem=0,*args, **kwargs):
         if not os.path.exists(filename):
@@ -110,6 +140,13 @@ cdef class _BBI_Reader:
         self._summary      = None
         self._lm           = NULL
         self._maxmem       = int(round(maxmem * 1024 * 1024))
+        self.threadsafe    = False
+        self._local        = None
+        self._block_cache  = OrderedDict()
+        self._cache_max    = int(round(kwargs.get("cache_size",BLOCK_CACHE_SIZE) * 1024 * 1024))
+        self._cache_bytes  = 0
+        self._cache_hits   = 0
+        self._cache_misses = 0
 
     def __dealloc__(self):
         """Close `BigBed`_/`BigWig`_ file"""
@@ -140,9 +177,244 @@ cdef class _BBI_Reader:
         MemoryError
             If memory cannot be allocated
         """
+        cdef _BBI_Handle handle
+
+        if self.threadsafe == True:
+            handle = self._thread_handle()
+            handle.lm = get_lm(my_lm=handle.lm,maxmem=self._maxmem)
+            return handle.lm
+
         self._lm = get_lm(my_lm=self._lm,maxmem=self._maxmem)
         return self._lm
 
+    cdef bbiFile * _get_bbi(self) except NULL:
+        """Return the file handle for the current thread. Unless the reader
+        was opened with `threadsafe=True`, all threads share one handle.
+
+        Returns
+        -------
+        bbiFile
+            File handle
+        """
+        if self.threadsafe == True:
+            return self._thread_handle().bbi
+
+        return self._bbifile
+
+    cdef bbiFile * _open_bbi(self) except NULL:
+        """Open a new handle to the file, of the same type as the file
+        opened by the subclass, for use by a single thread
+
+        Returns
+        -------
+        bbiFile
+            File handle
+        """
+        return bbiFileOpen(safe_bytes(self.filename),self._bbifile.typeSig,safe_bytes(self.__class__.__name__))
+
+    cdef _BBI_Handle _thread_handle(self):
+        """Return the file handle and memory pool for the current thread,
+        opening them if necessary
+
+        Returns
+        -------
+        _BBI_Handle
+        """
+        cdef _BBI_Handle handle = getattr(self._local,"handle",None)
+        if handle is None:
+            handle = _BBI_Handle()
+            handle.bbi = self._open_bbi()
+            self._local.handle = handle
+
+        return handle
+
+    cdef list _query_blocks(self, bbiFile * bbi, bytes chrom, bits32 start, bits32 end, bits32 * chromId):
+        """Return decompressed data blocks holding records that overlap a region
+
+        Parameters
+        ----------
+        bbi : bbiFile
+            File handle
+
+        chrom : bytes
+            Chromosome name
+
+        start, end : int
+            Half-open range of positions
+
+        chromId : bits32
+            If not NULL, set to the id of `chrom` in the file
+
+        Returns
+        -------
+        list
+            Decompressed blocks as :class:`bytes`, in file order. Empty
+            if `chrom` is not in the file.
+        """
+        cdef:
+            char * cchrom = chrom
+            fileOffsetSize * blocks
+            fileOffsetSize * block
+            list ltmp = []
+
+        bbiAttachUnzoomedCir(bbi)
+        if self.threadsafe == True:
+            with nogil:
+                blocks = bbiOverlappingBlocks(bbi,bbi.unzoomedCir,cchrom,start,end,chromId)
+        else:
+            blocks = bbiOverlappingBlocks(bbi,bbi.unzoomedCir,cchrom,start,end,chromId)
+
+        block = blocks
+        while block != NULL:
+            ltmp.append((block.offset,block.size))
+            block = block.next
+
+        slFreeList(&blocks)
+        return self._fetch_blocks(bbi,ltmp)
+
+    cdef list _fetch_blocks(self, bbiFile * bbi, list blocks):
+        """Return decompressed data blocks, from the block cache if present,
+        or else from the file. Blocks read from the file are added to the
+        cache, evicting the least recently used blocks as needed to keep
+        the cache within its size limit.
+
+        The cache is shared by all threads. Its bookkeeping is done
+        while holding the GIL.
+
+        Parameters
+        ----------
+        bbi : bbiFile
+            File handle
+
+        blocks : list
+            List of tuples of (file offset, size on disk) of each block
+
+        Returns
+        -------
+        list
+            Decompressed blocks as :class:`bytes`, in the order of `blocks`
+        """
+        cdef:
+            list   ltmp  = []
+            object cache = self._block_cache
+            bytes  data
+            bits64 offset, size
+
+        for offset, size in blocks:
+            data = cache.pop(offset,None)
+            if data is not None:
+                # re-insert to mark as most recently used
+                self._cache_hits += 1
+                cache[offset] = data
+                ltmp.append(data)
+                continue
+
+            self._cache_misses += 1
+            data = self._read_block(bbi,offset,size)
+            ltmp.append(data)
+
+            if len(data) > self._cache_max or offset in cache:
+                continue
+
+            cache[offset] = data
+            self._cache_bytes += len(data)
+            while self._cache_bytes > self._cache_max:
+                self._cache_bytes -= len(cache.popitem(last=False)[1])
+
+        return ltmp
+
+    cdef bytes _read_block(self, bbiFile * bbi, bits64 offset, bits64 size):
+        """Read a data block from the file, and decompress it if the file is compressed.
+        The GIL is released if the reader was opened with `threadsafe=True`.
+
+        Parameters
+        ----------
+        bbi : bbiFile
+            File handle
+
+        offset : int
+            Offset of block in file
+
+        size : int
+            Size of block on disk
+
+        Returns
+        -------
+        bytes
+            Decompressed block
+
+        Raises
+        ------
+        MemoryError
+            If memory cannot be allocated
+        """
+        cdef:
+            size_t buf_size = bbi.uncompressBufSize
+            char * raw = <char *>malloc(size)
+            char * uncompressed = NULL
+            size_t n = size
+
+        if raw == NULL:
+            raise MemoryError("BigBed/BigWig reader: could not allocate memory.")
+
+        try:
+            if buf_size > 0:
+                uncompressed = <char *>malloc(buf_size)
+                if uncompressed == NULL:
+                    raise MemoryError("BigBed/BigWig reader: could not allocate memory.")
+
+            if self.threadsafe == True:
+                with nogil:
+                    udcSeek(bbi.udc,offset)
+                    udcMustRead(bbi.udc,raw,size)
+                    if buf_size > 0:
+                        n = zUncompress(raw,size,uncompressed,buf_size)
+            else:
+                udcSeek(bbi.udc,offset)
+                udcMustRead(bbi.udc,raw,size)
+                if buf_size > 0:
+                    n = zUncompress(raw,size,uncompressed,buf_size)
+
+            if buf_size > 0:
+                return PyBytes_FromStringAndSize(uncompressed,n)
+
+            return PyBytes_FromStringAndSize(raw,n)
+        finally:
+            free(raw)
+            free(uncompressed)
+
+    def clear_cache(self):
+        """Empty the block cache and reset its statistics"""
+        self._block_cache.clear()
+        self._cache_bytes  = 0
+        self._cache_hits   = 0
+        self._cache_misses = 0
+
+    property cache_info:
+        """Dictionary of block cache statistics:
+
+          ``hits``, ``misses``
+            Number of blocks found in, or missing from, the cache
+
+          ``hit_ratio``
+            Fraction of blocks found in the cache, or `nan` if none were requested
+
+          ``blocks``, ``bytes``
+            Number and total decompressed size of cached blocks
+
+          ``max_bytes``
+            Size limit of the cache
+        """
+        def __get__(self):
+            cdef long total = self._cache_hits + self._cache_misses
+            return { "hits"      : self._cache_hits,
+                     "misses"    : self._cache_misses,
+                     "hit_ratio" : float(self._cache_hits) / total if total > 0 else float("nan"),
+                     "blocks"    : len(self._block_cache),
+                     "bytes"     : self._cache_bytes,
+                     "max_bytes" : self._cache_max,
+                   }
+
     property filename:
         """Name of BigWig or BigBed file"""
         def __get__(self):
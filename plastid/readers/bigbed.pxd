@@ -19,12 +19,20 @@ cdef extern from "<common.h>":
         char        name[1]
     
     void slFreeList(void *listPt)
+
+    cdef struct slRef:
+        slRef     * next
+        void      * val
+
+    void slRefFreeListAndVals(slRef **pList)
+    bits64 byteSwap64(bits64 a)
     
     
 cdef extern from "<bPlusTree.h>":
     cdef struct bptFile
     void bptFileDetach(bptFile **pBpt)
     void bptFileClose(bptFile **pBpt)
+    slRef *bptFileFindMultiple(bptFile *bpt, void *key, int keySize, int valSize)
 #     :
 #         bptFile        * next
 #         char           * fileName
@@ -91,4 +99,5 @@ cdef class BigBedReader(_BBI_Reader):
         #types.classTypes return_type
 
     cdef list _bigbedinterval_to_bedtext(self, bigBedInterval *iv, Strand strand=*)
+    cdef bigBedInterval * _interval_query(self, bbiFile * bbi, bytes chrom, bits32 start, bits32 end, lm * buf) except? NULL
     cdef _GeneratorWrapper _c_get(self, SegmentChain roi, bint stranded=*, bint check_unique=*, lm *my_lm=*)
\ No newline at end of file
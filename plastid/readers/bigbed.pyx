@@ -81,7 +81,8 @@ from plastid.util.services.decorators import skipdoc, deprecated
 from plastid.util.services.exceptions import MalformedFileError, FileFormatWarning
 from plastid.readers.autosql import AutoSqlDeclaration
 
-from plastid.readers.bbifile cimport bbiFile, bits32, bits64, lm, lmInit, lmCleanup, freeMem, _BBI_Reader, get_lm
+from plastid.readers.bbifile cimport bbiFile, bits32, bits64, lm, lmInit, lmCleanup, freeMem, _BBI_Reader, get_lm,\
+                                     lmAlloc, lmCloneStringZ, memReadBits32
 
 from plastid.genomics.roitools cimport GenomicSegment, SegmentChain
 from plastid.genomics.c_common cimport strand_to_str, str_to_strand, Strand, \
@@ -89,11 +90,70 @@ from plastid.genomics.c_common cimport strand_to_str, str_to_strand, Strand, \
                                        error_strand,\
                                        _GeneratorWrapper
 
-from cpython.mem cimport PyMem_Malloc, PyMem_Free
+from libc.string cimport strlen
 #===============================================================================
 # INDEX: BigBedReader
 #===============================================================================
 
+cdef bigBedInterval * _parse_bed_block(char * pt, size_t size, bits32 chromId, bits32 start, bits32 end,
+                                       bint swapped, lm * buf, bigBedInterval * tail) nogil:
+    """Parse records overlapping a region from a decompressed `BigBed`_ data block
+
+    Parameters
+    ----------
+    pt : char *
+        Start of block
+
+    size : int
+        Size of block
+
+    chromId : int
+        Id of chromosome of region
+
+    start, end : int
+        Half-open range of positions of region
+
+    swapped : bool
+        Whether the file's byte order differs from the machine's
+
+    buf : lm
+        Local memory pool from which records are allocated
+
+    tail : bigBedInterval
+        Record after which parsed records are appended
+
+    Returns
+    -------
+    bigBedInterval
+        Last record appended, or `tail` if none were
+    """
+    cdef:
+        char * block_end = pt + size
+        bigBedInterval * iv
+        bits32 chrom, s, e
+        int rest_len
+
+    while pt + 12 <= block_end:
+        chrom    = memReadBits32(&pt,swapped)
+        s        = memReadBits32(&pt,swapped)
+        e        = memReadBits32(&pt,swapped)
+        rest_len = strlen(pt)
+
+        if chrom == chromId and s < end and e > start:
+            iv = <bigBedInterval *>lmAlloc(buf,sizeof(bigBedInterval))
+            iv.start   = s
+            iv.end     = e
+            iv.chromId = chromId
+            iv.rest    = lmCloneStringZ(buf,pt,rest_len) if rest_len > 0 else NULL
+            iv.next    = NULL
+            tail.next  = iv
+            tail       = iv
+
+        pt += rest_len + 1
+
+    return tail
+
+
 @skipdoc
 class _FromBED_StrAdaptor(object):
     """Adaptor class to return strings from |BigBedReaders|.
@@ -167,6 +227,12 @@ cdef class BigBedReader(_BBI_Reader):
         May be temporarily exceeded if large queries are requested.
         Does not include memory footprint of Python objects.
         (Default: 0, no limit)
+
+    cache_size : float, optional
+        Maximum size, in megabytes, of decompressed data blocks kept in a
+        least-recently-used cache, so that neighboring queries and searches
+        do not read and decompress the same blocks again. If `0`, no blocks
+        are cached. (Default: :data:`~plastid.readers.bbifile.BLOCK_CACHE_SIZE`)
     
     
     Attributes
@@ -220,11 +286,19 @@ cdef class BigBedReader(_BBI_Reader):
             May be temporarily exceeded if large queries are requested.
             Does not include memory footprint of Python objects.
             (Default: 0, no limit)
+
+        cache_size : float, optional
+            Maximum size, in megabytes, of cached decompressed data blocks.
+            If `0`, no blocks are cached.
+            (Default: :data:`~plastid.readers.bbifile.BLOCK_CACHE_SIZE`)
             
         """
         cdef:
             str autosql
-            
+
+        if kwargs.get("threadsafe",False) == True:
+            raise ValueError("BigBedReader does not support thread-safe reading. Open one BigBedReader per thread instead.")
+
         self._bbifile = bigBedFileOpen(safe_bytes(filename))
 
         self.total_fields         = self._bbifile.fieldCount
@@ -388,6 +462,42 @@ cdef class BigBedReader(_BBI_Reader):
 
         return ltmp
 
+    cdef bigBedInterval * _interval_query(self, bbiFile * bbi, bytes chrom, bits32 start, bits32 end, lm * buf) except? NULL:
+        """Query records overlapping a region. Data blocks are taken from
+        the block cache where possible.
+
+        Parameters
+        ----------
+        bbi : bbiFile
+            File handle
+
+        chrom : bytes
+            Chromosome name
+
+        start, end : int
+            Half-open range of positions
+
+        buf : lm
+            Local memory pool from which records are allocated
+
+        Returns
+        -------
+        bigBedInterval
+            Linked list of records in file order, or NULL if there are none
+        """
+        cdef:
+            bits32 chromId = 0
+            list blocks = self._query_blocks(bbi,chrom,start,end,&chromId)
+            bytes data
+            bigBedInterval head
+            bigBedInterval * tail = &head
+
+        head.next = NULL
+        for data in blocks:
+            tail = _parse_bed_block(data,len(data),chromId,start,end,bbi.isSwapped,buf,tail)
+
+        return head.next
+
     def search(self, field_name, *values):
         """Search indexed fields in the `BigBed`_ file for records matching `value`
         See `self.indexed_fields` for names of indexed fields and
@@ -438,40 +548,78 @@ cdef class BigBedReader(_BBI_Reader):
             int              fieldIdx
             int            * idx = &fieldIdx
             bptFile        * bpt
+            slRef          * refs
+            slRef          * ref
+            bits64         * val_pos
+            bits64           offset, size
+            set              blocks    = set()
+            set              targets   = set()
+            bigBedInterval   head
+            bigBedInterval * tail      = &head
             bigBedInterval * iv
             lm             * buf = self._get_lm()
             list             ltmp
             object           outfunc   = self.return_type.from_bed
             list             etypes    = list(self.extension_types.items())
+            bint             swapped   = self._bbifile.isSwapped
 
             str              stmp
-            bytes            val
-            char**           vals
-            int              n, num_vals
+            bytes            val, data, rest
+            char           * pt
+            char           * block_end
+            bits32           chromIx, s, e
+            int              rest_len
+            list             fields
 
         if field_name not in self.indexed_fields:
             raise KeyError("BigBed file '%s' has no index named '%s'" % (self.filename,field_name))
         else:
             bpt = bigBedOpenExtraIndex(self._bbifile, safe_bytes(field_name), idx)
 
-        if len(values) == 1:
-            val  = safe_bytes(values[0])
-            iv   = bigBedNameQuery(self._bbifile, bpt, fieldIdx, val, buf)
-        else:
-            num_vals = len(values)
-            vals     = <char**> PyMem_Malloc(num_vals*sizeof(char*))
-            if not vals:
-                raise MemoryError("BigBedReader.search(%s,%s): could not allocate memory" % (field_name,",".join(values)))
-            
-            for n, stmp in enumerate(values):
-                val = safe_bytes(stmp)
-                vals[n] = val
-                
-            iv  = bigBedMultiNameQuery(self._bbifile, bpt, fieldIdx, vals, num_vals, buf)
-            PyMem_Free(vals)
-        
-        ltmp = self._bigbedinterval_to_bedtext(iv)
+        # find blocks holding any matching record in the index, then read
+        # them through the block cache
+        for stmp in values:
+            val = safe_bytes(stmp)
+            targets.add(val)
+            refs = bptFileFindMultiple(bpt, <char *>val, len(val), 2*sizeof(bits64))
+            ref  = refs
+            while ref != NULL:
+                val_pos = <bits64 *>ref.val
+                offset  = byteSwap64(val_pos[0]) if swapped else val_pos[0]
+                size    = byteSwap64(val_pos[1]) if swapped else val_pos[1]
+                blocks.add((offset,size))
+                ref = ref.next
+
+            slRefFreeListAndVals(&refs)
+
         bptFileDetach(&bpt)
+
+        head.next = NULL
+        for data in self._fetch_blocks(self._bbifile,sorted(blocks)):
+            pt        = data
+            block_end = pt + len(data)
+            while pt + 12 <= block_end:
+                chromIx  = memReadBits32(&pt,swapped)
+                s        = memReadBits32(&pt,swapped)
+                e        = memReadBits32(&pt,swapped)
+                rest_len = strlen(pt)
+                rest     = pt[:rest_len]
+                fields   = rest.split(b"\t")
+
+                # chrom, start, and end are not in `rest`
+                if fieldIdx - 3 < len(fields) and fields[fieldIdx - 3] in targets:
+                    iv = <bigBedInterval *>lmAlloc(buf,sizeof(bigBedInterval))
+                    iv.start   = s
+                    iv.end     = e
+                    iv.chromId = chromIx
+                    iv.rest    = lmCloneStringZ(buf,pt,rest_len)
+                    iv.next    = NULL
+                    tail.next  = iv
+                    tail       = iv
+
+                pt += rest_len + 1
+
+        ltmp = self._bigbedinterval_to_bedtext(head.next)
         
         if self.add_three_for_stop == True:
             return _GeneratorWrapper((add_three_for_stop_codon(outfunc(X,extra_columns=etypes)) for X in ltmp),"BigBed entries")
@@ -525,9 +673,8 @@ cdef class BigBedReader(_BBI_Reader):
         return self._c_get(chain,stranded,check_unique=check_unique)
                     
     # TODO: direct C/Cython route to SegmentChain.from_bed
-    # NB- no cache layer, which we  had in pure Python implementation (below)
-    # will this be fast enough for repeated queries over the same region?
-    # need to test    
+    # NB- decompressed data blocks are cached by _BBI_Reader, so repeated
+    # queries over the same region do not re-read the file
     cdef _GeneratorWrapper _c_get(self, SegmentChain chain, bint stranded=True, bint check_unique=True, lm *my_lm = NULL):
         """c-layer implementation of :meth:`BigBedReader.get`
         
@@ -575,12 +722,11 @@ cdef class BigBedReader(_BBI_Reader):
             strand = span.c_strand
 
         for roi in chain:
-            iv = bigBedIntervalQuery(self._bbifile,
-                                     safe_bytes(span.chrom),
-                                     roi.start,
-                                     roi.end,
-                                     0,
-                                     buf)
+            iv = self._interval_query(self._bbifile,
+                                      safe_bytes(span.chrom),
+                                      roi.start,
+                                      roi.end,
+                                      buf)
             ltmp.extend(self._bigbedinterval_to_bedtext(iv, strand=strand))
         
         # filter for uniqueness
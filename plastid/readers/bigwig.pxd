@@ -10,7 +10,7 @@ See also
 `Source repository for Kent utilities <https://github.com/ENCODE-DCC/kentUtils.git>`_
     The header files are particularly useful.
 """
-from plastid.readers.bbifile cimport lm, bbiFile, _BBI_Reader, bits32, Bits, bbiSummaryType, get_lm
+from plastid.readers.bbifile cimport lm, bbiFile, _BBI_Reader, bits8, bits16, bits32, Bits, bbiSummaryType, bbiSummaryElement, get_lm
 from plastid.genomics.roitools cimport GenomicSegment
 from plastid.genomics.c_common cimport _GeneratorWrapper
 
@@ -18,7 +18,7 @@ from plastid.genomics.c_common cimport _GeneratorWrapper
 # Externs from Kent utilties
 #===============================================================================
 
-cdef extern from "<bigWig.h>":
+cdef extern from "<bigWig.h>" nogil:
     cdef struct bigWigValsOnChrom:
         bigWigValsOnChrom *next
         char   *chrom
@@ -48,9 +48,29 @@ cdef extern from "<bigWig.h>":
                                     char *chrom,
                                     bbiFile *bigWig)
 
+    bint bigWigSummaryArrayExtended(bbiFile *bwf, char *chrom, bits32 start, bits32 end,
+                                    int summarySize, bbiSummaryElement *summary)
+
     double bigWigSingleSummary(bbiFile *bwf, char *chrom, int start, int end,
                                bbiSummaryType summaryType, double defaultVal)
 
+cdef extern from "<bwgInternal.h>" nogil:
+    cdef enum bwgSectionType:
+        bwgTypeBedGraph     = 1
+        bwgTypeVariableStep = 2
+        bwgTypeFixedStep    = 3
+
+    cdef struct bwgSectionHead:
+        bits32 chromId
+        bits32 start, end
+        bits32 itemStep
+        bits32 itemSpan
+        bits8  type
+        bits8  reserved
+        bits16 itemCount
+
+    void bwgSectionHeadFromMem(char **pPt, bwgSectionHead *head, bint isSwapped)
+
 
 #===============================================================================
 # Python class
@@ -61,6 +81,7 @@ cdef class BigWigReader(_BBI_Reader):
     cdef double fill
     cdef double _sum
     
+    cdef bbiInterval * _interval_query(self, bbiFile * bbi, bytes chrom, bits32 start, bits32 end, lm * buf) except? NULL
     cdef double _summarize(self,GenomicSegment roi, bbiSummaryType type_)
     cdef double c_sum(self)
     cdef bigWigValsOnChrom * c_get_chromosome_counts(self, str chrom)
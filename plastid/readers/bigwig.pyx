@@ -71,6 +71,10 @@ See also
 `Source repository for Kent utilities <https://github.com/ENCODE-DCC/kentUtils.git>`_
     The header files are particularly useful.
 """
+import json
+import multiprocessing
+import os
+import threading
 import warnings
 cimport numpy
 import numpy
@@ -78,12 +82,15 @@ import numpy
 from plastid.util.services.exceptions import DataWarning
 from plastid.genomics.roitools cimport GenomicSegment, SegmentChain
 from plastid.genomics.c_common cimport reverse_strand
-from plastid.readers.bbifile cimport _BBI_Reader, close_file,\
+from plastid.readers.bbifile cimport _BBI_Reader, close_file, bbiFile, bits32,\
+                                     memReadBits32, memReadFloat,\
                                      bbiSummary, bbiSummaryType,\
                                      bbiSumMax,bbiSumMin,bbiSumMean,\
                                      bbiSumCoverage, bbiSumStandardDeviation,\
+                                     bbiSummaryElement, bbiBestZoom,\
                                      lmInit, lmCleanup, lmAlloc, lm, \
                                      bitFindClear
+from libc.stdlib cimport malloc, free
 
 from plastid.readers.bbifile cimport WARN_CHROM_NOT_FOUND
 from plastid.genomics.c_common import _GeneratorWrapper
@@ -93,6 +100,187 @@ from plastid.util.services.mini2to3 import safe_bytes, safe_str
 # INDEX: BigWig reader
 #===============================================================================
 
+_SUMMARY_STATS = ("mean","sum","max","coverage")
+
+SUM_WINDOW = 1000000
+"""Bases queried at once when summing a `BigWig`_ file"""
+
+SUM_SIDECAR_SUFFIX = ".sum.json"
+"""Suffix of sidecar files holding exact sums of `BigWig`_ files"""
+
+cdef bbiInterval * _parse_wig_block(char * pt, size_t size, bits32 start, bits32 end,
+                                    bint swapped, lm * buf, bbiInterval * tail) nogil:
+    """Parse intervals from a decompressed `BigWig`_ data block, clipped to a region
+
+    Parameters
+    ----------
+    pt : char *
+        Start of block
+
+    size : int
+        Size of block
+
+    start, end : int
+        Half-open range of positions to which intervals are clipped.
+        Intervals falling outside it are skipped.
+
+    swapped : bool
+        Whether the file's byte order differs from the machine's
+
+    buf : lm
+        Local memory pool from which intervals are allocated
+
+    tail : bbiInterval
+        Interval after which parsed intervals are appended
+
+    Returns
+    -------
+    bbiInterval
+        Last interval appended, or `tail` if none were
+    """
+    cdef:
+        char * block_end = pt + size
+        bwgSectionHead head
+        bbiInterval * iv
+        bits32 s, e, i
+        size_t item_size
+        float val
+
+    bwgSectionHeadFromMem(&pt,&head,swapped)
+    if head.type == bwgTypeBedGraph:
+        item_size = 12
+    elif head.type == bwgTypeVariableStep:
+        item_size = 8
+    else:
+        item_size = 4
+
+    s = head.start
+    for i in range(head.itemCount):
+        if pt + item_size > block_end:
+            break
+
+        if head.type == bwgTypeBedGraph:
+            s   = memReadBits32(&pt,swapped)
+            e   = memReadBits32(&pt,swapped)
+            val = memReadFloat(&pt,swapped)
+        elif head.type == bwgTypeVariableStep:
+            s   = memReadBits32(&pt,swapped)
+            e   = s + head.itemSpan
+            val = memReadFloat(&pt,swapped)
+        elif head.type == bwgTypeFixedStep:
+            if i > 0:
+                s += head.itemStep
+            e   = s + head.itemSpan
+            val = memReadFloat(&pt,swapped)
+        else:
+            break
+
+        if e > start and s < end:
+            iv = <bbiInterval *>lmAlloc(buf,sizeof(bbiInterval))
+            iv.start = s if s > start else start
+            iv.end   = e if e < end else end
+            iv.val   = val
+            iv.next  = NULL
+            tail.next = iv
+            tail = iv
+
+    return tail
+
+def _total(dict sums):
+    """Add per-chromosome sums in a fixed order, so that the total does not
+    depend on how chromosomes were divided among processes"""
+    return sum([sums[X] for X in sorted(sums)],0.0)
+
+def _sum_chroms_worker(args):
+    """Sum chromosomes of a `BigWig`_ file in a worker process
+
+    Parameters
+    ----------
+    args : tuple
+        Filename, and list of chromosome names
+
+    Returns
+    -------
+    dict
+        Dictionary mapping chromosome names to sums
+    """
+    filename, chroms = args
+    return BigWigReader(filename)._sum_chroms(chroms)
+
+def _read_sum_sidecar(str filename):
+    """Read the sum of a `BigWig`_ file from its sidecar file, if the
+    sidecar exists and the `BigWig`_ file has not changed since it was written
+
+    Returns
+    -------
+    float or None
+        Sum, or `None` if no valid sidecar exists
+    """
+    try:
+        with open(filename + SUM_SIDECAR_SUFFIX) as fh:
+            data = json.load(fh)
+        stat = os.stat(filename)
+        if data["size"] == stat.st_size and data["mtime"] == stat.st_mtime:
+            return float(data["sum"])
+    except (IOError,OSError,ValueError,KeyError,TypeError):
+        pass
+
+    return None
+
+def _write_sum_sidecar(str filename, double total):
+    """Write the sum of a `BigWig`_ file to its sidecar file, if possible"""
+    try:
+        stat = os.stat(filename)
+        with open(filename + SUM_SIDECAR_SUFFIX,"w") as fh:
+            json.dump({ "size" : stat.st_size, "mtime" : stat.st_mtime, "sum" : total },fh)
+    except (IOError,OSError):
+        warnings.warn("Could not write sum sidecar for file '%s'." % filename,DataWarning)
+
+def many_offsets(object out, object lengths):
+    """many_offsets(out, lengths)
+
+    Find where values for each of many regions go in an output buffer, as
+    used by :meth:`BigWigReader.get_many` and :meth:`BigWigReader.fill_many`
+
+    Parameters
+    ----------
+    out : :class:`numpy.ndarray`
+        C-contiguous `float64` buffer. Either 2D, with one row per region and
+        at least as many columns as the longest region, or 1D, with length
+        equal to the total length of all regions
+
+    lengths : :class:`numpy.ndarray`
+        Length of each region
+
+    Returns
+    -------
+    :class:`numpy.ndarray`
+        Offset of each region in the flattened buffer
+
+    :class:`numpy.ndarray`
+        Flattened view of `out`
+
+    Raises
+    ------
+    ValueError
+        If `out` has the wrong shape, type, or memory layout
+    """
+    if out.dtype != numpy.float64 or not out.flags["C_CONTIGUOUS"]:
+        raise ValueError("Output buffer must be a C-contiguous array of float64.")
+
+    if out.ndim == 2:
+        if out.shape[0] != len(lengths) or (len(lengths) > 0 and out.shape[1] < lengths.max()):
+            raise ValueError("2D output buffer must have one row per region, at least as wide as the longest region. Got shape %s." % (out.shape,))
+        offsets = numpy.arange(len(lengths),dtype=numpy.int64) * out.shape[1]
+    elif out.ndim == 1:
+        if out.shape[0] != lengths.sum():
+            raise ValueError("1D output buffer must have length equal to the total length of all regions (%s). Got %s." % (lengths.sum(),out.shape[0]))
+        offsets = numpy.concatenate(([0],numpy.cumsum(lengths)[:-1])).astype(numpy.int64)
+    else:
+        raise ValueError("Output buffer must be 1D or 2D. Got %s dimensions." % out.ndim)
+
+    return offsets, out.reshape(-1)
+
 
 
 cdef class BigWigReader(_BBI_Reader):
@@ -111,6 +299,20 @@ cdef class BigWigReader(_BBI_Reader):
         May be temporarily exceeded if large queries are requested.
         Does not include memory footprint of Python objects.
         (Default: `0`, no limit)
+
+    threadsafe : bool, optional
+        If `True`, each thread that queries the reader opens its own file
+        handle and memory pool, and the GIL is released while data are
+        read and decompressed, so that many threads can query one reader
+        in parallel. Each thread's handle is closed when the thread exits.
+        `maxmem` then applies to each thread. (Default: `False`)
+
+    cache_size : float, optional
+        Maximum size, in megabytes, of decompressed data blocks kept in a
+        least-recently-used cache, so that neighboring queries do not read
+        and decompress the same blocks again. The cache is shared by all
+        threads. If `0`, no blocks are cached.
+        (Default: :data:`~plastid.readers.bbifile.BLOCK_CACHE_SIZE`)
         
         
     Examples
@@ -154,6 +356,15 @@ cdef class BigWigReader(_BBI_Reader):
             May be temporarily exceeded if large queries are requested.
             Does not include memory footprint of Python objects.
             (Default: 0, no limit)
+
+        threadsafe : bool, optional
+            If `True`, give each thread its own file handle and memory pool,
+            and release the GIL during queries. (Default: `False`)
+
+        cache_size : float, optional
+            Maximum size, in megabytes, of cached decompressed data blocks.
+            If `0`, no blocks are cached.
+            (Default: :data:`~plastid.readers.bbifile.BLOCK_CACHE_SIZE`)
         """
 #         """
 #         fill : float
@@ -163,6 +374,55 @@ cdef class BigWigReader(_BBI_Reader):
         self._bbifile = bigWigFileOpen(safe_bytes(filename))
         self.fill = 0.0 #fill
         self._sum = numpy.nan
+        self.threadsafe = kwargs.get("threadsafe",False)
+        self._local     = threading.local()
+
+    cdef bbiInterval * _interval_query(self, bbiFile * bbi, bytes chrom, bits32 start, bits32 end, lm * buf) except? NULL:
+        """Query intervals overlapping a region. Data blocks are taken from
+        the block cache where possible. If the reader was opened with
+        `threadsafe=True`, the GIL is released while blocks are read,
+        decompressed, and parsed.
+
+        Parameters
+        ----------
+        bbi : bbiFile
+            File handle for the current thread
+
+        chrom : bytes
+            Chromosome name
+
+        start, end : int
+            Half-open range of positions
+
+        buf : lm
+            Local memory pool from which intervals are allocated
+
+        Returns
+        -------
+        bbiInterval
+            Linked list of intervals in order of position, clipped to the
+            region, or NULL if there are none
+        """
+        cdef:
+            list blocks = self._query_blocks(bbi,chrom,start,end,NULL)
+            bytes data
+            char * pt
+            size_t size
+            bint swapped = bbi.isSwapped
+            bbiInterval head
+            bbiInterval * tail = &head
+
+        head.next = NULL
+        for data in blocks:
+            pt   = data
+            size = len(data)
+            if self.threadsafe == True:
+                with nogil:
+                    tail = _parse_wig_block(pt,size,start,end,swapped,buf,tail)
+            else:
+                tail = _parse_wig_block(pt,size,start,end,swapped,buf,tail)
+
+        return head.next
 
     def __iter__(self):
         return _GeneratorWrapper(BigWigIterator(self,maxmem=self._maxmem),"BigWig values")
@@ -207,6 +467,7 @@ cdef class BigWigReader(_BBI_Reader):
             double [:] view      = counts
             
             lm* buf = self._get_lm()
+            bbiFile* bbi = self._get_bbi()
             bbiInterval* iv
             long segstart, segend
         
@@ -219,7 +480,7 @@ cdef class BigWigReader(_BBI_Reader):
             return counts
         
         # populate vector
-        iv = bigWigIntervalQuery(self._bbifile,safe_bytes(chrom),start,end,buf)
+        iv = self._interval_query(bbi,safe_bytes(chrom),start,end,buf)
         while iv is not NULL:
             segstart = iv.start - start
             segend = iv.end - start
@@ -231,6 +492,139 @@ cdef class BigWigReader(_BBI_Reader):
 
         return counts
                      
+    def get_many(self, object rois, bint roi_order=True, numpy.ndarray out=None, double fill=numpy.nan):
+        """Retrieve values for many regions of interest at once, writing
+        them into a single buffer, rather than allocating one array per
+        region. Intervals are copied directly from the query results into
+        the buffer, and a single memory pool is shared by all queries.
+
+        Parameters
+        ----------
+        rois : list of |GenomicSegment|
+            Regions of interest in genome
+
+        roi_order : bool, optional
+            If `True` (default) write values for each region 5' to 3'
+            relative to the region rather than genome.
+
+        out : :class:`numpy.ndarray`, optional
+            C-contiguous `float64` buffer to fill. Either:
+
+              - 2D, with one row per region, and at least as many columns as
+                the longest region. Values for region `i` are written to the
+                beginning of row `i`, and columns past its end are untouched.
+
+              - 1D, with length equal to the total length of all regions.
+                Values for each region are written consecutively, so that
+                region `i` occupies ``out[offsets[i]:offsets[i+1]]``, where
+                ``offsets = numpy.concatenate(([0],numpy.cumsum(lengths)))``
+
+            If `None`, a 2D buffer as wide as the longest region is allocated,
+            and columns past the end of shorter regions are set to the fill
+            value
+
+        fill : double, optional
+            Override fill value to put in positions with no data.
+            (Default: Use value of `self.fill`)
+
+        Returns
+        -------
+        :class:`numpy.ndarray`
+            `out`, filled
+
+        Raises
+        ------
+        ValueError
+            If `out` has the wrong shape, type, or memory layout
+
+        See also
+        --------
+        BigWigReader.get
+            Fetch values for a single region
+        """
+        cdef:
+            list myrois = list(rois)
+            double usefill = self.fill if numpy.isnan(fill) else fill
+            numpy.ndarray lengths = numpy.array([len(X) for X in myrois],dtype=numpy.int64)
+            numpy.ndarray offsets, flat
+
+        if out is None:
+            # positions within each region are filled below
+            out = numpy.empty((len(myrois),lengths.max() if len(myrois) > 0 else 0),dtype=float)
+            if len(myrois) > 0 and lengths.min() < lengths.max():
+                out.fill(usefill)
+
+        offsets, flat = many_offsets(out,lengths)
+        self.fill_many(myrois,offsets,flat,roi_order,usefill,False)
+        return out
+
+    def fill_many(self, list rois, numpy.ndarray offsets, numpy.ndarray flat, bint roi_order=True, double fill=0.0, bint add=False):
+        """Write or add values for each region in `rois` into `flat`,
+        beginning at the corresponding position in `offsets`. This is the
+        lower-level counterpart of :meth:`~BigWigReader.get_many`, for callers
+        that fill only some regions of a shared buffer, or that sum several
+        files into it. Use :func:`many_offsets` to find `offsets` and `flat`
+        for a buffer laid out as in :meth:`~BigWigReader.get_many`
+
+        Parameters
+        ----------
+        rois : list of |GenomicSegment|
+            Regions of interest in genome
+
+        offsets : :class:`numpy.ndarray`
+            `int64` position in `flat` of the first value for each region
+
+        flat : :class:`numpy.ndarray`
+            1D `float64` buffer
+
+        roi_order : bool, optional
+            If `True` (default), write values 5' to 3' relative to each region
+
+        fill : double, optional
+            Value for positions without data. Ignored if `add` is `True`
+            (Default: `0.0`)
+
+        add : bool, optional
+            If `True`, add values to those already in `flat`. Otherwise
+            (default), overwrite them
+        """
+        cdef:
+            double [:] view = flat
+            numpy.int64_t [:] offs = offsets
+            dict chroms = self.c_chroms()
+            set missing = set()
+            GenomicSegment roi
+            bbiFile * bbi = self._get_bbi()
+            bbiInterval * iv
+            lm * buf
+            long n, i, pos, offset, length
+            bint reverse
+
+        for n in range(len(rois)):
+            roi    = rois[n]
+            offset = offs[n]
+            length = roi.end - roi.start
+            if add == False:
+                view[offset:offset+length] = fill
+
+            if roi.chrom not in chroms:
+                if roi.chrom not in missing:
+                    warnings.warn(WARN_CHROM_NOT_FOUND % (roi.chrom,self.filename),DataWarning)
+                    missing.add(roi.chrom)
+                continue
+
+            reverse = roi_order == True and roi.c_strand == reverse_strand
+            buf = self._get_lm()
+            iv  = self._interval_query(bbi,safe_bytes(roi.chrom),roi.start,roi.end,buf)
+            while iv is not NULL:
+                for i in range(iv.start - roi.start,iv.end - roi.start):
+                    pos = offset + (length - 1 - i if reverse else i)
+                    if add:
+                        view[pos] += iv.val
+                    else:
+                        view[pos] = iv.val
+                iv = iv.next
+
     def __getitem__(self, GenomicSegment roi):
         """Retrieve array of counts at each position in `roi`, in `roi`'s 5' to 3' direction
         
@@ -261,46 +655,121 @@ cdef class BigWigReader(_BBI_Reader):
         double
             Sum of all values over all positions
         """
-        cdef:
-            double mysum = 0.0
-            bigWigValsOnChrom* vals
-            double * vbuf
-            long length
-            long i = 0
-            
         # n.b. - we calculate the exact sum manually
         # rather than using the stored sum,
         # which is approximate        
-        if not numpy.isnan(self._sum):
-            return self._sum
-        else:
-            warnings.warn("Summing over a large BigWig file can take a while.",DataWarning)
-            try:
-                for chrom in self.chroms:
-                    vals    = self.c_get_chromosome_counts(chrom)
-                    length  = vals.chromSize
-                    vbuf = vals.valBuf
-                    while i < length:
-                        mysum += vbuf[i]
-                        i += 1
-
-                    bigWigValsOnChromFree(&vals)
-                    
-                self._sum = mysum
-            finally:
-                bigWigValsOnChromFree(&vals)
-            
-        return mysum
+        if numpy.isnan(self._sum):
+            self._sum = _total(self._sum_chroms(list(self.c_chroms())))
 
-    def sum(self):
-        """Return sum of data in `BigWig`_ file, calculating if necessary
+        return self._sum
+
+    def _sum_chroms(self, list chroms):
+        """Calculate the exact sum of data on each chromosome in `chroms`.
+        Each interval contributes its value times its span, so data are never
+        expanded to base resolution. Chromosomes are queried in windows of
+        :data:`SUM_WINDOW` bases, and memory for each window is freed before
+        the next is read.
+
+        Parameters
+        ----------
+        chroms : list of str
+            Chromosome names
+
+        Returns
+        -------
+        dict
+            Dictionary mapping chromosome names to sums
+        """
+        cdef:
+            dict   sizes = self.c_chroms()
+            dict   sums  = {}
+            double mysum
+            long   start, length
+            bytes  bchrom
+            lm *   buf = NULL
+            bbiFile * bbi = self._get_bbi()
+            bbiInterval * iv
+
+        try:
+            for chrom in chroms:
+                mysum  = 0.0
+                length = sizes[chrom]
+                bchrom = safe_bytes(chrom)
+                for start in range(0,length,SUM_WINDOW):
+                    buf = lmInit(0)
+                    if buf == NULL:
+                        raise MemoryError("BigWigReader: could not allocate memory.")
+
+                    iv = self._interval_query(bbi,bchrom,start,min(start + SUM_WINDOW,length),buf)
+                    while iv is not NULL:
+                        mysum += iv.val * (iv.end - iv.start)
+                        iv = iv.next
+
+                    lmCleanup(&buf)
+
+                sums[chrom] = mysum
+        finally:
+            if buf != NULL:
+                lmCleanup(&buf)
+
+        return sums
+
+    def sum(self, int processes=1, bint sidecar=False):
+        """Return sum of data in `BigWig`_ file, calculating if necessary.
+        The sum is exact, unlike the summary stored in the file.
+
+        Parameters
+        ----------
+        processes : int, optional
+            Number of processes across which to divide chromosomes. Each
+            process opens its own copy of the file. (Default: `1`)
+
+        sidecar : bool, optional
+            If `True`, read the sum from a sidecar file next to the `BigWig`_
+            file (named by appending :data:`SUM_SIDECAR_SUFFIX`) if one exists
+            and matches the size and modification time of the `BigWig`_ file.
+            Otherwise, calculate the sum and try to write the sidecar, so that
+            later calls are instant. (Default: `False`)
         
         Returns
         -------
         double
             Sum of all values over all positions
         """
-        return self.c_sum()
+        cdef:
+            dict sizes = self.c_chroms()
+            list chroms, groups
+
+        if not numpy.isnan(self._sum):
+            return self._sum
+
+        if sidecar == True:
+            found = _read_sum_sidecar(self.filename)
+            if found is not None:
+                self._sum = found
+                return found
+
+        chroms = sorted(sizes,key=sizes.get,reverse=True)
+        if processes > 1 and len(chroms) > 1:
+            # deal largest chromosomes out first, to balance work
+            groups = [chroms[i::processes] for i in range(min(processes,len(chroms)))]
+            pool = multiprocessing.Pool(processes=len(groups))
+            try:
+                sums = {}
+                for part in pool.map(_sum_chroms_worker,[(self.filename,X) for X in groups]):
+                    sums.update(part)
+            finally:
+                pool.close()
+                pool.join()
+
+            self._sum = _total(sums)
+        else:
+            self.c_sum()
+
+        if sidecar == True:
+            _write_sum_sidecar(self.filename,self._sum)
+
+        return self._sum
     
     cdef bigWigValsOnChrom* c_get_chromosome_counts(self, str chrom):
         """Retrieve values across an entire chromosome.
@@ -337,7 +806,7 @@ cdef class BigWigReader(_BBI_Reader):
             warnings.warn(WARN_CHROM_NOT_FOUND % (chrom,self.filename),DataWarning)
         
         vals    = bigWigValsOnChromNew()
-        success = bigWigValsOnChromFetchData(vals,safe_bytes(chrom),self._bbifile)
+        success = bigWigValsOnChromFetchData(vals,safe_bytes(chrom),self._get_bbi())
             
         if success == False:
             warnings.warn("Could not retrieve data for chrom '%s' from file '%s'." % (chrom,self.filename),DataWarning)
@@ -399,32 +868,144 @@ cdef class BigWigReader(_BBI_Reader):
             
         return counts    
 
-# DISABLED - values for mean & stdev aren't even close to those expected from
-# known test files. However, pulling a numpy array with get() or __getitem__
-# and manually calculating mean & stdev *is* accurate
-#
-#     def summarize(self, GenomicSegment roi):
-#         """Summarize `BigWig`_ data over the region of interest.
-#         
-#         Note
-#         ----
-#         These are quickly calculated approximations. More accurate mean, stdev,
-#         et c can be calculated using ``bigwig_reader[roi].mean()`` et c
-#          
-#         Returns
-#         -------
-#         tuple of floats
-#             `(mean,max,min,fraction of bases covered,stdev)` of data in `BigWig`_ 
-#             file over the region defined by `roi` 
-#         """
-#         mean  = self._summarize(roi,bbiSumMean)
-#         max_  = self._summarize(roi,bbiSumMax)
-#         min_  = self._summarize(roi,bbiSumMin)
-#         cov   = self._summarize(roi,bbiSumCoverage)
-#         stdev = self._summarize(roi,bbiSumStandardDeviation)
-#          
-#         return (mean,max_,min_,cov,stdev)
-        
+    def summarize(self, GenomicSegment roi, int n_bins=1, str stat="mean", bint roi_order=True, bint exact=False):
+        """Summarize data in `roi` over `n_bins` bins of (nearly) equal width.
+
+        If the `BigWig`_ file has a zoom level that is at most half the width
+        of a bin, summaries precomputed for that level are used, so that
+        base-resolution data need not be read or decompressed. Otherwise, or if
+        `exact` is `True`, summaries are calculated from the base-resolution
+        data. Values from zoom levels are stored in single precision, so are
+        approximate.
+
+        Bin boundaries are the same as those used by the UCSC genome browser:
+        bin `i` ends at ``roi.start + (i+1)*len(roi)//n_bins``.
+
+        Parameters
+        ----------
+        roi : |GenomicSegment|
+            Region of interest in genome
+
+        n_bins : int, optional
+            Number of bins into which `roi` is divided. Must be at most the
+            length of `roi` (Default: `1`)
+
+        stat : str, optional
+            Statistic to report for each bin. One of:
+
+              - `'mean'`: mean value over all positions in the bin. Positions
+                without data count as zero, as in :meth:`get`
+              - `'sum'`: sum of values in the bin
+              - `'max'`: maximum value over positions with data. Bins without
+                data are set to the fill value
+              - `'coverage'`: fraction of positions in the bin that have data
+
+            (Default: `'mean'`)
+
+        roi_order : bool, optional
+            If `True` (default) return bins 5' to 3' relative to `roi`
+            rather than the genome
+
+        exact : bool, optional
+            If `True`, always calculate from base-resolution data
+            (Default: `False`)
+
+        Returns
+        -------
+        :class:`numpy.ndarray`
+            Summarized value for each bin
+
+        Raises
+        ------
+        ValueError
+            If `stat` is not recognized, or `n_bins` is out of range
+        """
+        cdef:
+            long start    = roi.start
+            long end      = roi.end
+            long length   = end - start
+            str  chrom    = roi.chrom
+            numpy.ndarray edges, widths, counts, covered, out
+            numpy.ndarray sums, valid, maxes
+            double [:] cview
+            numpy.uint8_t [:] vview
+            bbiSummaryElement * elements
+            bbiFile * bbi = self._get_bbi()
+            bbiInterval * iv
+            lm * buf
+            long i
+            bytes bchrom
+            char * cchrom
+            bint success
+
+        if stat not in _SUMMARY_STATS:
+            raise ValueError("BigWigReader.summarize(): `stat` must be one of %s. Got '%s'." % (", ".join(_SUMMARY_STATS),stat))
+
+        if n_bins < 1 or n_bins > length:
+            raise ValueError("BigWigReader.summarize(): `n_bins` must be between 1 and the length of `roi` (%s). Got %s." % (length,n_bins))
+
+        edges  = start + (length * numpy.arange(n_bins+1)) // n_bins
+        widths = numpy.diff(edges)
+        sums   = numpy.zeros(n_bins,dtype=float)
+        valid  = numpy.zeros(n_bins,dtype=float)
+        maxes  = numpy.full(n_bins,self.fill,dtype=float)
+
+        if chrom not in self.c_chroms():
+            warnings.warn(WARN_CHROM_NOT_FOUND % (chrom,self.filename),DataWarning)
+        elif exact == False and bbiBestZoom(bbi.levelList,(length // n_bins) // 2) is not NULL:
+            # same choice of zoom level as bigWigSummaryArrayExtended()
+            elements = <bbiSummaryElement *>malloc(n_bins * sizeof(bbiSummaryElement))
+            if elements == NULL:
+                raise MemoryError("BigWigReader.summarize(): could not allocate memory.")
+
+            try:
+                bchrom = safe_bytes(chrom)
+                cchrom = bchrom
+                if self.threadsafe == True:
+                    with nogil:
+                        success = bigWigSummaryArrayExtended(bbi,cchrom,start,end,n_bins,elements)
+                else:
+                    success = bigWigSummaryArrayExtended(bbi,cchrom,start,end,n_bins,elements)
+
+                if success:
+                    for i in range(n_bins):
+                        sums[i]  = elements[i].sumData
+                        valid[i] = elements[i].validCount
+                        if elements[i].validCount > 0:
+                            maxes[i] = elements[i].maxVal
+            finally:
+                free(elements)
+        else:
+            counts  = numpy.zeros(length,dtype=float)
+            covered = numpy.zeros(length,dtype=numpy.uint8)
+            cview   = counts
+            vview   = covered
+            buf = self._get_lm()
+            iv  = self._interval_query(bbi,safe_bytes(chrom),start,end,buf)
+            while iv is not NULL:
+                cview[iv.start - start:iv.end - start] = iv.val
+                vview[iv.start - start:iv.end - start] = 1
+                iv = iv.next
+
+            sums  = numpy.add.reduceat(counts,edges[:-1] - start)
+            valid = numpy.add.reduceat(covered.astype(float),edges[:-1] - start)
+            has_data = valid > 0
+            maxes[has_data] = numpy.maximum.reduceat(numpy.where(covered,counts,-numpy.inf),edges[:-1] - start)[has_data]
+
+        if stat == "mean":
+            out = sums / widths
+        elif stat == "sum":
+            out = sums
+        elif stat == "max":
+            out = maxes
+        else:
+            out = valid / widths
+
+        if roi.strand == "-" and roi_order == True:
+            out = out[::-1]
+
+        return out
+
     cdef double _summarize(self, GenomicSegment roi, bbiSummaryType type_):
         """Summarize `BigWig`_ data over ROI for a single statistic
          
@@ -445,7 +1026,7 @@ cdef class BigWigReader(_BBI_Reader):
             double retval
             str chrom = roi.chrom
              
-        retval = bigWigSingleSummary(self._bbifile,
+        retval = bigWigSingleSummary(self._get_bbi(),
                                      safe_bytes(chrom),
                                      roi.start,
                                      roi.end,
@@ -530,11 +1111,11 @@ def BigWigIterator(BigWigReader reader, maxmem=0):
             raise MemoryError("BigWigIterator: could not allocate memory.")
 
         chromlength = chromsizes[chrom]
-        iv = bigWigIntervalQuery(reader._bbifile,
-                                 safe_bytes(chrom),
-                                 0,
-                                 chromlength,
-                                 buf)
+        iv = reader._interval_query(reader._get_bbi(),
+                                    safe_bytes(chrom),
+                                    0,
+                                    chromlength,
+                                    buf)
         while iv is not NULL:
             retval = (chrom,long(iv.start),long(iv.end),float(iv.val))
             iv = iv.next
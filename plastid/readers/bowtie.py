@@ -18,10 +18,14 @@ http://bowtie-bio.sourceforge.net/manual.shtml#default-bowtie-output
 __author__ = "joshua"
 __date__ = "2011-03-18"
 
+import numpy
 from plastid.genomics.roitools import SegmentChain, GenomicSegment
 from plastid.util.io.filters  import AbstractReader
 
 
+BOWTIE_CHUNK_SIZE = 100000 # alignments per chunk in read_bowtie_chunks()
+
+
 #===============================================================================
 # INDEX: Readers for various bowtie1-like alignment file formats
 #===============================================================================
@@ -73,3 +77,50 @@ class BowtieReader(AbstractReader):
         iv = GenomicSegment(ref_seq,coord,coord+len(attr['seq_as_aligned']),strand)
         feature = SegmentChain(iv,**attr)
         return feature
+
+
+def read_bowtie_chunks(stream,chunk_size=BOWTIE_CHUNK_SIZE):
+    """Parse alignments from `bowtie`_ files in chunks into arrays of coordinates.
+    This skips creation of a |SegmentChain| for each alignment, and so is
+    much faster than |BowtieReader| for bulk import, e.g. by
+    :meth:`~plastid.genomics.genome_array.GenomeArray.add_from_bowtie`.
+    Blank lines are skipped.
+
+    Parameters
+    ----------
+    stream : file-like
+        Stream of alignments in `bowtie`_'s legacy output format
+
+    chunk_size : int, optional
+        Maximum number of alignments per chunk (Default: `100000`)
+
+    Yields
+    ------
+    :class:`numpy.ndarray`
+        Names of reference sequences (chromosomes) of alignments
+
+    :class:`numpy.ndarray`
+        Strands of alignments
+
+    :class:`numpy.ndarray`
+        0-indexed leftmost coordinates of alignments
+
+    :class:`numpy.ndarray`
+        Lengths of alignments
+    """
+    refs, strands, starts, lengths = [], [], [], []
+    for line in stream:
+        items = line.split("\t",5)
+        if len(items) < 5:
+            continue
+
+        strands.append(items[1])
+        refs.append(items[2])
+        starts.append(int(items[3]))
+        lengths.append(len(items[4]))
+        if len(starts) == chunk_size:
+            yield numpy.array(refs), numpy.array(strands), numpy.array(starts,dtype=numpy.int64), numpy.array(lengths,dtype=numpy.int64)
+            refs, strands, starts, lengths = [], [], [], []
+
+    if len(starts) > 0:
+        yield numpy.array(refs), numpy.array(strands), numpy.array(starts,dtype=numpy.int64), numpy.array(lengths,dtype=numpy.int64)
@@ -13,6 +13,11 @@ See also
 |GenomeArray| and |SparseGenomeArray|
     Array-like objects that store and index quantitative data over genomes
 """
+import numpy
+
+
+WIGGLE_CHUNK_SIZE = 100000 # records per chunk in read_wiggle_chunks()
+
 
 class WiggleReader(object):
     """Read `wiggle`_ and `bedGraph`_ files line-by-line, returning tuples
@@ -167,3 +172,100 @@ class WiggleReader(object):
                     val   = float(line.strip())
                     self.counter += self.step
                     return (self.chrom, start, stop, val)
+
+
+def read_wiggle_chunks(stream,chunk_size=WIGGLE_CHUNK_SIZE):
+    """Parse records from `wiggle`_ or `bedGraph`_ files in chunks into arrays
+    of coordinates and values. Each chunk holds records from a single
+    chromosome. Records are interpreted exactly as by |WiggleReader|, but
+    no tuple is created for each record, so this is much faster for bulk
+    import, e.g. by :meth:`~plastid.genomics.genome_array.GenomeArray.add_from_wiggle`.
+
+    Parameters
+    ----------
+    stream : file-like
+        Open filehandle pointing to `wiggle`_ or `bedGraph`_ data
+
+    chunk_size : int, optional
+        Maximum number of records per chunk (Default: `100000`)
+
+    Yields
+    ------
+    str
+        Chromosome name
+
+    :class:`numpy.ndarray`
+        Start positions of records, 0-indexed
+
+    :class:`numpy.ndarray`
+        End positions of records, 0-indexed, half-open
+
+    :class:`numpy.ndarray`
+        Values of records
+    """
+    chrom   = None
+    span    = 1
+    step    = 1
+    counter = 1
+    data_format = "bedGraph"
+    starts, ends, values = [], [], []
+    for line in stream:
+        if line[0] == "#" or line.isspace():
+            continue
+
+        items = line.split()
+        first = items[0]
+        if first == "track":
+            continue
+        elif first in ("variableStep","fixedStep"):
+            if len(starts) > 0:
+                yield chrom, numpy.array(starts,dtype=numpy.int64), numpy.array(ends,dtype=numpy.int64), numpy.array(values,dtype=float)
+                starts, ends, values = [], [], []
+
+            data_format = first
+            chrom   = None
+            span    = 1
+            step    = 1
+            counter = 1
+            for item in items[1:]:
+                if "=" in item:
+                    key, val = item.split("=")
+                    if key == "chrom":
+                        chrom = val
+                    elif key == "span":
+                        span = int(val)
+                    elif key == "step":
+                        step = int(val)
+                    elif key == "start":
+                        counter = int(val)
+            continue
+        elif len(items) == 4:
+            data_format = "bedGraph"
+            if first != chrom or len(starts) == chunk_size:
+                if len(starts) > 0:
+                    yield chrom, numpy.array(starts,dtype=numpy.int64), numpy.array(ends,dtype=numpy.int64), numpy.array(values,dtype=float)
+                    starts, ends, values = [], [], []
+                chrom = first
+
+            starts.append(int(items[1]))
+            ends.append(int(items[2]))
+            values.append(float(items[3]))
+            continue
+
+        if len(starts) == chunk_size:
+            yield chrom, numpy.array(starts,dtype=numpy.int64), numpy.array(ends,dtype=numpy.int64), numpy.array(values,dtype=float)
+            starts, ends, values = [], [], []
+
+        if data_format == "variableStep":
+            start = int(first) - 1
+            starts.append(start)
+            ends.append(start + span)
+            values.append(float(items[1]))
+        elif data_format == "fixedStep":
+            starts.append(counter - 1)
+            ends.append(counter - 1 + span)
+            values.append(float(first))
+            counter += step
+
+    if len(starts) > 0:
+        yield chrom, numpy.array(starts,dtype=numpy.int64), numpy.array(ends,dtype=numpy.int64), numpy.array(values,dtype=float)
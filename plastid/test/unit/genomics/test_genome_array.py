@@ -11,6 +11,7 @@ this requires as external dependencies, Bowtie, Tophat, and Samtools.
 import copy
 import tempfile
 import os
+import shutil
 import subprocess
 import functools
 import re
@@ -29,16 +30,23 @@ from Bio import SeqIO
 import plastid.util.services.exceptions
 
 from plastid.readers.bed import BED_Reader
+from plastid.readers.bigwig import many_offsets
 from plastid.genomics.genome_array import GenomeArray,\
                                        SparseGenomeArray,\
                                        BigWigGenomeArray,\
+                                       NativeGenomeArray,\
                                        BAMGenomeArray,\
+                                       MultiSampleBAMGenomeArray,\
                                        ThreePrimeMapFactory,\
                                        FivePrimeMapFactory,\
                                        CenterMapFactory,\
+                                       SizeFilterFactory,\
+                                       AlignmentFilterFactory,\
                                        five_prime_map,\
                                        three_prime_map,\
-                                       center_map
+                                       variable_five_prime_map,\
+                                       center_map,\
+                                       infer_chr_lengths
 from plastid.genomics.roitools import GenomicSegment, SegmentChain
 from plastid.genomics.seqtools import random_seq
 from plastid.util.io.openers import NullWriter
@@ -1245,6 +1253,36 @@ class TestBigWigGenomeArray(AbstractGenomeArrayHelper):
                     msg1 = "Maximum difference between exported GenomeArray and wiggle-imported array (%s) exceeds tolerance (%s) for test '%s' strand '%s'" % (diffmax,self.tol,test,strand)
                     
                     self.assertLessEqual(diffmax,self.tol,msg1)
+
+
+    def test_get_many_matches_get(self):
+        rng = numpy.random.RandomState(3)
+        for test, ga in self.gnds.items():
+            lengths = ga.lengths()
+            rois = []
+            for n in range(50):
+                chrom = sorted(lengths)[n % len(lengths)]
+                start = rng.randint(0,lengths[chrom] - 200)
+                rois.append(GenomicSegment(chrom,start,start+100,"+" if n % 2 else "-"))
+
+            for roi_order in (True,False):
+                expected = numpy.array([ga.get(X,roi_order=roi_order) for X in rois])
+                found = ga.get_many(rois,roi_order=roi_order)
+                self.assertTrue((expected == found).all(),test)
+
+                # reader level, into a caller-supplied ragged buffer
+                ragged = rois + [GenomicSegment(rois[0].chrom,rois[0].start,rois[0].end + 50,"-")]
+                out = numpy.full(100*len(rois) + 150,numpy.nan)
+                reader = ga._strand_dict["+"][0]
+                self.assertTrue(reader.get_many(ragged,roi_order=roi_order,out=out) is out)
+                self.assertTrue((out == numpy.concatenate([reader.get(X,roi_order=roi_order) for X in ragged])).all())
+
+                # adding a second pass onto the same buffer doubles it
+                offsets, flat = many_offsets(out,numpy.array([len(X) for X in ragged],dtype=numpy.int64))
+                reader.fill_many(ragged,offsets,flat,roi_order=roi_order,add=True)
+                self.assertTrue((out == 2*numpy.concatenate([reader.get(X,roi_order=roi_order) for X in ragged])).all())
+
+        self.assertRaises(ValueError,ga.get_many,rois,True,numpy.zeros((len(rois),50)))
         
  
 class FakeDict(object):
@@ -1412,7 +1450,919 @@ class TestBAMGenomeArray(AbstractExportableGenomeArrayHelper):
         self.assertEqual(post_post_minus.sum(),pre_minus.sum())
         self.assertTrue((post_post_minus==pre_minus).all())
 
-    
+
+def _make_synthetic_bam(filename,chr_lengths,num_reads=2000,min_len=25,max_len=35,seed=8212):
+    """Write a sorted, indexed `BAM`_ file of random unspliced and spliced reads
+
+    Parameters
+    ----------
+    filename : str
+        Name of `BAM`_ file to create
+
+    chr_lengths : dict
+        Dictionary mapping chromosome names to lengths
+
+    num_reads : int, optional
+        Number of reads to place on each chromosome
+
+    min_len, max_len : int, optional
+        Minimum and maximum read lengths, inclusive
+
+    seed : int, optional
+        Seed for random number generator
+    """
+    rng     = numpy.random.RandomState(seed)
+    chroms  = sorted(chr_lengths)
+    header  = { "HD" : { "VN" : "1.0", "SO" : "coordinate" },
+                "SQ" : [{ "SN" : X, "LN" : chr_lengths[X] } for X in chroms],
+              }
+    reads = []
+    for ref_id, chrom in enumerate(chroms):
+        for _ in range(num_reads):
+            read_length = rng.randint(min_len,max_len+1)
+            start = rng.randint(0,chr_lengths[chrom] - 2*max_len - 200)
+            if rng.rand() < 0.2:
+                left  = rng.randint(1,read_length)
+                cigar = "%sM%sN%sM" % (left,rng.randint(10,200),read_length - left)
+            else:
+                cigar = "%sM" % read_length
+
+            reads.append((ref_id,start,cigar,read_length,rng.rand() < 0.5))
+
+    reads.sort()
+    unsorted = filename + ".unsorted.bam"
+    with pysam.AlignmentFile(unsorted,"wb",header=header) as fout:
+        for n, (ref_id, start, cigar, read_length, is_reverse) in enumerate(reads):
+            read = pysam.AlignedSegment()
+            read.query_name      = "read_%s" % n
+            read.query_sequence  = "A"*read_length
+            read.reference_id    = ref_id
+            read.reference_start = start
+            read.cigarstring     = cigar
+            read.is_reverse      = is_reverse
+            read.mapping_quality = 255
+            fout.write(read)
+
+    os.rename(unsorted,filename)
+    pysam.index(filename)
+
+
+@attr(test="unit")
+@attr(speed="fast")
+class TestBAMGenomeArraySynthetic(unittest.TestCase):
+    """Tests of |BAMGenomeArray| methods against a small synthetic `BAM`_ file"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmpdir = tempfile.mkdtemp()
+        cls.chr_lengths = { "chrA" : 5000, "chrB" : 3000 }
+        cls.bamfile = os.path.join(cls.tmpdir,"synthetic.bam")
+        _make_synthetic_bam(cls.bamfile,cls.chr_lengths)
+
+        cls.map_rules = { "fiveprime_0"   : FivePrimeMapFactory(),
+                          "fiveprime_15"  : FivePrimeMapFactory(15),
+                          "threeprime_15" : ThreePrimeMapFactory(15),
+                          "center_0"      : CenterMapFactory(),
+                          "center_12"     : CenterMapFactory(12),
+                        }
+
+        rng = numpy.random.RandomState(5)
+        cls.rois = []
+        for chrom, length in sorted(cls.chr_lengths.items()):
+            for strand in ("+","-","."):
+                for _ in range(30):
+                    start = rng.randint(0,length - 500)
+                    cls.rois.append(GenomicSegment(chrom,start,start+rng.randint(1,500),strand))
+
+        # region on a chromosome not in the BAM file
+        cls.rois.append(GenomicSegment("chrZ",100,200,"+"))
+
+        cls.chains = []
+        for n in range(0,len(cls.rois) - 3,3):
+            segs = [X for X in cls.rois[n:n+3] if X.chrom == cls.rois[n].chrom and X.strand == cls.rois[n].strand]
+            cls.chains.append(SegmentChain(*segs))
+
+    @classmethod
+    def tearDownClass(cls):
+        for fn in os.listdir(cls.tmpdir):
+            os.remove(os.path.join(cls.tmpdir,fn))
+        os.rmdir(cls.tmpdir)
+
+    def test_get_many_matches_get(self):
+        bga = BAMGenomeArray(self.bamfile)
+        for name, rule in sorted(self.map_rules.items()):
+            bga.set_mapping(rule)
+            for roi_order in (True,False):
+                for max_window_size in (1,200,1000000):
+                    found = bga.get_many(self.rois,roi_order=roi_order,max_window_size=max_window_size)
+                    self.assertEqual(len(found),len(self.rois))
+                    for roi, vals in zip(self.rois,found):
+                        expected = bga.get(roi,roi_order=roi_order) if roi.chrom in bga.chroms() else numpy.zeros(len(roi))
+                        msg = "get_many() differs from get() for %s mapping at %s (window size %s)" % (name,roi,max_window_size)
+                        self.assertEqual(vals.shape,expected.shape,msg)
+                        self.assertTrue(numpy.allclose(vals,expected),msg)
+
+    def test_get_many_normalized(self):
+        bga = BAMGenomeArray(self.bamfile,mapping=FivePrimeMapFactory())
+        bga.set_normalize(True)
+        for roi, vals in zip(self.rois[:-1],bga.get_many(self.rois[:-1])):
+            self.assertTrue(numpy.allclose(vals,bga.get(roi)))
+
+    def test_get_counts_many_matches_get_counts(self):
+        bga = BAMGenomeArray(self.bamfile)
+        for name, rule in sorted(self.map_rules.items()):
+            bga.set_mapping(rule)
+            for stranded in (True,False):
+                found = bga.get_counts_many(self.chains,stranded=stranded)
+                self.assertEqual(len(found),len(self.chains))
+                for chain, vals in zip(self.chains,found):
+                    expected = chain.get_counts(bga,stranded=stranded)
+                    msg = "get_counts_many() differs from get_counts() for %s mapping at %s" % (name,chain)
+                    self.assertTrue(numpy.allclose(vals,expected),msg)
+
+    def check_get_stratified(self,bga,name):
+        min_len, max_len = 27, 33
+        rois = self.rois[:10] + self.rois[-15:] + self.chains[:5]
+        for roi in rois:
+            found = bga.get_stratified(roi,min_len,max_len)
+            self.assertEqual(found.shape,(max_len - min_len + 1,roi.length if isinstance(roi,SegmentChain) else len(roi)))
+            for row, read_length in enumerate(range(min_len,max_len+1)):
+                bga.add_filter("length",SizeFilterFactory(min=read_length,max=read_length))
+                expected = bga[roi]
+                bga.remove_filter("length")
+                msg = "get_stratified() row for %s-mers differs from size-filtered get() for %s mapping at %s" % (read_length,name,roi)
+                self.assertTrue(numpy.allclose(found[row],expected),msg)
+
+    def test_get_stratified(self):
+        bga = BAMGenomeArray(self.bamfile)
+        for name, rule in sorted(self.map_rules.items()):
+            bga.set_mapping(rule)
+            self.check_get_stratified(bga,name)
+
+    def test_get_stratified_without_map_stratified(self):
+        # plain functions lacking map_stratified() fall back to per-length mapping
+        bga = BAMGenomeArray(self.bamfile)
+        rule = FivePrimeMapFactory(12)
+        def plain_rule(reads,seg):
+            return rule(reads,seg)
+
+        bga.set_mapping(plain_rule)
+        self.check_get_stratified(bga,"plain_function")
+
+    def test_cached_counts_match_uncached(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            bga    = BAMGenomeArray(self.bamfile)
+            cached = BAMGenomeArray(self.bamfile,cache_dir=cache_dir)
+            for my_filter in (None,SizeFilterFactory(min=28,max=31)):
+                if my_filter is not None:
+                    bga.add_filter("size",my_filter)
+                    cached.add_filter("size",my_filter)
+
+                for name, rule in sorted(self.map_rules.items()):
+                    bga.set_mapping(rule)
+                    cached.set_mapping(rule)
+                    for roi_order in (True,False):
+                        for roi in self.rois[:-1]:
+                            msg = "Cached counts differ from uncached for %s mapping at %s" % (name,roi)
+                            self.assertTrue(numpy.allclose(cached.get(roi,roi_order=roi_order),bga.get(roi,roi_order=roi_order)),msg)
+
+                    for chain in self.chains:
+                        self.assertTrue(numpy.allclose(chain.get_counts(cached),chain.get_counts(bga)))
+
+            # one subfolder per combination of mapping rule and filters
+            self.assertEqual(len(os.listdir(cache_dir)),2*len(self.map_rules))
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_cached_get_many_matches_uncached_with_missing_chromosome(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            bga    = BAMGenomeArray(self.bamfile,mapping=FivePrimeMapFactory(12))
+            cached = BAMGenomeArray(self.bamfile,mapping=FivePrimeMapFactory(12),cache_dir=cache_dir)
+            missing = SegmentChain(GenomicSegment("chrZ",100,200,"+"),GenomicSegment("chrZ",300,350,"+"))
+            self.assertEqual(self.rois[-1].chrom,"chrZ")
+            for roi_order in (True,False):
+                for vals, expected in zip(cached.get_many(self.rois,roi_order=roi_order),
+                                          bga.get_many(self.rois,roi_order=roi_order)):
+                    self.assertEqual(vals.shape,expected.shape)
+                    self.assertTrue(numpy.allclose(vals,expected))
+
+            chains = self.chains[:5] + [missing]
+            for vals, expected in zip(cached.get_counts_many(chains),bga.get_counts_many(chains)):
+                self.assertEqual(vals.shape,expected.shape)
+                self.assertTrue(numpy.allclose(vals,expected))
+
+            self.assertEqual(cached.get_counts_many([missing])[0].shape,(missing.length,))
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_cache_reused_by_new_array(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            rois = self.rois[:-1]
+            first = BAMGenomeArray(self.bamfile,mapping=FivePrimeMapFactory(12),cache_dir=cache_dir)
+            expected = first.get_many(rois)
+
+            second = BAMGenomeArray(self.bamfile,mapping=FivePrimeMapFactory(12),cache_dir=cache_dir)
+            def no_fetch(*args):
+                raise AssertionError("Reads fetched from BAM file despite cache")
+
+            second._fetch_reads = no_fetch
+            for vals, expected_vals in zip(second.get_many(rois),expected):
+                self.assertTrue(numpy.allclose(vals,expected_vals))
+
+            second.set_normalize(True)
+            for roi in rois:
+                self.assertTrue(numpy.allclose(second[roi],first[roi] / float(first.sum()) * 1e6))
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_cache_bypassed_for_uncacheable_mapping(self):
+        cache_dir = tempfile.mkdtemp()
+        try:
+            rule = FivePrimeMapFactory(12)
+            def plain_rule(reads,seg):
+                return rule(reads,seg)
+
+            bga = BAMGenomeArray(self.bamfile,mapping=rule)
+            cached = BAMGenomeArray(self.bamfile,mapping=plain_rule,cache_dir=cache_dir)
+            with warnings.catch_warnings(record=True) as warns:
+                warnings.simplefilter("always")
+                for roi in self.rois[:-1]:
+                    self.assertTrue(numpy.allclose(cached[roi],bga[roi]))
+
+            self.assertEqual(len([X for X in warns if issubclass(X.category,plastid.util.services.exceptions.DataWarning)]),1)
+            self.assertEqual(os.listdir(cache_dir),[])
+        finally:
+            shutil.rmtree(cache_dir)
+
+    def test_parallel_to_genome_array_matches_serial(self):
+        bga = BAMGenomeArray(self.bamfile,mapping=CenterMapFactory(3))
+        bga.add_filter("size",SizeFilterFactory(min=27,max=34))
+        serial   = bga.to_genome_array(window_size=700)
+        parallel = bga.to_genome_array(processes=2,window_size=700)
+        self.assertTrue(serial.__eq__(parallel,tol=1e-10))
+        for roi in self.rois[:-1]:
+            self.assertTrue(numpy.allclose(serial[roi],bga[roi]))
+
+    def test_parallel_export_matches_serial(self):
+        bga = BAMGenomeArray(self.bamfile,mapping=FivePrimeMapFactory(13))
+        for strand in ("+","-"):
+            for method in (bga.to_bedgraph,bga.to_variable_step):
+                serial = cStringIO.StringIO()
+                parallel = cStringIO.StringIO()
+                method(serial,"test",strand,window_size=700)
+                method(parallel,"test",strand,window_size=700,processes=3)
+                self.assertEqual(serial.getvalue(),parallel.getvalue())
+                self.assertGreater(len(serial.getvalue().split("\n")),100)
+
+    def test_multisample_matches_per_sample_arrays(self):
+        bamfile2 = os.path.join(self.tmpdir,"synthetic2.bam")
+        if not os.path.exists(bamfile2):
+            _make_synthetic_bam(bamfile2,self.chr_lengths,num_reads=1000,seed=513)
+
+        samples = [self.bamfile,bamfile2,[self.bamfile,bamfile2]]
+        msga = MultiSampleBAMGenomeArray(*samples,mapping=FivePrimeMapFactory(12),sample_names=["a","b","ab"])
+        singles = [BAMGenomeArray(X,mapping=FivePrimeMapFactory(12)) for X in samples]
+        self.assertEqual(msga.chroms(),["chrA","chrB"])
+        self.assertEqual(list(msga.sum()),[X.sum() for X in singles])
+        self.assertEqual(msga.sum().shape,(3,))
+        self.assertEqual(len(msga),3*sum(msga.lengths().values()))
+
+        for normalize in (False,True):
+            msga.set_normalize(normalize)
+            for X in singles:
+                X.set_normalize(normalize)
+
+            rois = self.rois
+            many = msga.get_many(rois)
+            for roi, many_vals in zip(rois,many):
+                found = msga[roi]
+                self.assertEqual(found.shape,(3,len(roi)))
+                for row, X in enumerate(singles):
+                    expected = X[roi] if roi.chrom in X.chroms() else numpy.zeros(len(roi))
+                    self.assertTrue(numpy.allclose(found[row],expected))
+                    self.assertTrue(numpy.allclose(many_vals[row],expected))
+
+            for chain, many_vals in zip(self.chains,msga.get_counts_many(self.chains)):
+                found = chain.get_counts(msga)
+                self.assertEqual(found.shape,(3,chain.length))
+                self.assertTrue(numpy.allclose(found,many_vals))
+                for row, X in enumerate(singles):
+                    self.assertTrue(numpy.allclose(found[row],chain.get_counts(X)))
+
+        # pooled sample is the sum of the individual ones
+        msga.set_normalize(False)
+        for roi in self.rois[:-1]:
+            found = msga[roi]
+            self.assertTrue(numpy.allclose(found[2],found[0] + found[1]))
+
+    def test_multisample_bad_arguments_raise_value_error(self):
+        self.assertRaises(ValueError,MultiSampleBAMGenomeArray)
+        self.assertRaises(ValueError,MultiSampleBAMGenomeArray,self.bamfile,sample_names=["a","b"])
+        msga = MultiSampleBAMGenomeArray(self.bamfile,self.bamfile)
+        self.assertRaises(ValueError,msga.set_sum,[1])
+
+    def test_fetch_cache_matches_uncached(self):
+        bga = BAMGenomeArray([self.bamfile,self.bamfile])
+        for max_reads, tile_size in ((100000,10000),(500,300),(50,97)):
+            cached = BAMGenomeArray([self.bamfile,self.bamfile],fetch_cache_size=max_reads)
+            cached.set_fetch_cache(max_reads,tile_size=tile_size)
+            for _ in range(2):
+                for roi in self.rois[:-1]:
+                    self.assertEqual([X.query_name for X in cached.get_reads(roi)],
+                                     [X.query_name for X in bga.get_reads(roi)])
+                    self.assertTrue(numpy.allclose(cached[roi],bga[roi]))
+
+                for chain in self.chains:
+                    self.assertTrue(numpy.allclose(chain.get_counts(cached),chain.get_counts(bga)))
+
+            info = cached.fetch_cache_info()
+            self.assertGreater(info["misses"],0)
+            self.assertEqual(info["max_reads"],max_reads)
+            if max_reads == 100000:
+                # everything fits, so the second pass is served from the cache
+                self.assertEqual(info["misses"],info["tiles"])
+                self.assertGreater(info["hits"],info["misses"])
+
+    def test_fetch_cache_repeated_queries_hit(self):
+        bga = BAMGenomeArray(self.bamfile,fetch_cache_size=100000)
+        roi = GenomicSegment("chrA",1200,1500,"+")
+        bga[roi]
+        info = bga.fetch_cache_info()
+        self.assertEqual((info["hits"],info["misses"],info["tiles"]),(0,1,1))
+        self.assertEqual(info["reads"],len(list(bga.bamfiles[0].fetch("chrA",0,10000))))
+
+        bga[roi]
+        bga[GenomicSegment("chrA",1000,1100,"-")]
+        info = bga.fetch_cache_info()
+        self.assertEqual((info["hits"],info["misses"],info["tiles"]),(2,1,1))
+
+    def test_fetch_cache_respects_max_reads(self):
+        bga = BAMGenomeArray(self.bamfile)
+        bga.set_fetch_cache(200,tile_size=250)
+        for roi in self.rois[:-1]:
+            bga[roi]
+            info = bga.fetch_cache_info()
+            # tiles used by the last query are kept even if they alone exceed the limit
+            self.assertTrue(info["reads"] <= 200 or info["tiles"] <= len(roi) // 250 + 2)
+
+        self.assertRaises(ValueError,bga.set_fetch_cache,-1)
+        self.assertRaises(ValueError,bga.set_fetch_cache,10,tile_size=0)
+
+    def test_iter_counts_matches_get_counts(self):
+        rng = numpy.random.RandomState(29)
+        chains = []
+        for chrom, length in sorted(self.chr_lengths.items()) + [("chrZ",1000)]:
+            for _ in range(60):
+                start = rng.randint(0,length - 600)
+                strand = ("+","-",".")[rng.randint(0,3)]
+                segs = [GenomicSegment(chrom,start,start + rng.randint(1,200),strand)]
+                if rng.rand() < 0.5:
+                    next_start = segs[0].end + rng.randint(1,100)
+                    segs.append(GenomicSegment(chrom,next_start,next_start + rng.randint(1,200),strand))
+
+                chains.append(SegmentChain(*segs))
+
+        chains.sort(key=lambda x: (x.chrom,x.spanning_segment.start))
+        for bamfiles in ([self.bamfile],[self.bamfile,self.bamfile]):
+            bga = BAMGenomeArray(bamfiles)
+            for name, rule in sorted(self.map_rules.items()):
+                bga.set_mapping(rule)
+                found = list(bga.iter_counts(iter(chains)))
+                self.assertEqual(len(found),len(chains))
+                for chain, vals in zip(chains,found):
+                    msg = "iter_counts() differs from get_counts() for %s mapping at %s" % (name,chain)
+                    self.assertTrue(numpy.allclose(vals,chain.get_counts(bga)),msg)
+
+    def test_iter_counts_unsorted_raises_value_error(self):
+        bga = BAMGenomeArray(self.bamfile)
+        backwards = [SegmentChain(GenomicSegment("chrA",500,600,"+")),
+                     SegmentChain(GenomicSegment("chrA",100,200,"+"))]
+        split_chrom = [SegmentChain(GenomicSegment("chrA",100,200,"+")),
+                       SegmentChain(GenomicSegment("chrB",100,200,"+")),
+                       SegmentChain(GenomicSegment("chrA",500,600,"+"))]
+        for chains in (backwards,split_chrom):
+            self.assertRaises(ValueError,list,bga.iter_counts(chains))
+
+    def test_compiled_filters_match_python_filters(self):
+        compiled = BAMGenomeArray(self.bamfile)
+        compiled.add_filter("size",SizeFilterFactory(min=27,max=32))
+        compiled.add_filter("flags",AlignmentFilterFactory(min_length=28,exclude_flags=1024))
+
+        def size_filter(read):
+            return 27 <= len(read.positions) <= 32
+
+        def flag_filter(read):
+            return len(read.positions) >= 28 and read.is_duplicate is False
+
+        python = BAMGenomeArray(self.bamfile)
+        python.add_filter("size",size_filter)
+        python.add_filter("flags",flag_filter)
+
+        # mixed compiled and Python filters
+        mixed = BAMGenomeArray(self.bamfile)
+        mixed.add_filter("size",SizeFilterFactory(min=27,max=32))
+        mixed.add_filter("flags",flag_filter)
+        for roi in self.rois[:-1]:
+            expected = python[roi]
+            self.assertTrue(numpy.allclose(compiled[roi],expected))
+            self.assertTrue(numpy.allclose(mixed[roi],expected))
+
+
+class TestGenomeArraySynthetic(unittest.TestCase):
+    """Tests of |GenomeArray| storage and arithmetic against synthetic data"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.chr_lengths = { "chrA" : 5000, "chrB" : 3000 }
+        rng = numpy.random.RandomState(11)
+        cls.values = {}
+        for chrom, length in sorted(cls.chr_lengths.items()):
+            for strand in ("+","-"):
+                vec = rng.poisson(0.3,size=length).astype(float)
+                cls.values[(chrom,strand)] = vec
+
+        cls.rois = []
+        for chrom, length in sorted(cls.chr_lengths.items()):
+            for strand in ("+","-"):
+                for _ in range(20):
+                    start = rng.randint(0,length - 500)
+                    cls.rois.append(GenomicSegment(chrom,start,start+rng.randint(1,500),strand))
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _fill(self,ga):
+        for (chrom,strand), vec in self.values.items():
+            ga[GenomicSegment(chrom,0,len(vec),strand)] = vec
+        return ga
+
+    def test_storage_matches_memory(self):
+        memory = self._fill(GenomeArray(self.chr_lengths))
+        stored = self._fill(GenomeArray(self.chr_lengths,storage_dir=self.tmpdir))
+        self.assertTrue(os.path.exists(os.path.join(self.tmpdir,"manifest.json")))
+        self.assertEqual(memory.lengths(),stored.lengths())
+        self.assertAlmostEqual(memory.sum(),stored.sum())
+        for roi in self.rois:
+            self.assertTrue((memory[roi] == stored[roi]).all())
+
+        # arithmetic returns equivalent arrays
+        for mode in ("same","all","truncate"):
+            expected = memory.apply_operation(memory,numpy.add,mode=mode)
+            found    = stored.apply_operation(stored,numpy.add,mode=mode)
+            self.assertTrue(expected == found)
+        self.assertTrue((memory * 2) == (stored * 2))
+
+    def test_storage_reopen_read_only(self):
+        stored = self._fill(GenomeArray(self.chr_lengths,storage_dir=self.tmpdir))
+        stored.flush()
+        lengths = stored.lengths()
+        del stored
+
+        reopened = GenomeArray.from_storage(self.tmpdir)
+        self.assertEqual(reopened.lengths(),lengths)
+        for (chrom,strand), vec in self.values.items():
+            self.assertTrue((reopened[GenomicSegment(chrom,0,len(vec),strand)] == vec).all())
+
+        # out of bounds regions are zero-padded instead of resizing array
+        length = lengths["chrA"]
+        seg = GenomicSegment("chrA",length-10,length+100,"+")
+        found = reopened[seg]
+        self.assertEqual(len(found),110)
+        self.assertEqual(found[10:].sum(),0)
+        self.assertEqual(reopened[GenomicSegment("chrZ",0,50,"+")].sum(),0)
+        self.assertEqual(reopened.lengths(),lengths)
+
+        self.assertRaises(ValueError,reopened.__setitem__,seg,5)
+
+    def test_storage_grows_and_reopens_read_write(self):
+        stored = GenomeArray(storage_dir=self.tmpdir,min_chr_size=100)
+        stored[GenomicSegment("chrA",50,60,"+")] = 3
+        stored[GenomicSegment("chrA",20000,20010,"-")] = 2
+        stored[GenomicSegment("chrC",5,10,"-")] = 1
+        stored.flush()
+
+        reopened = GenomeArray.from_storage(self.tmpdir,mode="r+")
+        self.assertEqual(reopened.lengths(),stored.lengths())
+        self.assertEqual(reopened.sum(),3*10 + 2*10 + 5)
+        reopened[GenomicSegment("chrA",50,60,"+")] = 0
+        reopened.flush()
+
+        again = GenomeArray.from_storage(self.tmpdir)
+        self.assertEqual(again.sum(),2*10 + 5)
+
+    def test_storage_pickles_without_copying_data(self):
+        import pickle
+        stored = self._fill(GenomeArray(self.chr_lengths,storage_dir=self.tmpdir))
+        data = pickle.dumps(stored)
+        self.assertLess(len(data),4096)
+        unpickled = pickle.loads(data)
+        for roi in self.rois:
+            self.assertTrue((unpickled[roi] == stored[roi]).all())
+
+    def test_from_storage_bad_mode_raises_value_error(self):
+        GenomeArray(self.chr_lengths,storage_dir=self.tmpdir)
+        self.assertRaises(ValueError,GenomeArray.from_storage,self.tmpdir,mode="w+")
+
+    def test_dtype(self):
+        for cls in (GenomeArray,SparseGenomeArray):
+            ga = self._fill(cls(self.chr_lengths,dtype="uint16"))
+            self.assertEqual(ga.dtype,numpy.uint16)
+            self.assertEqual(cls.like(ga).dtype,numpy.uint16)
+            self.assertEqual(cls.like(ga,dtype=numpy.int32).dtype,numpy.int32)
+            for roi in self.rois[:10]:
+                self.assertEqual(ga[roi].dtype,numpy.uint16)
+
+        stored = self._fill(GenomeArray(self.chr_lengths,storage_dir=self.tmpdir,dtype=numpy.uint8))
+        stored.flush()
+        reopened = GenomeArray.from_storage(self.tmpdir)
+        self.assertEqual(reopened.dtype,numpy.uint8)
+        for roi in self.rois:
+            self.assertTrue((reopened[roi] == stored[roi]).all())
+
+    def test_dtype_arithmetic_promotes(self):
+        ints   = self._fill(GenomeArray(self.chr_lengths,dtype=numpy.uint16))
+        floats = self._fill(GenomeArray(self.chr_lengths))
+        self.assertEqual((ints + 1).dtype,numpy.uint16)
+        self.assertEqual((ints * 0.5).dtype,numpy.float64)
+        for mode in ("same","all","truncate"):
+            found = ints.apply_operation(floats,numpy.add,mode=mode)
+            self.assertEqual(found.dtype,numpy.float64)
+
+        halves = ints * 0.5
+        for roi in self.rois:
+            self.assertTrue(numpy.allclose(halves[roi],0.5*ints[roi]))
+
+    def test_dtype_sum_does_not_overflow(self):
+        ga = GenomeArray({ "chrA" : 1000 },dtype=numpy.uint8)
+        ga[GenomicSegment("chrA",0,1000,"+")] = 255
+        ga[GenomicSegment("chrA",0,1000,"-")] = 255
+        self.assertEqual(ga.sum(),2*255*1000)
+
+    def test_sparse_setitem_getitem_matches_dense(self):
+        rng = numpy.random.RandomState(3)
+        dense  = GenomeArray(self.chr_lengths)
+        sparse = SparseGenomeArray(self.chr_lengths)
+        # overlapping writes of vectors, scalars, and zeros, growth past chromosome ends,
+        # and writes large enough to bypass the write buffer
+        for n in range(500):
+            chrom  = "chrA" if n % 2 == 0 else "chrB"
+            strand = "+" if n % 3 else "-"
+            start  = rng.randint(0,self.chr_lengths[chrom] + 200)
+            seg = GenomicSegment(chrom,start,start+rng.randint(1,100),strand)
+            if n % 5 == 0:
+                val = rng.randint(0,3)
+            else:
+                val = rng.poisson(0.5,size=len(seg)).astype(float)
+            dense[seg]  = val
+            sparse[seg] = val
+
+            if n % 50 == 0:
+                for roi in self.rois[:10]:
+                    self.assertTrue((dense[roi] == sparse[roi]).all())
+
+        big = GenomicSegment("chrA",0,80000,"-")
+        val = rng.poisson(0.1,size=len(big)).astype(float)
+        dense[big]  = val
+        sparse[big] = val
+        dense[GenomicSegment("chrA",100,70000,"-")]  = 0
+        sparse[GenomicSegment("chrA",100,70000,"-")] = 0
+
+        self.assertAlmostEqual(dense.sum(),sparse.sum())
+        for roi in self.rois:
+            self.assertTrue((dense[roi] == sparse[roi]).all())
+
+        dnz = dense.nonzero()
+        snz = sparse.nonzero()
+        for chrom in self.chr_lengths:
+            for strand in ("+","-"):
+                self.assertTrue((dnz[chrom][strand] == snz[chrom][strand]).all())
+
+    def test_sparse_operations_match_dense(self):
+        dense  = self._fill(GenomeArray(self.chr_lengths))
+        sparse = self._fill(SparseGenomeArray(self.chr_lengths))
+        other_dense  = GenomeArray({ "chrA" : 6000, "chrB" : 3000 })
+        other_sparse = SparseGenomeArray({ "chrA" : 6000, "chrB" : 3000 })
+        for seg in self.rois[::3] + [GenomicSegment("chrA",5500,5600,"+")]:
+            other_dense[seg]  = 2
+            other_sparse[seg] = 2
+
+        tests = [("scalar add", dense + 1, sparse + 1),
+                 ("scalar mul", dense * 3, sparse * 3),
+                 ("array mul", dense * other_dense, sparse * other_sparse),
+                 ("array mul dense", dense * other_dense, sparse * other_dense),
+                 ("array sub", dense.apply_operation(other_dense,numpy.subtract,mode="all"),
+                               sparse.apply_operation(other_sparse,numpy.subtract)),
+                 ("array sub reversed", other_dense.apply_operation(dense,numpy.subtract,mode="all"),
+                                        other_sparse.apply_operation(sparse,numpy.subtract)),
+                ]
+        for name, expected, found in tests:
+            self.assertTrue(isinstance(found,SparseGenomeArray),name)
+            for chrom in expected.chroms():
+                for strand in expected.strands():
+                    # arrays grow differently past chromosome ends, so only compare common length
+                    length = min(len(expected._chroms[chrom][strand]),len(found._chroms[chrom][strand]))
+                    seg = GenomicSegment(chrom,0,length,strand)
+                    msg = "%s differs on %s" % (name,seg)
+                    self.assertTrue((expected[seg] == found[seg]).all(),msg)
+
+    def test_tiled_operations_match_untiled(self):
+        other = GenomeArray({ "chrA" : 6000, "chrB" : 3000, "chrC" : 200 })
+        for seg in self.rois[::3] + [GenomicSegment("chrC",50,60,"+")]:
+            other[seg] = 2
+
+        for mode in ("same","all","truncate"):
+            if mode == "same":
+                right = self._fill(GenomeArray(self.chr_lengths))
+            else:
+                right = other
+            expected = self._fill(GenomeArray(self.chr_lengths)).apply_operation(right,numpy.subtract,mode=mode)
+            for threads, tile_size in ((1,700),(4,700),(4,10000)):
+                copied = self._fill(GenomeArray(self.chr_lengths)).apply_operation(right,numpy.subtract,mode=mode,
+                                                                                  threads=threads,tile_size=tile_size)
+                self.assertEqual(expected.chroms(),copied.chroms())
+                for chrom in expected.chroms():
+                    for strand in expected.strands():
+                        seg = GenomicSegment(chrom,0,len(expected._chroms[chrom][strand]),strand)
+                        self.assertTrue((expected[seg] == copied[seg]).all(),"%s %s" % (mode,seg))
+
+        # chromosomes only present in `other` are included for mode 'all'
+        found = self._fill(GenomeArray(self.chr_lengths)).apply_operation(other,numpy.subtract,mode="all",tile_size=70)
+        self.assertTrue((found[GenomicSegment("chrC",50,60,"+")] == -2).all())
+
+    def test_inplace_operations(self):
+        other = GenomeArray({ "chrA" : 6000, "chrB" : 3000 })
+        other_sparse = SparseGenomeArray({ "chrA" : 6000, "chrB" : 3000 })
+        for seg in self.rois[::3]:
+            other[seg] = 2
+            other_sparse[seg] = 2
+
+        for test_class in (GenomeArray,SparseGenomeArray):
+            for right in (other,other_sparse,3):
+                expected = self._fill(test_class(self.chr_lengths)) * right
+                ga = self._fill(test_class(self.chr_lengths))
+                found = ga.apply_operation(right,numpy.multiply,mode="all",inplace=True,threads=2)
+                self.assertTrue(found is ga)
+                for roi in self.rois:
+                    self.assertTrue((expected[roi] == found[roi]).all(),test_class.__name__)
+                self.assertAlmostEqual(found.sum(),expected.sum())
+
+        other_ints = GenomeArray({ "chrA" : 6000, "chrB" : 3000 },dtype=numpy.uint16)
+        for seg in self.rois[::3]:
+            other_ints[seg] = 2
+
+        ints  = self._fill(GenomeArray(self.chr_lengths,dtype=numpy.uint16))
+        alias = ints
+        ints += other_ints
+        ints *= 2
+        self.assertTrue(ints is alias)
+        self.assertEqual(ints.dtype,numpy.uint16)
+        ref = self._fill(GenomeArray(self.chr_lengths))
+        for roi in self.rois:
+            expected = 2*(ref.get(roi,roi_order=False) + other.get(roi,roi_order=False))
+            self.assertTrue((ints.get(roi,roi_order=False) == expected).all())
+
+        # results that don't fit the dtype are promoted into a new array,
+        # as by `+`, rather than cast in place
+        ints  = self._fill(GenomeArray(self.chr_lengths,dtype=numpy.uint16))
+        alias = ints
+        ints -= other * 1.35
+        self.assertFalse(ints is alias)
+        self.assertEqual(ints.dtype,numpy.float64)
+        self.assertAlmostEqual(ints.sum(),ref.sum() - 1.35*other.sum())
+        self.assertEqual(alias.sum(),ref.sum())
+        self.assertRaises(TypeError,alias.apply_operation,0.5,numpy.add,mode="all",inplace=True)
+
+        # new strands cannot be added to an array in place
+        ga = GenomeArray(self.chr_lengths,strands=("+",))
+        self.assertRaises(ValueError,ga.apply_operation,other,numpy.add,mode="all",inplace=True)
+
+    def test_sparse_export_matches_dense(self):
+        dense  = self._fill(GenomeArray(self.chr_lengths))
+        sparse = self._fill(SparseGenomeArray(self.chr_lengths))
+        for method in ("to_bedgraph","to_variable_step"):
+            dense_out  = cStringIO.StringIO()
+            sparse_out = cStringIO.StringIO()
+            getattr(dense,method)(dense_out,"test","+")
+            getattr(sparse,method)(sparse_out,"test","+")
+            self.assertEqual(dense_out.getvalue(),sparse_out.getvalue())
+
+    def test_export_runs_across_chunks(self):
+        for test_class in (GenomeArray,SparseGenomeArray):
+            ga = self._fill(test_class(self.chr_lengths))
+            # a run of equal values spanning several chunks is written as one line
+            ga[GenomicSegment("chrA",95,340,"+")] = 7
+            for method in ("to_bedgraph","to_variable_step"):
+                expected = cStringIO.StringIO()
+                getattr(ga,method)(expected,"test","+")
+                for chunk_size in (1,100,1000):
+                    found = cStringIO.StringIO()
+                    getattr(ga,method)(found,"test","+",chunk_size=chunk_size)
+                    self.assertEqual(expected.getvalue(),found.getvalue(),"%s %s" % (method,chunk_size))
+
+                reread = GenomeArray(self.chr_lengths)
+                reread.add_from_wiggle(cStringIO.StringIO(expected.getvalue()),"+")
+                for chrom, length in self.chr_lengths.items():
+                    seg = GenomicSegment(chrom,0,length,"+")
+                    self.assertTrue((reread[seg] == ga[seg]).all(),"%s %s" % (test_class.__name__,method))
+
+            bedgraph = cStringIO.StringIO()
+            ga.to_bedgraph(bedgraph,"test","+")
+            lines = bedgraph.getvalue().strip().split("\n")[1:]
+            self.assertIn("chrA\t95\t340\t7.0",lines)
+            self.assertFalse(any([X.endswith("\t0.0") for X in lines]))
+
+    def test_growth_preserves_values_and_amortizes_copies(self):
+        import pickle
+        ga = GenomeArray(min_chr_size=1000)
+        expected = {}
+        buffers = {}
+        for n in range(200):
+            start = 500*n
+            seg = GenomicSegment("chrA",start,start+100,"+" if n % 2 else "-")
+            ga[seg] = n + 1
+            expected[seg] = n + 1
+            buf = ga._buffers.get("chrA",{}).get("+")
+            buffers[id(buf)] = buf # hold references, so ids are not reused
+
+        # length grows as before, but capacity doubles, so buffers are replaced rarely
+        self.assertGreater(ga.lengths()["chrA"],500*199 + 100)
+        self.assertLess(len(buffers),10)
+        for seg, val in expected.items():
+            self.assertTrue((ga[seg] == val).all())
+
+        # values past the end of a shrunken chromosome do not reappear after regrowth
+        ga._resize_chrom("chrA",1000)
+        ga._resize_chrom("chrA",5000)
+        self.assertEqual(ga[GenomicSegment("chrA",1000,5000,"+")].sum(),0)
+
+        # pickled arrays drop spare capacity
+        ga2 = pickle.loads(pickle.dumps(ga))
+        self.assertEqual(ga2.lengths(),ga.lengths())
+        self.assertEqual(ga2._buffers,{})
+
+    def test_reserve_and_wiggle_prescan(self):
+        text = "\n".join(["chrA\t100\t200\t1.0",
+                          "chrB\t200000\t200010\t2.0",
+                          "chrA\t30000\t30005\t3.0",
+                         ]) + "\n"
+        fh = cStringIO.StringIO(text)
+        self.assertEqual(infer_chr_lengths(fh),{ "chrA" : 30005, "chrB" : 200010 })
+        self.assertEqual(fh.tell(),0)
+
+        ga = GenomeArray(min_chr_size=1000)
+        ga.add_from_wiggle(fh,"+",prescan=True)
+        self.assertEqual(ga.lengths(),{ "chrA" : 30005, "chrB" : 200010 })
+        self.assertEqual(ga.sum(),100 + 20 + 15)
+
+        ga.reserve({ "chrA" : 10, "chrC" : 500 })
+        self.assertEqual(ga.lengths(),{ "chrA" : 30005, "chrB" : 200010, "chrC" : 500 })
+
+    def test_add_from_wiggle_matches_per_record(self):
+        rng = numpy.random.RandomState(7)
+        lines = ["track type=bedGraph"]
+        records = []
+        for chrom in sorted(self.chr_lengths):
+            # mostly abutting intervals, with some overlaps, and some past chromosome ends
+            start = 0
+            while start < self.chr_lengths[chrom] + 100:
+                end = start + rng.randint(1,30)
+                val = round(rng.rand(),3)
+                lines.append("%s\t%s\t%s\t%s" % (chrom,start,end,val))
+                records.append((chrom,start,end,val))
+                start = max(0,end - rng.randint(0,3)) if rng.rand() < 0.1 else end + rng.randint(0,10)
+        text = "\n".join(lines) + "\n"
+
+        for test_class in (GenomeArray,SparseGenomeArray):
+            expected = test_class(self.chr_lengths)
+            for chrom, start, end, val in records:
+                expected[GenomicSegment(chrom,start,end,"+")] += val
+
+            found = test_class(self.chr_lengths)
+            found.add_from_wiggle(cStringIO.StringIO(text),"+")
+            self.assertAlmostEqual(expected.sum(),found.sum())
+            for chrom in self.chr_lengths:
+                seg = GenomicSegment(chrom,0,self.chr_lengths[chrom] + 100,"+")
+                self.assertTrue(numpy.allclose(expected[seg],found[seg]),test_class.__name__)
+
+    def test_native_save_load_roundtrip(self):
+        fn = os.path.join(self.tmpdir,"test.ga")
+        for test_class, dtype in ((GenomeArray,numpy.float64),
+                                  (GenomeArray,numpy.uint16),
+                                  (SparseGenomeArray,numpy.float32)):
+            ga = self._fill(test_class(self.chr_lengths,dtype=dtype))
+            ga[GenomicSegment("chrA",1000,3000,"-")] = 0 # chunks of all zeros are skipped
+            ga.save(fn,chunk_size=700)
+
+            loaded = test_class.load(fn)
+            self.assertTrue(isinstance(loaded,test_class))
+            self.assertEqual(loaded.dtype,ga.dtype)
+            self.assertEqual(loaded.lengths(),ga.lengths())
+            self.assertEqual(loaded.sum(),ga.sum())
+            for chrom, length in self.chr_lengths.items():
+                for strand in ("+","-"):
+                    seg = GenomicSegment(chrom,0,length,strand)
+                    self.assertTrue((loaded[seg] == ga[seg]).all())
+
+    def test_native_random_access(self):
+        fn = os.path.join(self.tmpdir,"test.ga")
+        ga = self._fill(GenomeArray(self.chr_lengths))
+        ga.set_sum(12345)
+        ga.save(fn,chunk_size=300)
+        with NativeGenomeArray(fn) as native:
+            self.assertEqual(native.lengths(),ga.lengths())
+            self.assertEqual(native.sum(),12345)
+            for roi in self.rois:
+                self.assertTrue((native[roi] == ga[roi]).all())
+                self.assertTrue((native.get(roi,roi_order=False) == ga.get(roi,roi_order=False)).all())
+
+            chain = SegmentChain(*self.rois[:3])
+            self.assertTrue((native.get(chain) == ga.get(chain)).all())
+
+            # regions past chromosome ends, and on unknown chromosomes, read as zero
+            found = native[GenomicSegment("chrB",2990,3010,"+")]
+            self.assertTrue((found[:10] == ga[GenomicSegment("chrB",2990,3000,"+")]).all())
+            self.assertEqual(found[10:].sum(),0)
+            self.assertEqual(native[GenomicSegment("chrZ",0,10,"+")].sum(),0)
+
+            native.reset_sum()
+            self.assertAlmostEqual(native.sum(),sum([X.sum() for X in self.values.values()]))
+
+        with open(fn,"wb") as fout:
+            fout.write(b"not a genome array file")
+        self.assertRaises(ValueError,NativeGenomeArray,fn)
+
+    def test_sum_updated_incrementally(self):
+        rng = numpy.random.RandomState(13)
+        for test_class, dtype in ((GenomeArray,numpy.float64),
+                                  (GenomeArray,numpy.uint16),
+                                  (SparseGenomeArray,numpy.float64)):
+            ga = self._fill(test_class(self.chr_lengths,dtype=dtype))
+            self.assertEqual(ga.sum(),sum([X.sum() for X in self.values.values()]))
+            for n in range(200):
+                chrom = "chrA" if n % 2 else "chrB"
+                start = rng.randint(0,self.chr_lengths[chrom] + 100)
+                seg = GenomicSegment(chrom,start,start + rng.randint(1,50),"+" if n % 3 else "-")
+                if n % 4 == 0:
+                    ga[seg] = 0
+                else:
+                    ga[seg] += rng.randint(0,5)
+
+                if n % 20 == 0:
+                    # set_sum() holds until values are next set
+                    ga.set_sum(100)
+                    self.assertEqual(ga.sum(),100)
+
+            found = ga.sum()
+            ga.reset_sum()
+            self.assertAlmostEqual(found,ga.sum(),msg="%s %s" % (test_class.__name__,dtype))
+
+            ga.set_normalize(True)
+            roi = self.rois[0]
+            normalized = ga[roi]
+            ga.set_normalize(False)
+            self.assertTrue(numpy.allclose(normalized,ga[roi]*1e6/ga.sum()))
+
+    def test_add_from_bowtie_vectorized_matches_per_read(self):
+        rng = numpy.random.RandomState(5)
+        lines = []
+        for n in range(2000):
+            chrom  = "chrA" if n % 3 else "chrB"
+            strand = "+" if n % 2 else "-"
+            start  = rng.randint(1,self.chr_lengths[chrom] + 100)
+            seq    = "A"*rng.randint(20,35)
+            lines.append("read%s\t%s\t%s\t%s\t%s\t%s\t0\t\n" % (n,strand,chrom,start,seq,"I"*len(seq)))
+        text = "".join(lines)
+
+        tests = [(five_prime_map,{ "offset" : 12 }),
+                 (three_prime_map,{ "offset" : 15 }),
+                 (variable_five_prime_map,{ "offset" : { 26 : 10, 27 : -1, "default" : 13 } }),
+                 (center_map,{ "nibble" : 3, "offset" : 1 }),
+                ]
+        for test_class in (GenomeArray,SparseGenomeArray):
+            for mapfunc, trans_args in tests:
+                # wrapping the mapping function forces the per-read path
+                per_read_func = lambda feature, **kwargs: mapfunc(feature,**kwargs)
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore")
+                    vectorized = test_class(self.chr_lengths)
+                    vectorized.add_from_bowtie(cStringIO.StringIO(text),mapfunc,min_length=22,max_length=32,**trans_args)
+                    per_read = test_class(self.chr_lengths)
+                    per_read.add_from_bowtie(cStringIO.StringIO(text),per_read_func,min_length=22,max_length=32,**trans_args)
+
+                msg = "%s differs for %s" % (test_class.__name__,mapfunc.__name__)
+                self.assertAlmostEqual(vectorized.sum(),per_read.sum(),msg=msg)
+                for chrom in self.chr_lengths:
+                    for strand in ("+","-"):
+                        length = min(len(vectorized._chroms[chrom][strand]),len(per_read._chroms[chrom][strand]))
+                        seg = GenomicSegment(chrom,0,length,strand)
+                        self.assertTrue(numpy.allclose(vectorized[seg],per_read[seg]),msg)
+
 
 #===============================================================================
 # INDEX: tools for generating test datasets with known results 
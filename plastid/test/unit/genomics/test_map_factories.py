@@ -1,14 +1,19 @@
 #!/usr/bin/env python
 import numpy
 import pysam
+import pickle
 import warnings
 from pkg_resources import resource_filename
-from nose.tools import assert_true, assert_equal, assert_greater_equal
+from nose.tools import assert_true, assert_equal, assert_greater_equal, assert_raises
 from plastid.genomics.map_factories import FivePrimeMapFactory,\
                                        ThreePrimeMapFactory,\
                                        CenterMapFactory,\
                                        VariableFivePrimeMapFactory,\
-                                       StratifiedVariableFivePrimeMapFactory
+                                       StratifiedVariableFivePrimeMapFactory,\
+                                       AlignmentFilterFactory,\
+                                       SizeFilterFactory,\
+                                       filter_alignments,\
+                                       reads_to_block_arrays
 from plastid.genomics.roitools import GenomicSegment, SegmentChain
 from plastid.genomics.genome_array import BAMGenomeArray
 from plastid.util.services.mini2to3 import cStringIO
@@ -71,7 +76,13 @@ class TestBAM_MappingRules(object):
         msg1 = "failed to return reads with %s mapping with param %s on strand '%s'." % (map_name, map_param, strand)
         msg2 = "failed %s mapping vector with param %s on strand '%s'." % (map_name, map_param, strand)
         assert_equal(reads_out,self.reads[strand],msg1)
-        assert_true((count_array == expected).all(),msg2)
+        if map_name == "center":
+            # fractional counts are summed through a difference array,
+            # so may differ from expected by rounding error
+            assert_true(numpy.allclose(count_array,expected),msg2)
+            assert_true(((count_array == 0) == (expected == 0)).all(),msg2)
+        else:
+            assert_true((count_array == expected).all(),msg2)
 
     def test_fiveprime_threeprime_center(self):
         for mapping in ("fiveprime","threeprime","center"):
@@ -204,3 +215,171 @@ class TestBAM_MappingRules(object):
     def test_variable_stratified_mapping_minus(self):
         pass
 
+
+    def test_map_stratified_rows_match_length_filtered_call(self):
+        factories = [FivePrimeMapFactory(0),
+                     FivePrimeMapFactory(10),
+                     ThreePrimeMapFactory(10),
+                     CenterMapFactory(0),
+                     CenterMapFactory(10),
+                     VariableFivePrimeMapFactory({ X : X//2 for X in range(25,40) }),
+                    ]
+        min_len, max_len = 27, 36
+        for fn in factories:
+            for strand in self.strands:
+                reads = self.reads[strand]
+                seg   = self.segs[strand]
+                reads_out, count_array = fn.map_stratified(reads,seg,min_len,max_len)
+                assert_equal(count_array.shape,(max_len - min_len + 1,len(seg)))
+
+                expected_reads = []
+                for row, read_length in enumerate(range(min_len,max_len+1)):
+                    length_reads = [X for X in reads if len(X.positions) == read_length]
+                    length_reads_out, expected = fn(length_reads,seg)
+                    expected_reads.extend(length_reads_out)
+                    msg = "Stratified mapping for %s on strand '%s' differs at length %s" % (fn.__class__.__name__,strand,read_length)
+                    assert_true(numpy.allclose(count_array[row],expected),msg)
+
+                assert_equal(reads_out,expected_reads)
+
+    def test_map_stratified_bad_lengths_raise_value_error(self):
+        for min_len, max_len in ((0,30),(30,29)):
+            assert_raises(ValueError,FivePrimeMapFactory().map_stratified,self.reads["+"],self.segs["+"],min_len,max_len)
+
+    def _make_filterable_reads(self):
+        reads = []
+        for n, read in enumerate(self.reads["+"] + self.reads["-"]):
+            read = self.make_alignment(read.reference_start,read.reference_end,"-" if read.is_reverse else "+")
+            read.mapping_quality = (7*n) % 50
+            read.is_duplicate = n % 3 == 0
+            read.is_secondary = n % 5 == 0
+            reads.append(read)
+
+        return reads
+
+    def test_alignment_filter_matches_python_filter(self):
+        reads = self._make_filterable_reads()
+        specs = [dict(),
+                 dict(min_length=28,max_length=33),
+                 dict(min_length=30),
+                 dict(min_mapq=20),
+                 dict(exclude_flags=1024),
+                 dict(require_flags=256),
+                 dict(min_length=26,max_length=38,min_mapq=10,exclude_flags=1024|256),
+                ]
+        def check_strand(read,strand):
+            return strand == "." or read.is_reverse == (strand == "-")
+
+        def check_spec(read,spec):
+            my_length = len(read.positions)
+            return my_length >= spec.get("min_length",1) \
+                   and (my_length <= spec.get("max_length",-1) or spec.get("max_length",-1) == -1) \
+                   and read.mapping_quality >= spec.get("min_mapq",0) \
+                   and read.flag & spec.get("require_flags",0) == spec.get("require_flags",0) \
+                   and read.flag & spec.get("exclude_flags",0) == 0
+
+        for spec in specs:
+            my_filter = AlignmentFilterFactory(**spec)
+            assert_equal([my_filter(X) for X in reads],[check_spec(X,spec) for X in reads])
+            for strand in ("+","-","."):
+                expected = [X for X in reads if check_strand(X,strand) and check_spec(X,spec)]
+                found = filter_alignments(reads,strand,[my_filter])
+                assert_equal(found,expected,"Filter %s on strand '%s' gave wrong reads" % (my_filter,strand))
+
+    def test_filter_alignments_combines_filters(self):
+        reads = self._make_filterable_reads()
+        filters = [SizeFilterFactory(min=27,max=35),
+                   AlignmentFilterFactory(min_length=29,max_length=37,min_mapq=5),
+                   AlignmentFilterFactory(exclude_flags=1024)]
+        for strand in ("+","-","."):
+            expected = [X for X in filter_alignments(reads,strand) if all(F(X) for F in filters)]
+            assert_equal(filter_alignments(reads,strand,filters),expected)
+
+    def test_alignment_filter_bad_params_raise_value_error(self):
+        for kwargs in (dict(min_length=0),dict(min_length=30,max_length=29),dict(min_mapq=-1)):
+            assert_raises(ValueError,AlignmentFilterFactory,**kwargs)
+
+        for kwargs in (dict(min=0),dict(min=30,max=29)):
+            assert_raises(ValueError,SizeFilterFactory,**kwargs)
+
+    def test_factories_survive_pickling(self):
+        factories = [FivePrimeMapFactory(10),
+                     ThreePrimeMapFactory(10),
+                     CenterMapFactory(5),
+                     VariableFivePrimeMapFactory({ X : X//2 for X in range(25,40) }),
+                     StratifiedVariableFivePrimeMapFactory({ "default" : 12 },26,35),
+                    ]
+        for fn in factories:
+            unpickled = pickle.loads(pickle.dumps(fn))
+            assert_equal(repr(unpickled),repr(fn))
+            for strand in self.strands:
+                _, expected = fn(self.reads[strand],self.segs[strand])
+                _, found = unpickled(self.reads[strand],self.segs[strand])
+                assert_true(numpy.allclose(found,expected))
+
+    @staticmethod
+    def make_spliced_alignment(start_pos,cigarstring,strand):
+        read = pysam.AlignedSegment()
+        read.reference_start = start_pos
+        read.cigarstring = cigarstring
+        read.query_sequence = "N"*read.query_length
+        read.reference_id = 0
+        read.is_reverse = True if strand == "-" else False
+        return read
+
+    def test_map_arrays_matches_call(self):
+        factories = [FivePrimeMapFactory(0),
+                     FivePrimeMapFactory(14),
+                     ThreePrimeMapFactory(0),
+                     ThreePrimeMapFactory(14),
+                     CenterMapFactory(0),
+                     CenterMapFactory(10),
+                     VariableFivePrimeMapFactory({ X : X//2 for X in range(25,36) }),
+                     StratifiedVariableFivePrimeMapFactory({ "default" : 12, 30 : 14 },27,33),
+                    ]
+        rng = numpy.random.RandomState(171)
+        cigars = ["%sM" % X for X in range(15,45)] + \
+                 ["12M100N%sM" % X for X in range(10,25)] + \
+                 ["8M3D%sM40N6M" % X for X in range(10,25)]
+        for strand in self.strands:
+            reads = [self.make_spliced_alignment(rng.randint(0,1900),cigars[rng.randint(0,len(cigars))],strand) for _ in range(500)]
+            block_starts, block_ends, block_offsets = reads_to_block_arrays(reads)
+            assert_equal(len(block_offsets),len(reads) + 1)
+            for seg in (self.segs[strand],GenomicSegment("mock",300,1200,strand)):
+                for fn in factories:
+                    with warnings.catch_warnings():
+                        warnings.simplefilter("ignore")
+                        reads_out, expected = fn(reads,seg)
+                        idx_out, found = fn.map_arrays(block_starts,block_ends,block_offsets,seg)
+
+                    msg = "map_arrays() differs from __call__() for %s on strand '%s'" % (fn,strand)
+                    assert_equal(found.shape,expected.shape,msg)
+                    assert_true(numpy.allclose(found,expected),msg)
+                    assert_equal(sorted([reads[X] for X in idx_out],key=id),sorted(reads_out,key=id),msg)
+
+    def test_map_arrays_bad_blocks_raise_value_error(self):
+        seg = self.segs["+"]
+        bad = [([0,10],[5],[0,2]),          # mismatched starts and ends
+               ([0,10],[5,20],[0,1]),       # offsets do not cover blocks
+               ([0,10],[5,20],[1,2]),       # offsets do not start at zero
+               ([10],[5],[0,1]),            # end before start
+              ]
+        for block_starts, block_ends, block_offsets in bad:
+            assert_raises(ValueError,FivePrimeMapFactory().map_arrays,block_starts,block_ends,block_offsets,seg)
+
+    def test_center_mapping_spliced_reads_matches_positions(self):
+        reads = [self.make_spliced_alignment(100,"10M200N20M",strand) for strand in ("+","-")] + \
+                [self.make_spliced_alignment(150,"5S12M3D15M50N8M2I9M",strand) for strand in ("+","-")] + \
+                [self.make_spliced_alignment(1990,"30M",strand) for strand in ("+","-")]
+        for nibble in (0,4,9):
+            for seg in (self.segs["+"],GenomicSegment("mock",105,320,"+")):
+                expected = numpy.zeros(len(seg))
+                for read in reads:
+                    positions = read.positions[nibble:len(read.positions) - nibble]
+                    for pos in positions:
+                        if seg.start <= pos < seg.end:
+                            expected[pos - seg.start] += 1.0 / len(positions)
+
+                _, found = CenterMapFactory(nibble)(reads,seg)
+                assert_true(numpy.allclose(found,expected))
+                assert_true(((found == 0) == (expected == 0)).all())
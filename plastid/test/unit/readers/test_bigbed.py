@@ -441,4 +441,28 @@ class test_BigBedReader(unittest.TestCase):
             SegmentChain(GenomicSegment('2L',107760,107838,'+'),GenomicSegment('2L',108587,108809,'+'),GenomicSegment('2L',110405,110483,'+'),GenomicSegment('2L',110754,111337,'+'),Alias='na',ID='FBtr0308091',Name='Sam-S-RK',color='#000000',gene_id='FBgn0005278',score='0.0',thickend='110900',thickstart='108685',type='exon'),
         ]
         self.assertEqual(expected,found)
- 
+
+    def test_block_cache_shared_by_search_get_and_iter(self):
+        reader = BigBedReader(self.bb_indexed)
+        found  = list(reader.search("gene_id","FBgn0005278"))
+        misses = reader.cache_info["misses"]
+        self.assertGreater(misses,0)
+
+        # repeated searches and fetches are served from cache
+        self.assertEqual(found,list(reader.search("gene_id","FBgn0005278")))
+        self.assertEqual(misses,reader.cache_info["misses"])
+
+        roi   = found[0].spanning_segment
+        first = [str(X) for X in reader[roi]]
+        misses = reader.cache_info["misses"]
+        self.assertEqual(first,[str(X) for X in reader[roi]])
+        self.assertEqual(misses,reader.cache_info["misses"])
+        self.assertGreater(reader.cache_info["hit_ratio"],0)
+
+        nocache = BigBedReader(self.bb_indexed,cache_size=0)
+        self.assertEqual([str(X) for X in reader],[str(X) for X in nocache])
+        self.assertEqual(0,nocache.cache_info["blocks"])
+        self.assertLessEqual(reader.cache_info["bytes"],reader.cache_info["max_bytes"])
+
+    def test_threadsafe_raises_value_error(self):
+        self.assertRaises(ValueError,BigBedReader,self.bb_indexed,threadsafe=True)
@@ -1,11 +1,15 @@
 import os
+import json
+import shutil
+import tempfile
 import numpy
+from multiprocessing.pool import ThreadPool
 
 from nose.tools import assert_less_equal, assert_raises, assert_dict_equal,\
                        assert_true, assert_equal, assert_almost_equal
 
 from pkg_resources import resource_filename
-from plastid.readers.bigwig import BigWigReader
+from plastid.readers.bigwig import BigWigReader, SUM_SIDECAR_SUFFIX
 from plastid.readers.wiggle import WiggleReader
 from plastid.genomics.roitools import GenomicSegment
 from plastid.genomics.genome_array import GenomeArray
@@ -230,6 +234,33 @@ class TestBigWigReader(AbstractTestBBIFile):
     def test_sum(self):
         bw = BigWigReader(os.path.join(base_path,"mini","wig","bw_fiveprime_15_fw.bw"))
         assert_equal(bw.sum(),4000)
+
+    def test_sum_matches_base_resolution(self):
+        expected = sum([self.bw.get_chromosome_counts(X).sum() for X in self.bw.chroms])
+        assert_almost_equal(BigWigReader(bigwigfile).sum(),expected,delta=TOL*expected)
+        assert_equal(BigWigReader(bigwigfile).sum(processes=3),BigWigReader(bigwigfile).sum())
+
+    def test_sum_sidecar(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmpdir,"test.bw")
+            shutil.copy(os.path.join(base_path,"mini","wig","bw_fiveprime_15_fw.bw"),filename)
+            assert_equal(BigWigReader(filename).sum(sidecar=True),4000)
+            assert_true(os.path.exists(filename + SUM_SIDECAR_SUFFIX))
+
+            # sidecar is trusted while the file is unchanged
+            with open(filename + SUM_SIDECAR_SUFFIX) as fh:
+                data = json.load(fh)
+            data["sum"] = 17
+            with open(filename + SUM_SIDECAR_SUFFIX,"w") as fh:
+                json.dump(data,fh)
+            assert_equal(BigWigReader(filename).sum(sidecar=True),17)
+
+            # and ignored otherwise
+            os.utime(filename,(0,0))
+            assert_equal(BigWigReader(filename).sum(sidecar=True),4000)
+        finally:
+            shutil.rmtree(tmpdir)
     
     def test_iter(self):
         wig = WiggleReader(open(wigfile))
@@ -254,44 +285,104 @@ class TestBigWigReader(AbstractTestBBIFile):
             diff = abs(fval-eval_)
             assert_true(diff < TOL,"Difference %s exceeds tolerance '%s'. Expected '%s', found '%s'." % (diff,TOL,fval,eval_))
 
-# Disabled until we decide what to do with summarize()            
-#     def test_summarize(self):
-#         bw  = BigWigReader(bigwigfile)
-#         
-#         #ga = GenomeArray(bw.chroms)
-#         #ga.add_from_wiggle(open(wigfile),"+")
-#         
-#         chrom = "chrI"
-#         maxlen = bw.chroms[chrom]
-#         winstarts = numpy.random.randint(0,maxlen-20000,size=10)
-#         winends   = winstarts + numpy.random.randint(500,40000,size=10)
-#         winends[winends > maxlen] = maxlen
-#         
-#         numtests = 10
-#         i = 0
-#         while i < numtests:
-#             s = numpy.random.randint(0,high=maxlen)
-#             e = min(maxlen,numpy.random.randint(s+500,s+40000))
-#             seg = GenomicSegment(chrom,s,e,"+")
-#             #arr = ga[seg]
-#             arr = bw[seg]
-# 
-#             labels = ["mean","max","min","cov","stdev"]
-#             expected = [arr.mean(),arr.max(),arr.min(),wildcard,arr.std()]
-#             
-#             # change nans to 0
-#             expected = [0 if numpy.isnan(X) else X for X in expected]
-#             
-#             print(expected)
-#             found = bw.summarize(seg)
-#             print(found)
-#             print("---------------")
-#             for label, exval, fval in zip(labels,expected,found):
-#                 msg =  "test_summarize failed for stat '%s'. Expected %s, got %s (diff: %s)." % (label,exval,fval,abs(exval-fval))
-#                 assert_almost_equal(exval,fval,msg=msg,delta=5)
-#                 
-#             i += 1
-#         
-#         # retval for summarize:  (mean,max_,min_,cov,stdev)
-    
-        
+    def check_summarize(self,seg,n_bins,exact):
+        counts = self.bw.get(seg,roi_order=False)
+        edges  = (len(counts) * numpy.arange(n_bins + 1)) // n_bins
+        sums   = numpy.add.reduceat(counts,edges[:-1])
+        expected = { "sum"  : sums,
+                     "mean" : sums / numpy.diff(edges),
+                     "max"  : numpy.maximum.reduceat(counts,edges[:-1]),
+                   }
+        for stat, exp in expected.items():
+            found = self.bw.summarize(seg,n_bins=n_bins,stat=stat,roi_order=False,exact=exact)
+            assert_equal(found.shape,(n_bins,))
+            diff = abs(found - exp).max()
+            assert_less_equal(diff,TOL*max(1.0,abs(exp).max()),
+                              "summarize() stat '%s' differs by %s on %s, %s bins" % (stat,diff,seg,n_bins))
+
+        coverage = self.bw.summarize(seg,n_bins=n_bins,stat="coverage",exact=exact)
+        assert_true(((coverage >= 0) & (coverage <= 1 + TOL)).all())
+
+    def test_summarize_exact(self):
+        for chrom, length in sorted(self.chrdict.items())[:5]:
+            for n_bins in (1,7,100):
+                seg = GenomicSegment(chrom,1000,min(length,61000),"+")
+                yield self.check_summarize, seg, n_bins, True
+
+    def check_summarize_zoom(self,seg,n_bins):
+        # zoom records straddling bin edges are split in proportion to overlap,
+        # so totals are preserved, and maxima are upper bounds
+        counts = self.bw.get(seg,roi_order=False)
+        edges  = (len(counts) * numpy.arange(n_bins + 1)) // n_bins
+        sums   = self.bw.summarize(seg,n_bins=n_bins,stat="sum",roi_order=False)
+        maxes  = self.bw.summarize(seg,n_bins=n_bins,stat="max",roi_order=False)
+        assert_almost_equal(sums.sum(),counts.sum(),delta=1e-3*counts.sum())
+        assert_true((maxes >= numpy.maximum.reduceat(counts,edges[:-1]) - 1e-3).all())
+
+    def test_summarize_zoom(self):
+        for chrom, length in sorted(self.chrdict.items())[:5]:
+            seg = GenomicSegment(chrom,0,length,"+")
+            yield self.check_summarize_zoom, seg, 10
+
+    def test_summarize_roi_order_and_errors(self):
+        seg = GenomicSegment("chrI",1000,61000,"-")
+        fw  = self.bw.summarize(seg,n_bins=20,stat="sum",roi_order=False,exact=True)
+        rc  = self.bw.summarize(seg,n_bins=20,stat="sum",exact=True)
+        assert_true((fw[::-1] == rc).all())
+        assert_raises(ValueError,self.bw.summarize,seg,20,"median")
+        assert_raises(ValueError,self.bw.summarize,seg,0)
+        assert_raises(ValueError,self.bw.summarize,GenomicSegment("chrI",0,5,"+"),10)
+
+    def test_threadsafe_get_matches_serial(self):
+        bw = BigWigReader(bigwigfile,fill=0,threadsafe=True)
+        segs = []
+        for chrom, length in sorted(self.chrdict.items()):
+            for start in range(0,length-20000,100000):
+                segs.append(GenomicSegment(chrom,start,start+20000,"+"))
+                segs.append(GenomicSegment(chrom,start,start+20000,"-"))
+
+        expected = [self.bw.get(X) for X in segs]
+        pool = ThreadPool(4)
+        try:
+            found = pool.map(bw.get,segs)
+            sums  = pool.map(lambda X: bw.summarize(X,n_bins=10,stat="sum"),segs)
+        finally:
+            pool.close()
+            pool.join()
+
+        for seg, exp, fnd in zip(segs,expected,found):
+            assert_true((exp == fnd).all(),"Threaded fetch differs from serial on %s" % seg)
+        for seg, fnd in zip(segs,sums):
+            assert_true((self.bw.summarize(seg,n_bins=10,stat="sum") == fnd).all())
+        assert_equal(bw.sum(),self.bw.sum())
+
+    def test_block_cache(self):
+        bw      = BigWigReader(bigwigfile,fill=0)
+        nocache = BigWigReader(bigwigfile,fill=0,cache_size=0)
+        seg     = GenomicSegment("chrI",1000,61000,"+")
+
+        first  = bw.get(seg)
+        misses = bw.cache_info["misses"]
+        assert_true(misses > 0)
+        assert_equal(bw.cache_info["hits"],0)
+
+        # repeated query is served from cache
+        assert_true((bw.get(seg) == first).all())
+        assert_equal(bw.cache_info["misses"],misses)
+        assert_equal(bw.cache_info["hits"],misses)
+        assert_almost_equal(bw.cache_info["hit_ratio"],0.5)
+
+        assert_true((nocache.get(seg) == first).all())
+        assert_equal(nocache.cache_info["blocks"],0)
+
+        bw.clear_cache()
+        assert_equal(bw.cache_info["bytes"],0)
+        assert_equal(bw.cache_info["hits"],0)
+
+    def test_block_cache_bounded(self):
+        bw = BigWigReader(bigwigfile,fill=0,cache_size=0.1)
+        expected = list(BigWigReader(bigwigfile,cache_size=0))
+        assert_equal(list(bw),expected)
+        info = bw.cache_info
+        assert_less_equal(info["bytes"],info["max_bytes"])
+        assert_true(info["blocks"] < info["misses"])
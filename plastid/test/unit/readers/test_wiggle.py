@@ -3,7 +3,7 @@
 import unittest
 from plastid.util.services.mini2to3 import cStringIO
 from nose.plugins.attrib import attr
-from plastid.readers.wiggle import WiggleReader
+from plastid.readers.wiggle import WiggleReader, read_wiggle_chunks
 
 #===============================================================================
 # INDEX: test suites
@@ -40,6 +40,15 @@ class TestWiggleReader(unittest.TestCase):
     def test_read_multispan_multistep_bedgraph(self):
         self._do(_MULTISPAN_BEDGRAPH,"bedGraph",_MULTISPAN_TUPLES)
 
+    def test_read_chunks_matches_reader(self):
+        for data_str in (_MULTISPAN_VARSTEP,_MULTISPAN_FIXEDSTEP,_MULTISPAN_BEDGRAPH):
+            for chunk_size in (1,4,1000):
+                found = []
+                for chrom, starts, ends, values in read_wiggle_chunks(cStringIO.StringIO(data_str),chunk_size=chunk_size):
+                    self.assertLessEqual(len(starts),chunk_size)
+                    found.extend(zip([chrom]*len(starts),starts,ends,values))
+                self.assertEqual(found,_MULTISPAN_TUPLES)
+
 
 #===============================================================================
 # INDEX: test data